@@ -2,9 +2,12 @@
 # It provides a simple web interface to display the threat intelligence report
 # generated by the autoti pipeline.
 
-from flask import Flask, render_template_string
+from flask import Flask, Response, render_template_string, stream_with_context
 import sys
 import os
+import json
+import threading
+from datetime import datetime
 
 # --- PATH CONFIGURATION ---
 # This ensures that the 'autoti' package can be imported correctly.
@@ -13,26 +16,99 @@ import os
 # This is crucial for the application to function when deployed.
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
+# These modules are light: none of them imports pandas, LangChain or the Gemini client.
+from autoti.analysis.report_cache import ReportCache
+from autoti.analysis.report_store import load_report
+from autoti.scheduler import ReportScheduler
+from autoti.metrics import render_metrics
+from autoti.api import api
 
-# --- DYNAMIC PIPELINE IMPORT ---
-# We try to import the main 'run_pipeline' function from the autoti package.
+
+# --- LAZY PIPELINE IMPORT ---
+# The pipeline pulls in pandas, LangChain and the Gemini client, which take seconds to import.
+# It is only imported when a report is first needed, so workers start (and answer '/healthz')
+# straight away.
 # If there's an ImportError (e.g., due to missing dependencies or misconfiguration),
-# we catch it and define a dummy 'run_pipeline' function.
+# we catch it and return an error message instead of a report.
 # This allows the Flask app to still run and display a useful error message
 # instead of crashing completely.
 IMPORT_ERROR_MESSAGE = None
-try:
-    from autoti.analysis.langchain_agent import run_pipeline
-except ImportError as e:
-    IMPORT_ERROR_MESSAGE = str(e)
-    print(f"FATAL ERROR: Could not import run_pipeline. Error: {IMPORT_ERROR_MESSAGE}")
-    
-    def run_pipeline():
-        """A dummy function that returns an error message if the import fails."""
-        return f"Application initialization failed. Import error: {IMPORT_ERROR_MESSAGE}"
+# When enabled, the pipeline is imported and the LLM client built in a background thread as
+# soon as the app starts, so the first report request does not pay for it either.
+WARMUP_ENABLED = os.environ.get("AUTOTI_WARMUP", "true").lower() in ("1", "true", "yes")
+
+
+def load_pipeline():
+    """
+    Imports the pipeline module on first use.
+
+    Returns:
+        module: 'autoti.analysis.langchain_agent', or None if it could not be imported.
+    """
+    global IMPORT_ERROR_MESSAGE
+    try:
+        from autoti.analysis import langchain_agent
+    except ImportError as e:
+        IMPORT_ERROR_MESSAGE = str(e)
+        print(f"FATAL ERROR: Could not import run_pipeline. Error: {IMPORT_ERROR_MESSAGE}")
+        return None
+    return langchain_agent
+
+
+def run_pipeline():
+    """
+    Runs the pipeline.
+
+    Raises:
+        RuntimeError: If the pipeline could not be imported. It is raised rather than returned,
+                      so the error message is never cached or saved as a report.
+    """
+    pipeline = load_pipeline()
+    if pipeline is None:
+        raise RuntimeError(f"Application initialization failed. Import error: {IMPORT_ERROR_MESSAGE}")
+    return pipeline.run_pipeline()
+
+
+def stream_pipeline():
+    """Streams the pipeline's events, or a single 'failed' event if it could not be imported."""
+    pipeline = load_pipeline()
+    if pipeline is None:
+        yield "failed", f"Application initialization failed. Import error: {IMPORT_ERROR_MESSAGE}"
+        return
+    yield from pipeline.stream_pipeline()
+
+
+def warm_up():
+    """Imports the pipeline and builds the shared LLM client ahead of the first request."""
+    pipeline = load_pipeline()
+    if pipeline is not None:
+        pipeline.get_llm(pipeline.GOOGLE_API_KEY)
+
 
 # Initialize the Flask application.
 app = Flask(__name__)
+# The JSON API over the collected pulses and indicators (see 'autoti/api.py').
+app.register_blueprint(api)
+
+if WARMUP_ENABLED:
+    threading.Thread(target=warm_up, daemon=True).start()
+
+# --- REPORT SCHEDULING ---
+# 'AUTOTI_SCHEDULER' controls where reports come from:
+# - 'off' (default): the pipeline runs on demand, behind the in-memory report cache.
+# - 'embedded': a background thread in this process runs the pipeline on a schedule.
+# - 'external': a separate 'autoti schedule' process runs the pipeline.
+# In both scheduled modes, the web app only reads the latest saved report.
+SCHEDULER_MODE = os.environ.get("AUTOTI_SCHEDULER", "off").lower()
+
+if SCHEDULER_MODE == "embedded":
+    ReportScheduler(pipeline=run_pipeline).start()
+
+# --- REPORT CACHE ---
+# Reports are cached in memory, so page views do not each trigger a full pipeline run.
+# Concurrent requests share a single in-flight run, and a stale report is served instantly
+# while a fresh one is generated in the background. The TTL is set by 'AUTOTI_REPORT_CACHE_TTL'.
+report_cache = ReportCache(run_pipeline)
 
 
 # --- HTML TEMPLATE ---
@@ -91,10 +167,26 @@ REPORT_TEMPLATE = """
 <body>
     <div class="container">
         <h1>Automated Threat Intelligence Executive Summary</h1>
-        <p>Report generated on demand using OTX data and Gemini LLM analysis.</p>
+        <p>Report generated {{ generated_at }} using OTX data and Gemini LLM analysis.</p>
+        {% if stream_url %}<p id="status">Connecting...</p>{% endif %}
         <!-- The 'report_content' will be replaced by the output of the pipeline. -->
-        <pre>{{ report_content }}</pre>
+        <pre id="report">{{ report_content }}</pre>
     </div>
+    {% if stream_url %}
+    <script>
+        // Append the report to the page as it is streamed from the server.
+        const report = document.getElementById('report');
+        const status = document.getElementById('status');
+        const source = new EventSource('{{ stream_url }}');
+        source.addEventListener('progress', (event) => { status.textContent = JSON.parse(event.data); });
+        source.addEventListener('token', (event) => { report.textContent += JSON.parse(event.data); });
+        source.addEventListener('done', () => { status.textContent = 'Report complete.'; source.close(); });
+        source.addEventListener('failed', (event) => {
+            status.textContent = 'Report generation failed: ' + JSON.parse(event.data);
+            source.close();
+        });
+    </script>
+    {% endif %}
 </body>
 </html>
 """
@@ -105,20 +197,92 @@ def report():
     """
     The main route for the web application.
     When a user visits the root URL, this function is called.
-    It runs the full threat intelligence pipeline and displays the result.
+    It displays the cached threat intelligence report, running the pipeline only
+    if no report has been generated yet.
     """
+    if SCHEDULER_MODE in ("embedded", "external"):
+        # The scheduler produces reports in the background; just show the latest one.
+        artifact = load_report()
+        if artifact is None:
+            report_text = "The first scheduled report is still being generated. Please check back shortly."
+            generated_at = "on schedule"
+        else:
+            report_text = artifact["report"]
+            generated_at = f"at {datetime.fromisoformat(artifact['generated_at']):%Y-%m-%d %H:%M:%S}"
+        return render_template_string(REPORT_TEMPLATE, report_content=report_text, generated_at=generated_at)
+
     try:
-        # Execute the main pipeline function to get the report text.
-        print("Starting pipeline for web request...")
-        report_text = run_pipeline()
+        # Get the report text from the cache; the pipeline runs only when needed.
+        report_text = report_cache.get()
     except Exception as e:
         # If any other unexpected error occurs during the pipeline execution,
         # format it into an error message to be displayed on the web page.
         report_text = f"<div class='error'><strong>Report Generation Error!</strong><br>The pipeline failed to execute.<br>Error: {e}</div>"
         print(f"Flask App Error: {e}")
 
+    # Show when the report was produced, since it may come from the cache.
+    updated_at = report_cache.updated_at
+    generated_at = f"at {datetime.fromtimestamp(updated_at):%Y-%m-%d %H:%M:%S}" if updated_at else "on demand"
+
     # Render the HTML template, passing the generated report content to it.
-    return render_template_string(REPORT_TEMPLATE, report_content=report_text)
+    return render_template_string(REPORT_TEMPLATE, report_content=report_text, generated_at=generated_at)
+
+
+@app.route('/healthz')
+def healthz():
+    """A cheap liveness check for load balancers; it never waits for the pipeline."""
+    return {"status": "ok"}
+
+
+@app.route('/metrics')
+def metrics():
+    """
+    Exposes the pipeline's timings, counters and cache hit ratios in the Prometheus text format,
+    so they can be scraped by Prometheus (see 'autoti.metrics').
+    """
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
+
+
+def _sse(event, data):
+    """Formats one server-sent event. The data is JSON-encoded, so newlines survive the stream."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.route('/stream')
+def stream():
+    """
+    Streams the report as server-sent events: pipeline progress first, then the report
+    text as the LLM writes it, so the first bytes arrive within a second instead of
+    after the whole pipeline has finished.
+
+    A cached (or scheduled) report is sent straight away; a stale one is refreshed in the
+    background. Otherwise every client shares one streamed run, whose report is then cached
+    (see 'ReportCache.stream').
+    """
+    def events():
+        if SCHEDULER_MODE in ("embedded", "external"):
+            artifact = load_report()
+            report_text = artifact["report"] if artifact else "The first scheduled report is still being generated. Please check back shortly."
+            yield _sse("token", report_text)
+            yield _sse("done", report_text)
+            return
+
+        for event, data in report_cache.stream(stream_pipeline):
+            yield _sse(event, data)
+
+    # 'X-Accel-Buffering' stops reverse proxies such as nginx from holding the stream back.
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@app.route('/live')
+def live():
+    """Shows the report page, filled in live from the '/stream' endpoint."""
+    return render_template_string(REPORT_TEMPLATE, report_content="", generated_at="live", stream_url="/stream")
 
 
 # --- LOCAL DEVELOPMENT SERVER ---
@@ -0,0 +1,72 @@
+# This is the ASGI entry point for the web application.
+# It serves the report page with the async pipeline ('arun_pipeline'), so a single worker
+# can handle many concurrent requests while they wait on OTX and the LLM. Every other
+# path is handed to the regular Flask app.
+#
+# Run it with an ASGI server, for example:
+#   uvicorn asgi:application --host 0.0.0.0 --port 5000
+#   gunicorn asgi:application -k uvicorn.workers.UvicornWorker
+
+import asyncio
+from datetime import datetime
+
+from asgiref.wsgi import WsgiToAsgi
+
+import app as flask_module
+from app import app as flask_app, REPORT_TEMPLATE, SCHEDULER_MODE, load_pipeline
+from autoti.analysis.report_cache import AsyncReportCache
+
+
+# --- LAZY ASYNC PIPELINE IMPORT ---
+# As in 'app.py', the pipeline is imported on first use, and a failed import shows an
+# error page rather than crashing the server.
+async def arun_pipeline():
+    """Runs the async pipeline, raising a RuntimeError if it could not be imported (see 'app.run_pipeline')."""
+    # The first import takes seconds, so it runs in a thread to keep the event loop responsive.
+    pipeline = await asyncio.to_thread(load_pipeline)
+    if pipeline is None:
+        raise RuntimeError(f"Application initialization failed. Import error: {flask_module.IMPORT_ERROR_MESSAGE}")
+    return await pipeline.arun_pipeline()
+
+# The Flask app, wrapped so it can be served from the same ASGI server.
+wsgi_application = WsgiToAsgi(flask_app)
+
+# Reports are cached with the same TTL, single-flight and stale-while-revalidate rules as the Flask app.
+report_cache = AsyncReportCache(arun_pipeline)
+
+# The report template is compiled once, with the same autoescaping Flask applies.
+report_template = flask_app.jinja_env.from_string(REPORT_TEMPLATE)
+
+
+async def report(send):
+    """Renders the report page from the async pipeline and sends it as the HTTP response."""
+    try:
+        report_text = await report_cache.get()
+    except Exception as e:
+        report_text = f"<div class='error'><strong>Report Generation Error!</strong><br>The pipeline failed to execute.<br>Error: {e}</div>"
+        print(f"ASGI App Error: {e}")
+
+    updated_at = report_cache.updated_at
+    generated_at = f"at {datetime.fromtimestamp(updated_at):%Y-%m-%d %H:%M:%S}" if updated_at else "on demand"
+    body = report_template.render(report_content=report_text, generated_at=generated_at).encode("utf-8")
+
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"text/html; charset=utf-8"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def application(scope, receive, send):
+    """
+    The ASGI application.
+
+    The report page is served asynchronously when reports are generated on demand.
+    In the scheduled modes (and for any other path), the request goes to the Flask app,
+    which only has to read the latest saved report.
+    """
+    if scope["type"] == "http" and scope["path"] == "/" and scope["method"] == "GET" and SCHEDULER_MODE == "off":
+        await report(send)
+    else:
+        await wsgi_application(scope, receive, send)
@@ -0,0 +1,4 @@
+# Allows the package to be run with 'python -m autoti'.
+from autoti.cli import main
+
+main()
@@ -125,11 +125,12 @@
 # from Google (Gemini) to generate a human-readable threat report.
 
 import os
+import asyncio
+import sqlite3
 import pandas as pd
 from dotenv import load_dotenv
-from langchain_core.prompts import PromptTemplate
-from langchain_classic.chains import LLMChain
-from langchain_google_genai import ChatGoogleGenerativeAI
+# The LangChain model classes are slow to import, so they are only imported when an LLM is
+# first built (see 'get_llm'). That keeps web workers quick to start.
 
 # Load environment variables (like API keys) from a '.env' file.
 # This is a secure way to manage sensitive information.
@@ -139,20 +140,114 @@ load_dotenv()
 # Import the necessary functions from other parts of the 'autoti' package.
 # 'get_latest_pulses' is used for data collection.
 # 'normalize_pulses' is used for data processing.
-from autoti.collection.otx_collector import get_latest_pulses
-from autoti.processing.data_normalizer import normalize_pulses
+from autoti.collection.otx_collector import get_latest_pulses, iter_pulses, aget_latest_pulses
+from autoti.collection.pulse_store import open_pulse_store, collect_incremental, load_pulses, iter_stored_pulses, window_start
+from autoti.collection.feeds import FEEDS_CONFIG_PATH, load_feeds, collect_feeds
+from autoti.processing.data_normalizer import normalize_pulses, normalize_indicators, iter_normalized_chunks, select_top_k
+from autoti.processing.columnar_store import write_normalized
+from autoti.processing.ranking import score_pulses, select_top_pulses
+from autoti.processing.deduplication import deduplicate_pulses
+from autoti.processing.intel_store import IntelStore
+from autoti.processing.trends import TrendStore, format_trends
+from autoti.analysis.llm_cache import LLMCache, make_cache_key
+from autoti.analysis.llm_registry import get_or_create, get_chain
+from autoti.analysis.map_reduce import (
+    generate_map_reduce_report, agenerate_map_reduce_report, estimate_tokens, render_pulse_lines, pack_chunks,
+    MAP_CHUNK_TOKENS, MAP_MAX_CONCURRENCY
+)
+from autoti.metrics import pipeline_run, stage_timer, record_llm_call
 
 
 # --- LLM AND API CONFIGURATION ---
 # Retrieve the Google API key from environment variables.
 # Using .get() provides a default value, which helps prevent errors if the key isn't set.
 GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY", "YOUR_API_KEY_HERE")
+# We use Google's 'gemini-2.5-flash' model, which is fast and suitable for summaries.
+# A temperature of 0.2 makes the output more deterministic and focused.
+LLM_MODEL = "gemini-2.5-flash"
+LLM_TEMPERATURE = 0.2
+# When enabled, a local stand-in model returns canned reports, so the pipeline can be run
+# and tested offline without a Google API key or any network calls.
+USE_FAKE_LLM = os.environ.get("AUTOTI_FAKE_LLM", "false").lower() in ("1", "true", "yes")
+# When enabled, LLM responses are cached on disk and reused for identical inputs.
+LLM_CACHE_ENABLED = os.environ.get("AUTOTI_LLM_CACHE", "true").lower() in ("1", "true", "yes")
+
+# --- COLLECTION MODE ---
+# When enabled, each run only fetches pulses changed since the previous run and keeps
+# the last 24 hours in a local store, instead of downloading the whole day every time.
+INCREMENTAL_COLLECTION = os.environ.get("AUTOTI_INCREMENTAL", "false").lower() in ("1", "true", "yes")
+# When enabled, pulses flow through the pipeline as a stream and only the top rows
+# needed for the report are kept, so memory does not grow with the number of pulses.
+STREAMING_PIPELINE = os.environ.get("AUTOTI_STREAMING", "false").lower() in ("1", "true", "yes")
+# When set, each run's normalized pulses and indicator table are also written to this
+# columnar store directory (see 'autoti.processing.columnar_store').
+# The streaming pipeline never holds every pulse at once, so it does not save runs to this
+# store, to the intel store or to the trend statistics below.
+COLUMNAR_DIR = os.environ.get("AUTOTI_COLUMNAR_DIR")
+# When enabled, near-duplicate pulses (re-shares, the same campaign published by several
+# authors) are merged before normalization (see 'autoti.processing.deduplication').
+# The streaming pipeline never holds every pulse at once, so it skips this step.
+DEDUP_ENABLED = os.environ.get("AUTOTI_DEDUP", "true").lower() in ("1", "true", "yes")
+# When enabled, each run's pulses and indicators are saved to the indexed store the JSON API
+# serves from (see 'autoti.processing.intel_store' and 'autoti.api').
+INTEL_STORE_ENABLED = os.environ.get("AUTOTI_INTEL_STORE", "true").lower() in ("1", "true", "yes")
+# When enabled, each run adds its new pulses to the rolling trend statistics (see 'autoti.processing.trends').
+TRENDS_ENABLED = os.environ.get("AUTOTI_TRENDS", "true").lower() in ("1", "true", "yes")
+# When enabled, a few lines of those trends (what grew over the last days, the most reported
+# indicators) are added to the data the report is written from.
+REPORT_TRENDS = os.environ.get("AUTOTI_REPORT_TRENDS", "false").lower() in ("1", "true", "yes")
+# Number of top threats included in the report.
+REPORT_TOP_K = 5
+# Approximate token budget for the threat data inserted into the report prompt.
+REPORT_SUMMARY_TOKENS = int(os.environ.get("AUTOTI_REPORT_SUMMARY_TOKENS", 1500))
+# Longer pulse descriptions are truncated to this many characters in the report prompt.
+REPORT_DESCRIPTION_CHARS = int(os.environ.get("AUTOTI_REPORT_DESCRIPTION_CHARS", 400))
+# The header line describing the compact format of the threat data.
+REPORT_SUMMARY_HEADER = "Threat | IOC count | Description"
+# How the report is generated:
+# - 'top': only the top REPORT_TOP_K pulses are sent to the LLM in a single call.
+# - 'map_reduce': every pulse is summarised in chunks, in parallel, and the summaries are
+#   reduced into the final report. Chunk size and parallelism are set by
+#   'AUTOTI_MAP_CHUNK_TOKENS' and 'AUTOTI_MAP_CONCURRENCY'.
+REPORT_MODE = os.environ.get("AUTOTI_REPORT_MODE", "top").lower()
+
+# --- PROMPT ENGINEERING ---
+# This is the instruction we give to the LLM. A well-crafted prompt is crucial
+# for getting a high-quality response.
+# We tell the LLM its role ('senior threat intelligence analyst'), the desired format,
+# and provide it with the data summary.
+REPORT_PROMPT_TEMPLATE = """
+    You are a senior threat intelligence analyst. Your task is to generate a concise, one-page executive summary report
+    based on the threat intelligence data collected in the last 24 hours.
+
+    The report must be structured as follows:
+    1.  **Key Findings**: A high-level summary of the most significant threats.
+    2.  **Top Threats Details**: A brief description of each of the top threats observed.
+    3.  **General Mitigation Recommendations**: Actionable advice for a general audience to protect against these threats.
+
+    Here is the summary of the threat data:
+    ---
+    {data_summary}
+    ---
+
+    Please generate the report now.
+    """
+
+# The canned answer returned by the offline stand-in model.
+FAKE_REPORT = (
+    "1. **Key Findings**: Offline test report generated without calling an LLM.\n"
+    "2. **Top Threats Details**: See the threat data summary.\n"
+    "3. **General Mitigation Recommendations**: Keep systems patched and monitor for the listed indicators."
+)
 
 
 def get_llm(api_key):
     """
     Initializes and configures the Large Language Model (LLM).
 
+    The client is built once per process and shared by every run and thread
+    (see 'autoti.analysis.llm_registry').
+
     Args:
         api_key (str): The Google API key for authentication.
 
@@ -160,26 +255,89 @@ def get_llm(api_key):
         ChatGoogleGenerativeAI: An instance of the LLM, ready to be used.
                                 Returns None if the API key is missing.
     """
+    if USE_FAKE_LLM:
+        return get_or_create(("fake",), get_fake_llm)
+
     if api_key in ("YOUR_API_KEY_HERE", None):
         print("ERROR: Google API Key is missing.")
         return None
 
-    # We use Google's 'gemini-2.5-flash' model, which is fast and suitable for summaries.
-    # 'temperature=0.2' makes the output more deterministic and focused.
-    return ChatGoogleGenerativeAI(
-        google_api_key=api_key,
-        model="gemini-2.5-flash",
-        temperature=0.2,
-        convert_system_message_to_human=True
-    )
+    def create_llm():
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        return ChatGoogleGenerativeAI(
+            google_api_key=api_key,
+            model=LLM_MODEL,
+            temperature=LLM_TEMPERATURE,
+            convert_system_message_to_human=True
+        )
+
+    return get_or_create(("gemini", LLM_MODEL, LLM_TEMPERATURE, api_key), create_llm)
+
+
+def get_fake_llm(responses=None):
+    """
+    Returns a local stand-in LLM that answers with canned responses, for offline use and testing.
+
+    Args:
+        responses (list, optional): Responses to return, in turn. Defaults to a single canned report.
+
+    Returns:
+        FakeListChatModel: A LangChain chat model that never makes network calls.
+    """
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+    return FakeListChatModel(responses=responses or [FAKE_REPORT])
+
+
+def _llm_cache_key(llm, prompt_template, data_summary):
+    """Builds the LLM cache key from the model's identity and the full prompt inputs."""
+    model_name = getattr(llm, "model", None) or getattr(llm, "model_name", None) or type(llm).__name__
+    temperature = getattr(llm, "temperature", None)
+    return make_cache_key(model_name, temperature, prompt_template, data_summary)
+
 
-def generate_threat_report(normalized_data, llm):
+def build_data_summary(normalized_data, trend_context=None):
+    """
+    Builds the text summary of the top threats that is inserted into the report prompt.
+
+    Each threat is rendered as one dense line, with long descriptions truncated, and the
+    summary is cut to fit 'REPORT_SUMMARY_TOKENS'. The most relevant threats come first,
+    so when the budget runs out it is the least relevant ones that are left out.
+
+    Args:
+        normalized_data (pd.DataFrame): A DataFrame of processed threat data.
+        trend_context (str, optional): Trend lines from 'format_trends', added after the threats.
+
+    Returns:
+        str: The data summary text.
+    """
+    # --- DATA PREPARATION FOR LLM ---
+    # We select the most relevant threats (see 'autoti.processing.ranking') to create a concise summary.
+    # Unlike 'DataFrame.to_string', the compact format spends no tokens on column padding.
+    top_threats = select_top_pulses(normalized_data, k=REPORT_TOP_K)
+    lines = render_pulse_lines(top_threats, max_description_chars=REPORT_DESCRIPTION_CHARS)
+    # The first chunk holds as many of the top lines as fit in the budget, in rank order.
+    budget = max(REPORT_SUMMARY_TOKENS - estimate_tokens(REPORT_SUMMARY_HEADER) - estimate_tokens(trend_context or ""), 1)
+    data_summary = "\n".join([REPORT_SUMMARY_HEADER, *pack_chunks(lines, max_tokens=budget)[:1]])
+    if trend_context:
+        data_summary += f"\n\nTrends:\n{trend_context}"
+    return data_summary
+
+
+def generate_threat_report(normalized_data, llm, cache=None, mode=REPORT_MODE, trend_context=None):
     """
     Generates the threat intelligence report by sending data and a prompt to the LLM.
 
     Args:
         normalized_data (pd.DataFrame): A DataFrame of processed threat data.
         llm (ChatGoogleGenerativeAI): The initialized LLM instance.
+        cache (LLMCache, optional): If given, an identical earlier request is answered from
+                                    the cache, and new responses are stored in it.
+        mode (str): 'top' to send only the top threats in one call, or 'map_reduce'
+                    to summarise every pulse (see 'REPORT_MODE').
+        trend_context (str, optional): Trend lines from 'format_trends', given to the LLM
+                                       alongside the threat data (see 'REPORT_TRENDS').
 
     Returns:
         str: The generated report text. Returns an error message on failure.
@@ -190,76 +348,373 @@ def generate_threat_report(normalized_data, llm):
     if not isinstance(normalized_data, pd.DataFrame) or normalized_data.empty:
         return "No threat data available to generate a report."
 
-    # --- DATA PREPARATION FOR LLM ---
-    # We select the top 5 threats to create a concise summary.
-    # The DataFrame is converted to a string, which is a format the LLM can easily understand.
-    top_threats = normalized_data.head(5)
-    data_summary_str = top_threats.to_string(
-        columns=['threat_name', 'threat_description', 'ioc_count'],
-        index=False
-    )
-
-    # --- PROMPT ENGINEERING ---
-    # This is the instruction we give to the LLM. A well-crafted prompt is crucial
-    # for getting a high-quality response.
-    # We tell the LLM its role ('senior threat intelligence analyst'), the desired format,
-    # and provide it with the data summary.
-    prompt_template = """
-    You are a senior threat intelligence analyst. Your task is to generate a concise, one-page executive summary report
-    based on the threat intelligence data collected in the last 24 hours.
+    if mode == "map_reduce":
+        try:
+            return generate_map_reduce_report(
+                normalized_data, llm, REPORT_PROMPT_TEMPLATE,
+                chunk_tokens=MAP_CHUNK_TOKENS, max_concurrency=MAP_MAX_CONCURRENCY, cache=cache,
+                trend_context=trend_context,
+            )
+        except Exception as e:
+            return f"Failed to generate report. Error: {e}"
+
+    data_summary_str = build_data_summary(normalized_data, trend_context)
+
+    # If the model and its inputs are unchanged, reuse the earlier answer and skip the LLM call.
+    cache_key = _llm_cache_key(llm, REPORT_PROMPT_TEMPLATE, data_summary_str) if cache is not None else None
+    if cache_key is not None:
+        cached_report = cache.get(cache_key)
+        if cached_report is not None:
+            print("Using cached threat report for unchanged input.")
+            return cached_report
+
+    # The chain combines LangChain's PromptTemplate, the LLM and a parser that returns the text.
+    # It is built once per LLM and reused by every run.
+    chain = get_chain(llm, REPORT_PROMPT_TEMPLATE, "data_summary")
 
-    The report must be structured as follows:
-    1.  **Key Findings**: A high-level summary of the most significant threats.
-    2.  **Top Threats Details**: A brief description of each of the top threats observed.
-    3.  **General Mitigation Recommendations**: Actionable advice for a general audience to protect against these threats.
+    try:
+        # We 'invoke' the chain, passing our data summary. This sends the request to the LLM.
+        report_text = chain.invoke({"data_summary": data_summary_str})
+        record_llm_call(estimate_tokens(REPORT_PROMPT_TEMPLATE.format(data_summary=data_summary_str)), estimate_tokens(report_text))
+        # Only successful answers are cached; failures should be retried on the next run.
+        if cache_key is not None:
+            cache.set(cache_key, report_text)
+        return report_text
+    except Exception as e:
+        # Handle potential errors during the API call.
+        return f"Failed to generate report. Error: {e}"
 
-    Here is the summary of the threat data:
-    ---
-    {data_summary}
-    ---
 
-    Please generate the report now.
+async def agenerate_threat_report(normalized_data, llm, cache=None, mode=REPORT_MODE, trend_context=None):
+    """
+    Async version of 'generate_threat_report'. The LLM is called with 'ainvoke', so the
+    event loop stays free to serve other requests while waiting for the response.
+
+    Takes the same arguments and returns the same report text.
     """
+    if llm is None:
+        return "Report generation failed due to missing LLM configuration."
+
+    if not isinstance(normalized_data, pd.DataFrame) or normalized_data.empty:
+        return "No threat data available to generate a report."
+
+    if mode == "map_reduce":
+        try:
+            return await agenerate_map_reduce_report(
+                normalized_data, llm, REPORT_PROMPT_TEMPLATE,
+                chunk_tokens=MAP_CHUNK_TOKENS, max_concurrency=MAP_MAX_CONCURRENCY, cache=cache,
+                trend_context=trend_context,
+            )
+        except Exception as e:
+            return f"Failed to generate report. Error: {e}"
+
+    data_summary_str = build_data_summary(normalized_data, trend_context)
 
-    # We use LangChain's PromptTemplate to structure the prompt and define input variables.
-    prompt = PromptTemplate(input_variables=["data_summary"], template=prompt_template)
-    
-    # An LLMChain combines the prompt and the LLM, creating a runnable component.
-    chain = LLMChain(llm=llm, prompt=prompt)
+    cache_key = _llm_cache_key(llm, REPORT_PROMPT_TEMPLATE, data_summary_str) if cache is not None else None
+    if cache_key is not None:
+        cached_report = cache.get(cache_key)
+        if cached_report is not None:
+            print("Using cached threat report for unchanged input.")
+            return cached_report
+
+    chain = get_chain(llm, REPORT_PROMPT_TEMPLATE, "data_summary")
 
     try:
-        # We 'invoke' the chain, passing our data summary. This sends the request to the LLM.
-        report = chain.invoke({"data_summary": data_summary_str})
-        # The actual text is in the 'text' key of the response.
-        return report['text']
+        report_text = await chain.ainvoke({"data_summary": data_summary_str})
+        record_llm_call(estimate_tokens(REPORT_PROMPT_TEMPLATE.format(data_summary=data_summary_str)), estimate_tokens(report_text))
+        if cache_key is not None:
+            cache.set(cache_key, report_text)
+        return report_text
     except Exception as e:
-        # Handle potential errors during the API call.
         return f"Failed to generate report. Error: {e}"
 
 
+def stream_threat_report(normalized_data, llm, cache=None, mode=REPORT_MODE, trend_context=None):
+    """
+    Streaming version of 'generate_threat_report': yields the report text piece by piece,
+    as the LLM produces it, so callers can show the report while it is being written.
+
+    In 'map_reduce' mode the chunk summaries have to be finished before the report can start,
+    so the report is yielded in one piece once it is complete.
+
+    Takes the same arguments as 'generate_threat_report'.
+
+    Yields:
+        str: The next piece of the report text.
+    """
+    if llm is None or mode == "map_reduce" or not isinstance(normalized_data, pd.DataFrame) or normalized_data.empty:
+        yield generate_threat_report(normalized_data, llm, cache=cache, mode=mode, trend_context=trend_context)
+        return
+
+    data_summary_str = build_data_summary(normalized_data, trend_context)
+
+    cache_key = _llm_cache_key(llm, REPORT_PROMPT_TEMPLATE, data_summary_str) if cache is not None else None
+    if cache_key is not None:
+        cached_report = cache.get(cache_key)
+        if cached_report is not None:
+            print("Using cached threat report for unchanged input.")
+            yield cached_report
+            return
+
+    chain = get_chain(llm, REPORT_PROMPT_TEMPLATE, "data_summary")
+
+    pieces = []
+    try:
+        for piece in chain.stream({"data_summary": data_summary_str}):
+            pieces.append(piece)
+            yield piece
+    except Exception as e:
+        yield f"\n\nFailed to generate report. Error: {e}"
+        return
+
+    report_text = "".join(pieces)
+    record_llm_call(estimate_tokens(REPORT_PROMPT_TEMPLATE.format(data_summary=data_summary_str)), estimate_tokens(report_text))
+    if cache_key is not None:
+        cache.set(cache_key, report_text)
+
+
 # --- MAIN PIPELINE FUNCTION ---
-def run_pipeline():
+def _collect(otx_key, incremental, streaming, store):
+    """
+    Step 1 of the pipeline: fetches the pulses to report on.
+
+    In streaming mode this only sets up the stream; the pulses are actually downloaded
+    while they are normalized, so that time counts towards step 2.
+    """
+    with stage_timer("fetch"):
+        if incremental:
+            # Sync only what changed, then read the full 24-hour window back from the local store.
+            collect_incremental(otx_key, store)
+            since = window_start()
+            return iter_stored_pulses(store, since=since) if streaming else load_pulses(store, since=since)
+        if FEEDS_CONFIG_PATH:
+            # Several feeds are configured: collect them all concurrently and merge their pulses.
+            pulses = collect_feeds(load_feeds())
+            return iter(pulses) if streaming else pulses
+        if streaming:
+            return iter_pulses(otx_key)
+        return get_latest_pulses(otx_key)
+
+
+def _normalize(raw_pulses, streaming):
+    """
+    Step 2 of the pipeline: merges near-duplicates and normalizes the pulses (and stores them,
+    if a columnar store is set).
+    """
+    if DEDUP_ENABLED and not streaming:
+        raw_pulses = _deduplicate(raw_pulses)
+
+    with stage_timer("normalize"):
+        if streaming and REPORT_MODE == "map_reduce":
+            # Map-reduce summarises every pulse, so there is nothing to gain from keeping
+            # only the top rows; normalize in chunks but keep them all (without indicators).
+            return pd.concat(list(iter_normalized_chunks(raw_pulses)) or [pd.DataFrame()], ignore_index=True)
+        if streaming:
+            # Nothing has been fetched or normalized yet at this point: pulses are pulled
+            # through the normalizer chunk by chunk as the top-K selector consumes them.
+            # Each chunk is scored while it still has its indicators, then ranked by relevance.
+            return select_top_k(
+                iter_normalized_chunks(raw_pulses, transform=score_pulses), k=REPORT_TOP_K, by='relevance_score'
+            )
+        normalized_data = normalize_pulses(raw_pulses)
+
+    _store(raw_pulses, normalized_data)
+    return normalized_data
+
+
+def _store(raw_pulses, normalized_data):
+    """
+    Persists this run's data, so restarts, analytics jobs and API clients do not need the raw JSON,
+    and adds its new pulses to the trend statistics. Streaming runs skip this step.
+    """
+    if not COLUMNAR_DIR and not INTEL_STORE_ENABLED and not TRENDS_ENABLED:
+        return
+    with stage_timer("store"):
+        if COLUMNAR_DIR:
+            write_normalized(normalized_data, normalize_indicators(raw_pulses), COLUMNAR_DIR)
+        if INTEL_STORE_ENABLED:
+            intel_store = IntelStore()
+            try:
+                intel_store.upsert_pulses(raw_pulses)
+            finally:
+                intel_store.close()
+        if TRENDS_ENABLED:
+            trend_store = TrendStore()
+            try:
+                trend_store.update(raw_pulses)
+            finally:
+                trend_store.close()
+
+
+def _trend_context():
+    """Reads the current trends as a few lines for the report, or returns None if they are off or unavailable."""
+    if not REPORT_TRENDS:
+        return None
+    try:
+        trend_store = TrendStore()
+        try:
+            return format_trends(trend_store.summary()) or None
+        finally:
+            trend_store.close()
+    except sqlite3.Error as e:
+        print(f"Could not read threat trends, writing the report without them: {e}")
+        return None
+
+
+def _deduplicate(raw_pulses):
+    """Merges near-duplicate pulses, timed as its own pipeline stage."""
+    with stage_timer("dedup"):
+        return deduplicate_pulses(raw_pulses)
+
+
+def run_pipeline(incremental=INCREMENTAL_COLLECTION, streaming=STREAMING_PIPELINE):
     """
     Orchestrates the entire process: data collection, processing, and report generation.
     This function is designed to be called by other parts of the application, like the Flask app.
+
+    Args:
+        incremental (bool): If True, only the delta since the last run is fetched from OTX
+                            and the report is built from the local pulse store.
+        streaming (bool): If True, pulses are normalized in chunks as they arrive and only
+                          the top rows needed for the report are kept in memory.
     """
     print("--- Starting Automated Threat Intelligence Pipeline ---")
-    
+
     # Retrieve the OTX API key from environment variables.
     otx_key = os.environ.get("OTX_API_KEY")
 
-    # 1. Collect Data
-    print("\nStep 1: Fetching latest threat intelligence data...")
-    raw_pulses = get_latest_pulses(otx_key) 
+    # Each step is timed and exported as a metric (see 'autoti.metrics').
+    with pipeline_run():
+        store = open_pulse_store() if incremental else None
+        try:
+            # 1. Collect Data
+            print("\nStep 1: Fetching latest threat intelligence data...")
+            raw_pulses = _collect(otx_key, incremental, streaming, store)
+
+            # 2. Process Data
+            print("\nStep 2: Normalizing raw data...")
+            normalized_data = _normalize(raw_pulses, streaming)
+        finally:
+            if store is not None:
+                store.close()
+
+        # 3. Analyze and Generate Report
+        print("\nStep 3: Initializing LLM and generating report...")
+        with stage_timer("report"):
+            llm = get_llm(GOOGLE_API_KEY)
+            llm_cache = LLMCache() if LLM_CACHE_ENABLED else None
+            try:
+                final_report = generate_threat_report(normalized_data, llm, cache=llm_cache, trend_context=_trend_context())
+            finally:
+                if llm_cache is not None:
+                    llm_cache.close()
+
+    print("\n--- Pipeline Finished ---")
+    return final_report
+
+
+def stream_pipeline(incremental=INCREMENTAL_COLLECTION, streaming=STREAMING_PIPELINE):
+    """
+    Streaming version of 'run_pipeline', for showing a report while it is being produced.
+
+    Takes the same arguments as 'run_pipeline'.
+
+    Yields:
+        tuple: (event, data) pairs, in this order:
+               - ('progress', message) as each step of the pipeline starts,
+               - ('token', text) for each piece of the report as the LLM writes it,
+               - ('done', report) with the full report text at the end.
+    """
+    print("--- Starting Automated Threat Intelligence Pipeline (streaming) ---")
+    otx_key = os.environ.get("OTX_API_KEY")
+
+    with pipeline_run():
+        store = open_pulse_store() if incremental else None
+        try:
+            yield "progress", "Fetching latest threat intelligence data..."
+            raw_pulses = _collect(otx_key, incremental, streaming, store)
+
+            yield "progress", "Normalizing raw data..."
+            normalized_data = _normalize(raw_pulses, streaming)
+        finally:
+            if store is not None:
+                store.close()
+
+        yield "progress", f"Generating report from {len(normalized_data)} pulses..."
+        with stage_timer("report"):
+            llm = get_llm(GOOGLE_API_KEY)
+            llm_cache = LLMCache() if LLM_CACHE_ENABLED else None
+            pieces = []
+            try:
+                for piece in stream_threat_report(normalized_data, llm, cache=llm_cache, trend_context=_trend_context()):
+                    pieces.append(piece)
+                    yield "token", piece
+            finally:
+                if llm_cache is not None:
+                    llm_cache.close()
+
+    print("\n--- Pipeline Finished ---")
+    yield "done", "".join(pieces)
+
+
+def _load_incremental_pulses(otx_key):
+    """Syncs the local pulse store with OTX and returns the last 24 hours of pulses from it."""
+    store = open_pulse_store()
+    try:
+        collect_incremental(otx_key, store)
+        return load_pulses(store, since=window_start())
+    finally:
+        store.close()
+
+
+async def arun_pipeline(incremental=INCREMENTAL_COLLECTION):
+    """
+    Async version of 'run_pipeline', for asyncio servers such as the ASGI app.
+
+    OTX is queried with an async HTTP client and the LLM with 'ainvoke'. The blocking
+    parts (the SQLite store and pandas normalization) run in worker threads, so the
+    event loop is never blocked.
+
+    Args:
+        incremental (bool): If True, only the delta since the last run is fetched from OTX
+                            and the report is built from the local pulse store.
+
+    Returns:
+        str: The generated report text.
+    """
+    print("--- Starting Automated Threat Intelligence Pipeline (async) ---")
+    otx_key = os.environ.get("OTX_API_KEY")
 
-    # 2. Process Data
-    print("\nStep 2: Normalizing raw data...")
-    normalized_data = normalize_pulses(raw_pulses)
+    with pipeline_run():
+        # 1. Collect Data
+        print("\nStep 1: Fetching latest threat intelligence data...")
+        with stage_timer("fetch"):
+            if incremental:
+                raw_pulses = await asyncio.to_thread(_load_incremental_pulses, otx_key)
+            elif FEEDS_CONFIG_PATH:
+                raw_pulses = await asyncio.to_thread(collect_feeds, load_feeds())
+            else:
+                raw_pulses = await aget_latest_pulses(otx_key)
+
+        # 2. Process Data
+        print("\nStep 2: Normalizing raw data...")
+        if DEDUP_ENABLED:
+            raw_pulses = await asyncio.to_thread(_deduplicate, raw_pulses)
+        with stage_timer("normalize"):
+            normalized_data = await asyncio.to_thread(normalize_pulses, raw_pulses)
+        await asyncio.to_thread(_store, raw_pulses, normalized_data)
+
+        # 3. Analyze and Generate Report
+        print("\nStep 3: Initializing LLM and generating report...")
+        with stage_timer("report"):
+            llm = get_llm(GOOGLE_API_KEY)
+            llm_cache = LLMCache() if LLM_CACHE_ENABLED else None
+            try:
+                trend_context = await asyncio.to_thread(_trend_context)
+                final_report = await agenerate_threat_report(normalized_data, llm, cache=llm_cache, trend_context=trend_context)
+            finally:
+                if llm_cache is not None:
+                    llm_cache.close()
 
-    # 3. Analyze and Generate Report
-    print("\nStep 3: Initializing LLM and generating report...")
-    llm = get_llm(GOOGLE_API_KEY)
-    final_report = generate_threat_report(normalized_data, llm)
-    
     print("\n--- Pipeline Finished ---")
-    return final_report
\ No newline at end of file
+    return final_report
@@ -0,0 +1,135 @@
+# This script provides a persistent cache for LLM responses, backed by SQLite.
+# When the data sent to the model is byte-identical to a previous run (same model,
+# temperature, prompt template and data summary), the stored answer is reused
+# instead of paying for another round trip to the LLM provider.
+#
+# Entries expire after a TTL, and the least recently used entries are evicted
+# once the cache grows past its size limit.
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+from autoti.metrics import record_cache_lookup
+
+# --- CACHE CONFIGURATION ---
+# Location of the SQLite database file. It is created on first use.
+LLM_CACHE_PATH = os.environ.get("AUTOTI_LLM_CACHE_PATH", "autoti_llm_cache.db")
+# How long (in seconds) a cached response stays valid.
+LLM_CACHE_TTL = int(os.environ.get("AUTOTI_LLM_CACHE_TTL", 7 * 24 * 3600))
+# Maximum total size (in bytes) of the cached responses before LRU eviction kicks in.
+LLM_CACHE_MAX_BYTES = int(os.environ.get("AUTOTI_LLM_CACHE_MAX_BYTES", 50 * 1024 * 1024))
+
+
+def make_cache_key(model_name, temperature, prompt_template, data_summary):
+    """
+    Builds a cache key from everything that influences the LLM's answer.
+
+    Args:
+        model_name (str): The model identifier, e.g. 'gemini-2.5-flash'.
+        temperature (float): The sampling temperature.
+        prompt_template (str): The prompt template text.
+        data_summary (str): The data inserted into the template.
+
+    Returns:
+        str: A SHA-256 hex digest identifying the request.
+    """
+    payload = json.dumps([model_name, temperature, prompt_template, data_summary], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    A thread-safe, on-disk LRU cache for LLM responses with TTL and size-based eviction.
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, ttl=LLM_CACHE_TTL, max_bytes=LLM_CACHE_MAX_BYTES):
+        """
+        Args:
+            path (str): Path to the SQLite database file.
+            ttl (int): Number of seconds a cached response stays valid.
+            max_bytes (int): Maximum total size of the cached responses.
+        """
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # The connection is shared between threads (e.g. the scheduler and web requests), guarded by the lock.
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_accessed REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_llm_responses_last_accessed ON llm_responses (last_accessed);
+            """
+        )
+
+    def get(self, key):
+        """
+        Looks up a cached response.
+
+        Args:
+            key (str): A key built with 'make_cache_key'.
+
+        Returns:
+            str: The cached response, or None if there is no valid entry.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM llm_responses WHERE key = ? AND created_at >= ?", (key, now - self.ttl)
+            ).fetchone()
+            record_cache_lookup("llm", row is not None)
+            if row is None:
+                return None
+            # Record the access so this entry is the last to be evicted.
+            self._conn.execute("UPDATE llm_responses SET last_accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return row[0]
+
+    def set(self, key, response):
+        """
+        Stores a response and evicts expired or least recently used entries.
+
+        Args:
+            key (str): A key built with 'make_cache_key'.
+            response (str): The LLM response text.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, response, size, created_at, last_accessed) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, response, len(response.encode("utf-8")), now, now),
+            )
+            self._evict_locked(now)
+            self._conn.commit()
+
+    def _evict_locked(self, now):
+        """Deletes expired entries, then the least recently used ones until the size limit is met."""
+        self._conn.execute("DELETE FROM llm_responses WHERE created_at < ?", (now - self.ttl,))
+        # A running total over entries ordered from most to least recently used marks
+        # everything past the size limit for deletion in a single statement.
+        self._conn.execute(
+            """
+            DELETE FROM llm_responses WHERE key IN (
+                SELECT key FROM (
+                    SELECT key, SUM(size) OVER (ORDER BY last_accessed DESC, key) AS running_size
+                    FROM llm_responses
+                ) WHERE running_size > ?
+            )
+            """,
+            (self.max_bytes,),
+        )
+
+    def close(self):
+        """Closes the underlying database connection."""
+        with self._lock:
+            self._conn.close()
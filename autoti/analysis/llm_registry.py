@@ -0,0 +1,62 @@
+# This script keeps one LLM client, and one chain per prompt template, for the whole process.
+# Building a 'ChatGoogleGenerativeAI' client and its prompt chain on every pipeline run wastes
+# time (and connections) that a long-running web worker does not need to spend again.
+#
+# Everything is built on first use and then shared by every thread. Building happens under a
+# lock, so concurrent first requests still create a single instance.
+
+import threading
+
+from langchain_core.prompts import PromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+
+_lock = threading.Lock()
+_instances = {}
+
+
+def get_or_create(key, factory):
+    """
+    Returns the shared instance for a key, creating it with 'factory' the first time.
+
+    Args:
+        key (tuple): A hashable key identifying the instance, e.g. ('gemini', model, temperature).
+        factory (callable): A function with no arguments that builds the instance.
+
+    Returns:
+        The shared instance.
+    """
+    instance = _instances.get(key)
+    if instance is None:
+        with _lock:
+            # Another thread may have built it while we were waiting for the lock.
+            instance = _instances.get(key)
+            if instance is None:
+                instance = factory()
+                _instances[key] = instance
+    return instance
+
+
+def get_chain(llm, template, input_variable):
+    """
+    Returns the shared 'prompt | llm | parser' chain for an LLM and a prompt template.
+
+    The chain keeps a reference to the LLM, so the LLM's id stays unique while the chain is registered.
+
+    Args:
+        llm: A LangChain LLM or chat model.
+        template (str): The prompt template text.
+        input_variable (str): The template's single input variable, e.g. 'data_summary'.
+
+    Returns:
+        Runnable: A chain whose 'invoke' / 'stream' / 'abatch' return plain strings.
+    """
+    return get_or_create(
+        ("chain", id(llm), template),
+        lambda: PromptTemplate(input_variables=[input_variable], template=template) | llm | StrOutputParser(),
+    )
+
+
+def clear_registry():
+    """Drops every shared instance, e.g. after the LLM configuration changed."""
+    with _lock:
+        _instances.clear()
@@ -0,0 +1,195 @@
+# This script generates the threat report with a map-reduce strategy, so the whole day's
+# intelligence reaches the LLM instead of just the first few pulses.
+#
+# - Map: all pulses are packed into chunks that fit a token budget, and each chunk is
+#   summarised by the LLM. Chunks are sent concurrently, with a cap on parallel calls
+#   so we stay within the provider's rate limits.
+# - Reduce: the chunk summaries are combined (collapsing them further if they are still
+#   too long) and turned into the final executive report.
+
+import os
+import math
+import asyncio
+
+import pandas as pd
+from autoti.analysis.llm_cache import make_cache_key
+from autoti.analysis.llm_registry import get_chain
+from autoti.metrics import record_llm_call
+
+# --- MAP-REDUCE CONFIGURATION ---
+# Approximate number of tokens of pulse data per map chunk.
+MAP_CHUNK_TOKENS = int(os.environ.get("AUTOTI_MAP_CHUNK_TOKENS", 3000))
+# Maximum number of LLM calls in flight at once.
+MAP_MAX_CONCURRENCY = int(os.environ.get("AUTOTI_MAP_CONCURRENCY", 4))
+# Rough number of characters per token, used to estimate prompt sizes without a tokenizer.
+CHARS_PER_TOKEN = 4
+
+# The instruction used to summarise each chunk of pulses.
+MAP_PROMPT_TEMPLATE = """
+    You are a threat intelligence analyst. Summarise the following threat intelligence pulses.
+    Group related pulses into campaigns, name the malware families, threat actors, targeted sectors
+    and techniques involved, and note the pulses with the most indicators of compromise.
+    Be concise and factual; do not invent details.
+
+    Pulses (name | IOC count | description):
+    ---
+    {pulses}
+    ---
+    """
+
+# The instruction used to merge several summaries into one, when they do not fit a single prompt.
+COLLAPSE_PROMPT_TEMPLATE = """
+    You are a threat intelligence analyst. Merge the following partial threat summaries into a single
+    summary, combining duplicate campaigns and keeping the most significant threats first.
+
+    Partial summaries:
+    ---
+    {pulses}
+    ---
+    """
+
+
+def estimate_tokens(text):
+    """Estimates the number of tokens in a piece of text from its length."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def truncate_text(text, max_chars):
+    """Cuts text down to at most 'max_chars' characters, at a word boundary where possible."""
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max(max_chars - 3, 0)]
+    # Prefer ending on a whole word, unless that would throw away most of the text.
+    last_space = cut.rfind(' ')
+    if last_space > max_chars // 2:
+        cut = cut[:last_space]
+    return cut.rstrip() + '...'
+
+
+def render_pulse_lines(normalized_data, max_description_chars=None):
+    """
+    Renders each normalized pulse as one compact line of text.
+
+    Runs of whitespace in descriptions are collapsed, so no tokens are spent on padding.
+
+    Args:
+        normalized_data (pd.DataFrame): A DataFrame from 'normalize_pulses'.
+        max_description_chars (int, optional): If given, longer descriptions are truncated to this length.
+
+    Returns:
+        list: One string per pulse.
+    """
+    descriptions = normalized_data['threat_description'].fillna('').astype(str).str.replace(r'\s+', ' ', regex=True).str.strip()
+    if max_description_chars is not None:
+        descriptions = descriptions.map(lambda description: truncate_text(description, max_description_chars))
+    return [
+        f"{name} | {ioc_count} | {description}"
+        for name, ioc_count, description in zip(normalized_data['threat_name'], normalized_data['ioc_count'], descriptions)
+    ]
+
+
+def pack_chunks(lines, max_tokens=MAP_CHUNK_TOKENS):
+    """
+    Packs lines of text into chunks that each fit within a token budget.
+
+    A single line longer than the budget is cut down to fit, so no chunk is ever too large.
+
+    Args:
+        lines (list): The lines to pack, in order.
+        max_tokens (int): The approximate token budget per chunk.
+
+    Returns:
+        list: A list of chunks, each a single string of newline-separated lines.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks, current, current_chars = [], [], 0
+    for line in lines:
+        line = line[:max_chars]
+        if current and current_chars + len(line) + 1 > max_chars:
+            chunks.append("\n".join(current))
+            current, current_chars = [], 0
+        current.append(line)
+        current_chars += len(line) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+async def _asummarize(texts, llm, template, max_concurrency, cache=None):
+    """Summarises each text with the given template, concurrently, reusing cached answers where possible."""
+    model_name = getattr(llm, "model", None) or getattr(llm, "model_name", None) or type(llm).__name__
+    temperature = getattr(llm, "temperature", None)
+    keys = [make_cache_key(model_name, temperature, template, text) for text in texts] if cache is not None else None
+
+    summaries = [cache.get(key) for key in keys] if cache is not None else [None] * len(texts)
+    pending = [i for i, summary in enumerate(summaries) if summary is None]
+    if pending:
+        chain = get_chain(llm, template, "pulses")
+        # 'abatch' sends the calls concurrently, never more than 'max_concurrency' at a time.
+        results = await chain.abatch(
+            [{"pulses": texts[i]} for i in pending],
+            config={"max_concurrency": max_concurrency},
+        )
+        for i, summary in zip(pending, results):
+            summaries[i] = summary
+            record_llm_call(estimate_tokens(template.format(pulses=texts[i])), estimate_tokens(summary))
+            if cache is not None:
+                cache.set(keys[i], summary)
+    return summaries
+
+
+async def agenerate_map_reduce_report(normalized_data, llm, final_prompt_template, chunk_tokens=MAP_CHUNK_TOKENS,
+                                      max_concurrency=MAP_MAX_CONCURRENCY, cache=None, trend_context=None):
+    """
+    Generates a report from every pulse using map-reduce summarisation.
+
+    Args:
+        normalized_data (pd.DataFrame): A DataFrame from 'normalize_pulses'.
+        llm: An initialized LangChain LLM or chat model.
+        final_prompt_template (str): The report prompt, with a '{data_summary}' placeholder.
+        chunk_tokens (int): The approximate token budget for each chunk of pulse data.
+        max_concurrency (int): Maximum number of LLM calls in flight at once.
+        cache (LLMCache, optional): If given, summaries of unchanged chunks are reused.
+        trend_context (str, optional): Trend lines added to the combined summary for the final report.
+
+    Returns:
+        str: The generated report text.
+    """
+    if not isinstance(normalized_data, pd.DataFrame) or normalized_data.empty:
+        return "No threat data available to generate a report."
+
+    # Map: summarise every chunk of pulses in parallel.
+    chunks = pack_chunks(render_pulse_lines(normalized_data), max_tokens=chunk_tokens)
+    print(f"Map-reduce: summarising {len(normalized_data)} pulses in {len(chunks)} chunks.")
+    summaries = await _asummarize(chunks, llm, MAP_PROMPT_TEMPLATE, max_concurrency, cache=cache)
+
+    # Collapse: while the summaries are too long for one prompt, merge them in groups.
+    while len(summaries) > 1 and estimate_tokens("\n\n".join(summaries)) > chunk_tokens:
+        groups = pack_chunks(summaries, max_tokens=chunk_tokens)
+        if len(groups) == len(summaries):
+            # Each summary already fills a chunk on its own; merge pairs so we always make progress.
+            groups = ["\n\n".join(summaries[i:i + 2]) for i in range(0, len(summaries), 2)]
+        print(f"Map-reduce: collapsing {len(summaries)} summaries into {len(groups)}.")
+        summaries = await _asummarize(groups, llm, COLLAPSE_PROMPT_TEMPLATE, max_concurrency, cache=cache)
+
+    # Reduce: turn the combined summary into the final executive report.
+    final_chain = get_chain(llm, final_prompt_template, "data_summary")
+    data_summary = "\n\n".join(summaries)
+    if trend_context:
+        data_summary += f"\n\nTrends:\n{trend_context}"
+    report = await final_chain.ainvoke({"data_summary": data_summary})
+    record_llm_call(estimate_tokens(final_prompt_template.format(data_summary=data_summary)), estimate_tokens(report))
+    return report
+
+
+def generate_map_reduce_report(normalized_data, llm, final_prompt_template, chunk_tokens=MAP_CHUNK_TOKENS,
+                               max_concurrency=MAP_MAX_CONCURRENCY, cache=None, trend_context=None):
+    """
+    Blocking wrapper around 'agenerate_map_reduce_report' for synchronous callers.
+
+    Takes the same arguments and returns the same report text.
+    """
+    return asyncio.run(agenerate_map_reduce_report(
+        normalized_data, llm, final_prompt_template,
+        chunk_tokens=chunk_tokens, max_concurrency=max_concurrency, cache=cache, trend_context=trend_context,
+    ))
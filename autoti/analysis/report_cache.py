@@ -0,0 +1,292 @@
+# This script provides an in-process cache for generated threat reports.
+# Running the pipeline means downloading from OTX, normalizing and calling the LLM, which
+# takes seconds and costs money, so the web app should not do it on every page view.
+#
+# The cache follows three rules:
+# - Fresh: a report younger than the TTL is served straight from memory.
+# - Stale-while-revalidate: an older report is still served instantly, while a refresh
+#   runs in the background.
+# - Single-flight: however many requests arrive at once, only one pipeline run is in flight;
+#   everyone else waits for (or is served from) that same run. This includes streamed runs
+#   (see 'ReportCache.stream'), whose events are shared by every client that asks for them.
+
+import os
+import asyncio
+import threading
+import time
+
+from autoti.metrics import record_cache_lookup
+
+# --- CACHE CONFIGURATION ---
+# How long (in seconds) a generated report is considered fresh.
+REPORT_CACHE_TTL = int(os.environ.get("AUTOTI_REPORT_CACHE_TTL", 900))
+
+
+class ReportCache:
+    """
+    A thread-safe, single-value cache around a report-producing function such as 'run_pipeline'.
+    """
+
+    def __init__(self, loader, ttl=REPORT_CACHE_TTL):
+        """
+        Args:
+            loader (callable): A function with no arguments that produces a fresh report.
+            ttl (int): Number of seconds a report stays fresh.
+        """
+        self._loader = loader
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._report = None
+        self._updated_at = None
+        self._last_error = None
+        # Set while a refresh is running; waiters block on it until the refresh finishes.
+        self._in_flight = None
+        # The events of the in-flight run, if it is a streamed one.
+        self._streamed_run = None
+
+    @property
+    def updated_at(self):
+        """The time (as a UNIX timestamp) the cached report was produced, or None if there is none yet."""
+        return self._updated_at
+
+    def get(self):
+        """
+        Returns the cached report, refreshing it if needed.
+
+        Only the very first call (or a call made after every refresh so far has failed)
+        has to wait for the pipeline. Any later call returns immediately, starting a
+        background refresh if the cached report is stale.
+
+        Returns:
+            str: The report text.
+
+        Raises:
+            Exception: Whatever the loader raised, if there is no cached report to fall back to.
+        """
+        with self._lock:
+            report = self._cached_locked()
+            if report is not None:
+                return report
+            in_flight = self._start_refresh_locked()
+
+        # Nothing cached yet, so wait for the shared in-flight run to finish.
+        in_flight.wait()
+        with self._lock:
+            if self._report is None and self._last_error is not None:
+                raise self._last_error
+            return self._report
+
+    def refresh(self):
+        """Starts a background refresh (unless one is already running) and returns immediately."""
+        with self._lock:
+            self._start_refresh_locked()
+
+    def stream(self, streamer):
+        """
+        Yields the report as '(event, data)' pairs, like 'stream_pipeline'.
+
+        A cached report is sent at once as a 'token' and a 'done' event (a stale one also starts a
+        background refresh). Otherwise the report is streamed from a single run shared by every
+        caller: the first caller starts it in a background thread, and each later caller receives
+        all of its events from the beginning. If a non-streamed refresh is already running, its
+        report is sent when it finishes. A run that fails ends with a 'failed' event.
+
+        Args:
+            streamer (callable): A function with no arguments that yields '(event, data)' pairs,
+                                 ending with ('done', report) or ('failed', error message).
+
+        Yields:
+            tuple: '(event, data)' pairs.
+        """
+        with self._lock:
+            report = self._cached_locked()
+            if report is None:
+                run = self._streamed_run
+                if self._in_flight is None:
+                    run = self._start_stream_locked(streamer)
+                in_flight = self._in_flight
+
+        if report is not None:
+            yield "token", report
+            yield "done", report
+            return
+        if run is not None:
+            yield from run
+            return
+
+        yield "progress", "Waiting for the report that is already being generated..."
+        in_flight.wait()
+        with self._lock:
+            report, error = self._report, self._last_error
+        if report is None:
+            yield "failed", str(error or "Report generation failed.")
+            return
+        yield "token", report
+        yield "done", report
+
+    def _cached_locked(self):
+        """
+        Returns the cached report (starting a refresh if it is stale), or None if there is none.
+        Must be called with the lock held.
+        """
+        record_cache_lookup("report", self._report is not None)
+        if self._report is not None and time.time() - self._updated_at >= self._ttl:
+            self._start_refresh_locked()
+        return self._report
+
+    def _start_stream_locked(self, streamer):
+        """Starts a streamed run in a background thread. Must be called with the lock held and nothing in flight."""
+        self._in_flight = threading.Event()
+        self._streamed_run = _StreamedRun()
+        threading.Thread(target=self._run_stream, args=(streamer, self._streamed_run, self._in_flight), daemon=True).start()
+        return self._streamed_run
+
+    def _run_stream(self, streamer, run, in_flight):
+        """Runs a streamed pipeline, sharing its events and publishing its report to the cache."""
+        try:
+            for event, data in streamer():
+                if event == "done":
+                    # Published before the event is sent, so a client that reconnects on 'done' hits the cache.
+                    self._publish(data)
+                elif event == "failed":
+                    print(f"Report refresh failed: {data}")
+                    with self._lock:
+                        self._last_error = RuntimeError(data)
+                run.append(event, data)
+        except Exception as e:
+            print(f"Report refresh failed: {e}")
+            with self._lock:
+                self._last_error = e
+            run.append("failed", str(e))
+        finally:
+            with self._lock:
+                self._in_flight = None
+                self._streamed_run = None
+            run.finish()
+            in_flight.set()
+
+    def _publish(self, report):
+        """Stores a newly generated report as the fresh one."""
+        with self._lock:
+            self._report = report
+            self._updated_at = time.time()
+            self._last_error = None
+
+    def _start_refresh_locked(self):
+        """Starts a refresh thread if none is running. Must be called with the lock held."""
+        if self._in_flight is None:
+            self._in_flight = threading.Event()
+            threading.Thread(target=self._run_refresh, args=(self._in_flight,), daemon=True).start()
+        return self._in_flight
+
+    def _run_refresh(self, in_flight):
+        """Runs the loader and publishes its result to the cache."""
+        try:
+            report = self._loader()
+        except Exception as e:
+            print(f"Report refresh failed: {e}")
+            with self._lock:
+                self._last_error = e
+        else:
+            self._publish(report)
+        finally:
+            with self._lock:
+                self._in_flight = None
+            in_flight.set()
+
+
+class _StreamedRun:
+    """The events of one streamed pipeline run, replayed in full to every reader, however late it joins."""
+
+    def __init__(self):
+        self._events = []
+        self._finished = False
+        self._condition = threading.Condition()
+
+    def append(self, event, data):
+        with self._condition:
+            self._events.append((event, data))
+            self._condition.notify_all()
+
+    def finish(self):
+        with self._condition:
+            self._finished = True
+            self._condition.notify_all()
+
+    def __iter__(self):
+        position = 0
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: len(self._events) > position or self._finished)
+                events, finished = self._events[position:], self._finished
+            position += len(events)
+            yield from events
+            if finished:
+                return
+
+
+class AsyncReportCache:
+    """
+    The asyncio counterpart of 'ReportCache', for use inside an event loop (e.g. the ASGI app).
+
+    It follows the same fresh / stale-while-revalidate / single-flight rules, but the loader
+    is a coroutine function and waiting callers await a shared task instead of blocking a thread.
+    """
+
+    def __init__(self, loader, ttl=REPORT_CACHE_TTL):
+        """
+        Args:
+            loader (callable): A coroutine function with no arguments that produces a fresh report.
+            ttl (int): Number of seconds a report stays fresh.
+        """
+        self._loader = loader
+        self._ttl = ttl
+        self._report = None
+        self._updated_at = None
+        self._in_flight = None
+
+    @property
+    def updated_at(self):
+        """The time (as a UNIX timestamp) the cached report was produced, or None if there is none yet."""
+        return self._updated_at
+
+    async def get(self):
+        """
+        Returns the cached report, refreshing it if needed.
+
+        Returns:
+            str: The report text.
+
+        Raises:
+            Exception: Whatever the loader raised, if there is no cached report to fall back to.
+        """
+        record_cache_lookup("report", self._report is not None)
+        if self._report is not None:
+            if time.time() - self._updated_at >= self._ttl:
+                self._start_refresh()
+            return self._report
+        # 'shield' keeps the shared refresh running even if this particular request is cancelled.
+        return await asyncio.shield(self._start_refresh())
+
+    def _start_refresh(self):
+        """Starts a refresh task if none is running, and returns the in-flight task."""
+        if self._in_flight is None:
+            self._in_flight = asyncio.ensure_future(self._run_refresh())
+            # Background refreshes may have no one awaiting them; mark their errors as handled
+            # (they are already printed) so asyncio does not warn about them.
+            self._in_flight.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return self._in_flight
+
+    async def _run_refresh(self):
+        """Runs the loader and publishes its result to the cache."""
+        try:
+            report = await self._loader()
+        except Exception as e:
+            print(f"Report refresh failed: {e}")
+            raise
+        else:
+            self._report = report
+            self._updated_at = time.time()
+            return report
+        finally:
+            self._in_flight = None
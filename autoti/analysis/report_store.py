@@ -0,0 +1,98 @@
+# This script stores generated reports on disk as versioned artifacts.
+# The scheduler writes a new version after every pipeline run, and the web app simply
+# reads the latest one, so serving a page never has to wait for OTX or the LLM.
+
+import os
+import json
+import tempfile
+from datetime import datetime
+
+# --- STORE CONFIGURATION ---
+# Directory where report versions are written.
+REPORT_DIR = os.environ.get("AUTOTI_REPORT_DIR", "reports")
+# Number of report versions to keep. Older versions are deleted after each save.
+REPORT_HISTORY_LIMIT = int(os.environ.get("AUTOTI_REPORT_HISTORY_LIMIT", 48))
+# Name of the file that always holds a copy of the most recent report.
+LATEST_REPORT_FILE = "latest.json"
+
+
+def _write_json_atomically(path, payload):
+    """Writes JSON to a temporary file and renames it into place, so readers never see a partial file."""
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as tmp_file:
+            json.dump(payload, tmp_file)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def save_report(report_text, report_dir=REPORT_DIR, history_limit=REPORT_HISTORY_LIMIT):
+    """
+    Saves a report as a new version and marks it as the latest.
+
+    Args:
+        report_text (str): The generated report.
+        report_dir (str): Directory where report versions are written.
+        history_limit (int): Number of versions to keep.
+
+    Returns:
+        dict: The saved artifact, with 'version', 'generated_at' and 'report' keys.
+    """
+    os.makedirs(report_dir, exist_ok=True)
+    generated_at = datetime.now()
+    artifact = {
+        "version": generated_at.strftime("%Y%m%dT%H%M%S%f"),
+        "generated_at": generated_at.isoformat(),
+        "report": report_text,
+    }
+
+    _write_json_atomically(os.path.join(report_dir, f"report-{artifact['version']}.json"), artifact)
+    _write_json_atomically(os.path.join(report_dir, LATEST_REPORT_FILE), artifact)
+
+    # Versions sort chronologically by name, so everything before the newest N can go.
+    versions = list_report_versions(report_dir)
+    for old_version in versions[:-history_limit] if history_limit else []:
+        os.remove(os.path.join(report_dir, f"report-{old_version}.json"))
+    return artifact
+
+
+def list_report_versions(report_dir=REPORT_DIR):
+    """
+    Lists the stored report versions, oldest first.
+
+    Args:
+        report_dir (str): Directory where report versions are written.
+
+    Returns:
+        list: Version identifiers, which can be passed to 'load_report'.
+    """
+    if not os.path.isdir(report_dir):
+        return []
+    return sorted(
+        name[len("report-"):-len(".json")]
+        for name in os.listdir(report_dir)
+        if name.startswith("report-") and name.endswith(".json")
+    )
+
+
+def load_report(version=None, report_dir=REPORT_DIR):
+    """
+    Loads a stored report.
+
+    Args:
+        version (str, optional): The version to load. Defaults to the latest report.
+        report_dir (str): Directory where report versions are written.
+
+    Returns:
+        dict: The artifact with 'version', 'generated_at' and 'report' keys.
+              Returns None if there is no such report.
+    """
+    file_name = f"report-{version}.json" if version else LATEST_REPORT_FILE
+    try:
+        with open(os.path.join(report_dir, file_name), encoding="utf-8") as report_file:
+            return json.load(report_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
@@ -0,0 +1,158 @@
+# This script provides the JSON API over the pulses and indicators the pipeline has collected.
+# Other tools (e.g. SIEM integrations) can query it instead of going back to OTX themselves.
+# The data comes from the indexed local store every pipeline run writes to (see
+# 'autoti.processing.intel_store'), so no request ever waits on OTX or the LLM.
+#
+# Endpoints (all return JSON):
+# - /api/pulses: pulses, newest first. Filters: 'since', 'until', 'type' (pulses with an indicator of that type).
+# - /api/iocs: indicators, newest first. Filters: 'since', 'until', 'type', 'pulse_id'.
+# - /api/iocs/lookup?value=...: the pulses that reported an indicator. 'value' may be repeated
+#   (POST a JSON body '{"values": [...]}' for larger batches).
+# - /api/trends: what grew over the last 'days' days, and the most reported indicators
+#   (precomputed by 'autoti.processing.trends').
+#
+# List endpoints are paged: pass the 'next_cursor' of one page as 'cursor' to get the next.
+# Responses are gzip-compressed for clients that accept it.
+
+import os
+import gzip
+import threading
+
+from flask import Blueprint, request, jsonify
+
+from autoti.processing.intel_store import IntelStore
+
+# --- API CONFIGURATION ---
+# Default and maximum number of items per page.
+API_PAGE_SIZE = int(os.environ.get("AUTOTI_API_PAGE_SIZE", 100))
+API_MAX_PAGE_SIZE = 1000
+# Maximum number of indicator values in one lookup.
+API_MAX_LOOKUP_VALUES = 1000
+# Responses smaller than this many bytes are sent uncompressed, since gzip would barely shrink them.
+API_COMPRESS_MIN_BYTES = 1024
+# gzip compression level: 6 is zlib's default trade-off between speed and size.
+API_COMPRESS_LEVEL = 6
+
+api = Blueprint('api', __name__, url_prefix='/api')
+
+# The store is opened on the first API request, so it costs nothing for apps that never use the API.
+_store = None
+_trend_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Returns the process-wide store, opening it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = IntelStore()
+    return _store
+
+
+def get_trend_store():
+    """Returns the process-wide trend store, opening it on first use."""
+    global _trend_store
+    if _trend_store is None:
+        with _store_lock:
+            if _trend_store is None:
+                # Imported here so numpy is only loaded once trends are first requested.
+                from autoti.processing.trends import TrendStore
+                _trend_store = TrendStore()
+    return _trend_store
+
+
+@api.errorhandler(ValueError)
+def bad_request(err):
+    """Invalid parameters (a malformed timestamp, cursor or limit) are reported as a 400 response."""
+    return jsonify(error=str(err)), 400
+
+
+def _page_size():
+    """Reads the 'limit' parameter, within 1 and API_MAX_PAGE_SIZE."""
+    try:
+        limit = int(request.args.get('limit', API_PAGE_SIZE))
+    except ValueError:
+        raise ValueError("'limit' must be an integer.") from None
+    return max(1, min(limit, API_MAX_PAGE_SIZE))
+
+
+@api.route('/pulses')
+def list_pulses():
+    """Lists pulses, newest first."""
+    items, next_cursor = get_store().query_pulses(
+        since=request.args.get('since'),
+        until=request.args.get('until'),
+        ioc_type=request.args.get('type'),
+        limit=_page_size(),
+        cursor=request.args.get('cursor'),
+    )
+    return jsonify(items=items, next_cursor=next_cursor)
+
+
+@api.route('/iocs')
+def list_iocs():
+    """Lists indicators, newest first."""
+    items, next_cursor = get_store().query_iocs(
+        since=request.args.get('since'),
+        until=request.args.get('until'),
+        ioc_type=request.args.get('type'),
+        pulse_id=request.args.get('pulse_id'),
+        limit=_page_size(),
+        cursor=request.args.get('cursor'),
+    )
+    return jsonify(items=items, next_cursor=next_cursor)
+
+
+@api.route('/iocs/lookup', methods=['GET', 'POST'])
+def lookup_iocs():
+    """Finds the pulses that reported each of the given indicator values."""
+    if request.method == 'POST':
+        values = (request.get_json(silent=True) or {}).get('values')
+        if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+            raise ValueError("The request body must be a JSON object with a 'values' list of strings.")
+    else:
+        values = request.args.getlist('value')
+    values = [value for value in values if value.strip()]
+    if not values:
+        raise ValueError("At least one indicator 'value' is required.")
+    if len(values) > API_MAX_LOOKUP_VALUES:
+        raise ValueError(f"At most {API_MAX_LOOKUP_VALUES} values can be looked up at once.")
+
+    matches = get_store().lookup(values)
+    return jsonify(results=[{'value': value, 'matches': matches[value]} for value in dict.fromkeys(values)])
+
+
+@api.route('/trends')
+def trends():
+    """Returns the precomputed threat trends."""
+    from autoti.processing.trends import TREND_WINDOW_DAYS, TREND_DAILY_RETENTION_DAYS, TREND_TOP_N, HEAVY_HITTER_CANDIDATES
+
+    try:
+        days = int(request.args.get('days', TREND_WINDOW_DAYS))
+        top_n = int(request.args.get('limit', TREND_TOP_N))
+    except ValueError:
+        raise ValueError("'days' and 'limit' must be integers.") from None
+    # Two windows are compared, so each can cover at most half of the kept history.
+    days = max(1, min(days, TREND_DAILY_RETENTION_DAYS // 2))
+    top_n = max(1, min(top_n, HEAVY_HITTER_CANDIDATES))
+    return jsonify(get_trend_store().summary(window_days=days, top_n=top_n))
+
+
+@api.after_request
+def compress(response):
+    """Gzip-compresses large responses for clients that accept it."""
+    response.vary.add('Accept-Encoding')
+    if (
+        response.direct_passthrough
+        or 'Content-Encoding' in response.headers
+        or 'gzip' not in request.headers.get('Accept-Encoding', '').lower()
+    ):
+        return response
+    body = response.get_data()
+    if len(body) < API_COMPRESS_MIN_BYTES:
+        return response
+    response.set_data(gzip.compress(body, compresslevel=API_COMPRESS_LEVEL))
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
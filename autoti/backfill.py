@@ -0,0 +1,259 @@
+# This script backfills months of OTX history into partitioned columnar files.
+# Normalizing a day of pulses is fine on one core, but a backfill covers hundreds of days,
+# so the work is split into one partition per creation day and normalized in a process pool.
+#
+# The backfill runs in two stages:
+# 1. Fetch: pulses are streamed from OTX once (pages are already fetched in parallel by the
+#    collector) and spooled to one JSON-lines file per creation day. OTX only supports a
+#    'modified_since' filter, so fetching each window separately would download everything
+#    after that window again; a single pass avoids that.
+# 2. Normalize: each day's spool file is normalized in a separate process and written to the
+#    columnar store (see 'autoti.processing.columnar_store'), under
+#    'pulses/creation_day=YYYY-MM-DD/' and 'iocs/creation_day=YYYY-MM-DD/'.
+#
+# Both stages are resumable. The fetch checkpoints every page once its pulses are spooled, so an
+# interrupted fetch only requests the pages it had not saved yet, and a finished fetch leaves a
+# marker so it is not repeated. Each finished partition leaves a '_SUCCESS' file so it is skipped
+# on the next run.
+
+import os
+import json
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta, timezone
+
+from autoti.collection.feeds import merge_pulses
+from autoti.collection.otx_collector import create_session, iter_numbered_pulse_pages, OTX_API_KEY
+from autoti.processing.data_normalizer import normalize_pulses, normalize_indicators
+from autoti.processing.columnar_store import COLUMNAR_FORMAT, write_normalized
+
+# --- BACKFILL CONFIGURATION ---
+# Default directory for backfill output.
+BACKFILL_DIR = os.environ.get("AUTOTI_BACKFILL_DIR", "data")
+# Default number of worker processes. None lets the pool use every CPU core.
+BACKFILL_WORKERS = int(os.environ["AUTOTI_BACKFILL_WORKERS"]) if os.environ.get("AUTOTI_BACKFILL_WORKERS") else None
+# Marker files used to make the backfill resumable.
+FETCH_COMPLETE_MARKER = "_FETCH_COMPLETE"
+# Records the range being fetched, when the fetch started, and every page already spooled.
+FETCH_CHECKPOINT = "_FETCH_CHECKPOINT"
+PARTITION_COMPLETE_MARKER = "_SUCCESS"
+
+
+def day_windows(start, end):
+    """
+    Splits a date range into one window per day.
+
+    Args:
+        start (date): The first day, inclusive.
+        end (date): The last day, exclusive.
+
+    Returns:
+        list: The days in the range, as 'date' objects.
+    """
+    return [start + timedelta(days=offset) for offset in range((end - start).days)]
+
+
+def partition_path(output_dir, table, day):
+    """Returns the directory of one day's partition of a table ('pulses' or 'iocs')."""
+    return os.path.join(output_dir, table, f"creation_day={day.isoformat()}")
+
+
+def _read_checkpoint(path):
+    """Returns the checkpoint of an interrupted fetch as (range, start time, spooled page numbers), or None."""
+    try:
+        with open(path, encoding="utf-8") as checkpoint_file:
+            header = json.loads(checkpoint_file.readline())
+            # A page number cut short by an interruption is not counted, so that page is fetched again.
+            pages = {int(line) for line in checkpoint_file if line.strip().isdigit() and line.endswith("\n")}
+    except (OSError, ValueError):
+        return None
+    return header.get("range"), header.get("started"), pages
+
+
+def _drop_partial_line(path):
+    """Truncates a spool file after its last complete line, removing a pulse cut short by an interruption."""
+    with open(path, "rb+") as spool_file:
+        position = spool_file.seek(0, os.SEEK_END)
+        while position > 0:
+            step = min(64 * 1024, position)
+            position -= step
+            spool_file.seek(position)
+            newline = spool_file.read(step).rfind(b"\n")
+            if newline >= 0:
+                spool_file.truncate(position + newline + 1)
+                return
+        spool_file.truncate(0)
+
+
+def spool_pulses(api_key, start, end, output_dir):
+    """
+    Stage 1: streams every pulse created in the range from OTX into one JSON-lines file per day.
+
+    Each page is recorded in a checkpoint once its pulses are spooled. If an earlier fetch of the
+    same range was interrupted, only the pages it had not recorded are requested, followed by the
+    pulses modified since it started (which may have moved to pages it already saved). A pulse
+    spooled twice is only kept once, by 'normalize_partition'.
+
+    Args:
+        api_key (str): Your AlienVault OTX API key.
+        start (date): The first day, inclusive.
+        end (date): The last day, exclusive.
+        output_dir (str): The backfill output directory.
+
+    Returns:
+        int: The number of pulses spooled by this call.
+
+    Raises:
+        requests.exceptions.RequestException: If any page fails, so the fetch is not marked complete.
+    """
+    spool_dir = os.path.join(output_dir, "_spool")
+    checkpoint_path = os.path.join(spool_dir, FETCH_CHECKPOINT)
+    fetch_range = f"{start.isoformat()}/{end.isoformat()}"
+
+    checkpoint = _read_checkpoint(checkpoint_path)
+    if checkpoint is not None and checkpoint[0] == fetch_range:
+        _, started, done_pages = checkpoint
+        for name in os.listdir(spool_dir):
+            if name.endswith(".jsonl"):
+                _drop_partial_line(os.path.join(spool_dir, name))
+        print(f"Backfill: resuming the fetch, {len(done_pages)} pages already spooled.")
+    else:
+        # The spool holds nothing for this range, so start it from scratch.
+        shutil.rmtree(spool_dir, ignore_errors=True)
+        os.makedirs(spool_dir)
+        started, done_pages = datetime.now(timezone.utc).replace(tzinfo=None).isoformat(timespec="seconds"), set()
+        with open(checkpoint_path, "w", encoding="utf-8") as checkpoint_file:
+            checkpoint_file.write(json.dumps({"range": fetch_range, "started": started}) + "\n")
+
+    spool_files = {}
+    spooled = 0
+
+    def spool(pulses):
+        nonlocal spooled
+        written = []
+        for pulse in pulses:
+            created = (pulse.get("created") or "")[:10]
+            if not (start.isoformat() <= created < end.isoformat()):
+                continue
+            if created not in spool_files:
+                spool_files[created] = open(os.path.join(spool_dir, f"{created}.jsonl"), "a", encoding="utf-8")
+            spool_files[created].write(json.dumps(pulse) + "\n")
+            written.append(spool_files[created])
+            spooled += 1
+        for spool_file in set(written):
+            spool_file.flush()
+
+    try:
+        with create_session(api_key) as session, open(checkpoint_path, "a", encoding="utf-8") as checkpoint_file:
+            # Any pulse created in the range was also modified in or after it, so this catches them all.
+            since = datetime.combine(start, datetime.min.time())
+            for page_number, page in iter_numbered_pulse_pages(session, since=since, skip_pages=done_pages):
+                spool(page)
+                # The page is only recorded once its pulses are on disk.
+                checkpoint_file.write(f"{page_number}\n")
+                checkpoint_file.flush()
+            if done_pages:
+                for _, page in iter_numbered_pulse_pages(session, since=started):
+                    spool(page)
+    finally:
+        for spool_file in spool_files.values():
+            spool_file.close()
+    return spooled
+
+
+def normalize_partition(spool_path, output_dir, day, file_format=COLUMNAR_FORMAT):
+    """
+    Stage 2: normalizes one day's spooled pulses and writes them to the columnar store.
+
+    This runs in a worker process, so it only takes plain, picklable arguments.
+
+    Args:
+        spool_path (str): The day's JSON-lines spool file.
+        output_dir (str): The backfill output directory.
+        day (date): The creation day of the partition.
+        file_format (str): 'parquet' or 'feather'.
+
+    Returns:
+        tuple: The day, and the number of pulses and indicators written.
+    """
+    with open(spool_path, encoding="utf-8") as spool_file:
+        # A resumed fetch can spool a pulse more than once; the most recently modified copy is kept.
+        raw_pulses = merge_pulses([[json.loads(line) for line in spool_file]])
+
+    df_pulses = normalize_pulses(raw_pulses, verbose=False).drop(columns=["indicators"], errors="ignore")
+    df_iocs = normalize_indicators(raw_pulses)
+
+    # The spool holds the whole day, so the day's partition is replaced rather than added to.
+    write_normalized(df_pulses, df_iocs, output_dir, file_format=file_format, replace=True)
+
+    # The marker is written last, so a partition interrupted half-way is redone next time.
+    pulses_dir = partition_path(output_dir, "pulses", day)
+    os.makedirs(pulses_dir, exist_ok=True)
+    open(os.path.join(pulses_dir, PARTITION_COMPLETE_MARKER), "w").close()
+    return day, len(df_pulses), len(df_iocs)
+
+
+def run_backfill(start, end, output_dir=BACKFILL_DIR, api_key=OTX_API_KEY, workers=BACKFILL_WORKERS):
+    """
+    Backfills OTX pulses created between 'start' and 'end' into partitioned Parquet files.
+
+    Args:
+        start (date): The first day, inclusive.
+        end (date): The last day, exclusive.
+        output_dir (str): The backfill output directory.
+        api_key (str): Your AlienVault OTX API key.
+        workers (int, optional): Number of worker processes. Defaults to the number of CPU cores.
+
+    Returns:
+        int: The number of partitions written by this run.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    spool_dir = os.path.join(output_dir, "_spool")
+    fetch_marker = os.path.join(spool_dir, FETCH_COMPLETE_MARKER)
+
+    # The spool is only reused if it was made for exactly this range.
+    fetch_range = f"{start.isoformat()}/{end.isoformat()}"
+    completed_range = None
+    if os.path.exists(fetch_marker):
+        with open(fetch_marker) as marker_file:
+            completed_range = marker_file.read()
+    if completed_range == fetch_range:
+        print(f"Backfill: reusing completed fetch for {fetch_range}.")
+    else:
+        print(f"Backfill: fetching pulses created in {fetch_range}...")
+        spooled = spool_pulses(api_key, start, end, output_dir)
+        with open(fetch_marker, "w") as marker_file:
+            marker_file.write(fetch_range)
+        print(f"Backfill: spooled {spooled} pulses.")
+
+    # Only days with data that have not been finished by an earlier run need work.
+    pending = [
+        day for day in day_windows(start, end)
+        if os.path.exists(os.path.join(spool_dir, f"{day.isoformat()}.jsonl"))
+        and not os.path.exists(os.path.join(partition_path(output_dir, "pulses", day), PARTITION_COMPLETE_MARKER))
+    ]
+    print(f"Backfill: normalizing {len(pending)} partitions.")
+
+    written = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(normalize_partition, os.path.join(spool_dir, f"{day.isoformat()}.jsonl"), output_dir, day): day
+            for day in pending
+        }
+        for future in as_completed(futures):
+            try:
+                day, pulse_count, ioc_count = future.result()
+            except Exception as e:
+                # One bad partition should not stop the rest; it will be retried on the next run.
+                print(f"Backfill: partition {futures[future].isoformat()} failed: {e}")
+                continue
+            written += 1
+            print(f"Backfill: wrote {day.isoformat()} ({pulse_count} pulses, {ioc_count} indicators).")
+
+    print(f"Backfill finished: {written} of {len(pending)} partitions written to {output_dir}.")
+    return written
+
+
+def parse_day(value):
+    """Parses a 'YYYY-MM-DD' string into a date, for command-line arguments."""
+    return date.fromisoformat(value)
@@ -0,0 +1,77 @@
+# This script is the command-line entry point for AutoTI.
+# After installing the package, it is available as the 'autoti' command
+# (or 'python -m autoti').
+#
+# Commands:
+#   autoti run                 Run the pipeline once and print the report.
+#   autoti schedule            Run the pipeline on a fixed schedule, saving each report.
+#   autoti backfill            Backfill a date range of OTX history into partitioned Parquet files.
+
+import argparse
+
+from autoti.analysis.report_store import REPORT_DIR, save_report
+from autoti.scheduler import SCHEDULE_INTERVAL, ReportScheduler
+from autoti.backfill import BACKFILL_DIR, BACKFILL_WORKERS, parse_day, run_backfill
+
+
+def _run(args):
+    """Runs the pipeline once, prints the report and optionally saves it."""
+    from autoti.analysis.langchain_agent import run_pipeline
+
+    report_text = run_pipeline()
+    print("\n--- Final Threat Intelligence Report ---")
+    print(report_text)
+    if args.save:
+        artifact = save_report(report_text, report_dir=args.report_dir)
+        print(f"\nSaved report version {artifact['version']} to {args.report_dir}.")
+
+
+def _schedule(args):
+    """Runs the pipeline every '--interval' seconds until interrupted."""
+    scheduler = ReportScheduler(interval=args.interval, report_dir=args.report_dir)
+    print(f"Scheduling the pipeline every {args.interval} seconds. Press Ctrl+C to stop.")
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        scheduler.stop()
+        print("\nScheduler stopped.")
+
+
+def _backfill(args):
+    """Backfills the requested date range, resuming any earlier unfinished run."""
+    run_backfill(args.start, args.end, output_dir=args.output_dir, workers=args.workers)
+
+
+def build_parser():
+    """Builds the argument parser for the 'autoti' command."""
+    parser = argparse.ArgumentParser(prog="autoti", description="Automated Threat Intelligence pipeline.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the pipeline once and print the report.")
+    run_parser.add_argument("--save", action="store_true", help="Also save the report as a new version.")
+    run_parser.add_argument("--report-dir", default=REPORT_DIR, help="Directory where reports are saved.")
+    run_parser.set_defaults(func=_run)
+
+    schedule_parser = subparsers.add_parser("schedule", help="Run the pipeline periodically and save each report.")
+    schedule_parser.add_argument("--interval", type=int, default=SCHEDULE_INTERVAL, help="Seconds between runs.")
+    schedule_parser.add_argument("--report-dir", default=REPORT_DIR, help="Directory where reports are saved.")
+    schedule_parser.set_defaults(func=_schedule)
+
+    backfill_parser = subparsers.add_parser("backfill", help="Backfill OTX history into partitioned Parquet files.")
+    backfill_parser.add_argument("--start", type=parse_day, required=True, help="First day (YYYY-MM-DD), inclusive.")
+    backfill_parser.add_argument("--end", type=parse_day, required=True, help="Last day (YYYY-MM-DD), exclusive.")
+    backfill_parser.add_argument("--output-dir", default=BACKFILL_DIR, help="Directory for the partitioned output.")
+    backfill_parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS, help="Number of worker processes.")
+    backfill_parser.set_defaults(func=_backfill)
+
+    return parser
+
+
+def main(argv=None):
+    """Parses the command line and runs the chosen command."""
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,581 @@
+# This script lets the pipeline collect from several threat intelligence feeds, not just OTX.
+# Every feed is a small class that fetches its source and converts it to OTX-shaped pulses
+# (the format 'normalize_pulses' consumes), and registers itself under a type name:
+# - 'otx': AlienVault OTX subscribed pulses (see 'otx_collector').
+# - 'misp': MISP event exports (JSON), from a URL or a file.
+# - 'stix': STIX 2.1 bundles, or TAXII 2.1 collection endpoints.
+# - 'abusech_csv': abuse.ch style CSV feeds (URLhaus, Feodo Tracker, ThreatFox, ...).
+# - 'file': local JSON / JSON-lines files of OTX-shaped pulses.
+#
+# 'collect_feeds' runs every feed concurrently, each with its own timeout and request rate
+# limit, and merges the results. Total collection time is bounded by the slowest feed rather
+# than the sum of all of them, and one failing feed does not stop the others.
+#
+# Feeds are configured with a JSON file (see 'feeds.example.json'), whose path is set
+# in 'AUTOTI_FEEDS_CONFIG'. Without it, only OTX is collected.
+
+import os
+import re
+import csv
+import glob
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime, timedelta, timezone
+
+import requests
+
+from autoti.collection.otx_collector import get_latest_pulses, OTX_API_KEY, REQUEST_TIMEOUT
+from autoti.collection.pulse_store import utc_now
+from autoti.metrics import FEED_PULSES, FEED_FAILURES
+
+# --- FEED CONFIGURATION ---
+# Path of the JSON file listing the feeds to collect. Only OTX is collected when it is not set.
+FEEDS_CONFIG_PATH = os.environ.get("AUTOTI_FEEDS_CONFIG")
+# Default number of seconds a feed may take in total before its results are given up on.
+FEED_TIMEOUT = int(os.environ.get("AUTOTI_FEED_TIMEOUT", 120))
+# Maximum number of feeds collected at the same time.
+FEED_MAX_WORKERS = int(os.environ.get("AUTOTI_FEED_WORKERS", 8))
+
+# The registered feed classes, by type name.
+FEED_TYPES = {}
+
+# Maps MISP attribute types to OTX indicator types.
+MISP_TYPE_MAP = {
+    'ip-dst': 'IPv4', 'ip-src': 'IPv4', 'ip-dst|port': 'IPv4', 'ip-src|port': 'IPv4',
+    'domain': 'domain', 'hostname': 'hostname', 'url': 'URL', 'uri': 'URL',
+    'md5': 'FileHash-MD5', 'sha1': 'FileHash-SHA1', 'sha256': 'FileHash-SHA256',
+    'email-src': 'email', 'email-dst': 'email', 'vulnerability': 'CVE',
+}
+# Maps STIX pattern object paths to OTX indicator types.
+STIX_TYPE_MAP = {
+    'ipv4-addr:value': 'IPv4', 'ipv6-addr:value': 'IPv6', 'domain-name:value': 'domain',
+    'url:value': 'URL', 'email-addr:value': 'email',
+    "file:hashes.MD5": 'FileHash-MD5', "file:hashes.'SHA-1'": 'FileHash-SHA1', "file:hashes.'SHA-256'": 'FileHash-SHA256',
+}
+# Matches each comparison in a STIX pattern, e.g. "[ipv4-addr:value = '198.51.100.1']".
+STIX_COMPARISON = re.compile(r"([\w-]+:[\w.'-]+)\s*=\s*'((?:[^'\\]|\\.)*)'")
+
+
+def register_feed(feed_type):
+    """Class decorator that registers a feed class under a type name, for use in the feeds config."""
+    def decorator(cls):
+        cls.feed_type = feed_type
+        FEED_TYPES[feed_type] = cls
+        return cls
+    return decorator
+
+
+class RateLimiter:
+    """
+    A thread-safe limiter that spaces out requests to a single source.
+    """
+
+    def __init__(self, requests_per_second=None):
+        """
+        Args:
+            requests_per_second (float, optional): The maximum request rate. None means no limit.
+        """
+        self._interval = 1 / requests_per_second if requests_per_second else 0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self):
+        """Blocks until the next request is allowed."""
+        if not self._interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self._interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+def make_pulse(pulse_id, name, description, created, indicators, tags=None, tlp='white', source=None, modified=None):
+    """
+    Builds a pulse dictionary in the OTX format, so every feed produces the same shape.
+
+    Args:
+        pulse_id (str): A unique pulse ID. Feeds prefix their IDs with the feed name.
+        name (str): The pulse title.
+        description (str): The pulse description.
+        created (str): The creation time, as an ISO timestamp.
+        indicators (list): Indicator dictionaries with at least 'indicator' and 'type'.
+        tags (list, optional): Tags for the pulse.
+        tlp (str): The Traffic Light Protocol level.
+        source (str, optional): The name of the feed the pulse came from.
+        modified (str, optional): The last modification time. Defaults to 'created'.
+
+    Returns:
+        dict: The pulse.
+    """
+    # Timestamps are rewritten in UTC, in the same naive ISO format OTX uses, so feeds can be mixed.
+    created = _iso_time(created)
+    return {
+        'id': pulse_id,
+        'name': name,
+        'description': description,
+        'created': created,
+        'modified': _iso_time(modified) if modified else created,
+        'tags': list(tags or []),
+        'tlp': tlp,
+        'source': source,
+        'indicators': [
+            {
+                'id': None,
+                'indicator': indicator['indicator'],
+                'type': indicator['type'],
+                'created': _iso_time(indicator.get('created')) or created,
+                'title': indicator.get('title', ''),
+                'description': indicator.get('description', ''),
+                'expiration': None,
+                'is_active': 1,
+                'role': None,
+            }
+            for indicator in indicators
+        ],
+    }
+
+
+def _parse_time(value):
+    """
+    Parses an ISO timestamp, date or UNIX timestamp into a naive UTC datetime, or None.
+
+    UTC is what OTX uses for its timestamps and for 'modified_since', so every feed is
+    converted to it. Timestamps without an offset are taken to be in UTC already.
+    """
+    if value in (None, ''):
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            if isinstance(value, (int, float)) or str(value).isdigit():
+                return datetime.fromtimestamp(int(value), timezone.utc).replace(tzinfo=None)
+            parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00').replace(' ', 'T', 1))
+        except ValueError:
+            return None
+    return parsed.astimezone(timezone.utc).replace(tzinfo=None) if parsed.tzinfo else parsed
+
+
+def _iso_time(value):
+    """Rewrites a timestamp as a naive UTC ISO string, or returns it unchanged if it cannot be parsed."""
+    parsed = _parse_time(value)
+    return parsed.isoformat() if parsed else value
+
+
+def _is_recent(value, since):
+    """Whether a timestamp is at or after 'since' (a naive UTC datetime). Items without a timestamp are kept."""
+    parsed = _parse_time(value)
+    return parsed is None or parsed >= since
+
+
+def _utc_pulse(pulse):
+    """Rewrites the timestamps of an OTX-shaped pulse (and its indicators) in UTC, like 'make_pulse'."""
+    pulse = dict(pulse)
+    for field in ('created', 'modified'):
+        if pulse.get(field):
+            pulse[field] = _iso_time(pulse[field])
+    if pulse.get('indicators'):
+        pulse['indicators'] = [
+            dict(indicator, created=_iso_time(indicator['created'])) if indicator.get('created') else indicator
+            for indicator in pulse['indicators']
+        ]
+    return pulse
+
+
+def _tlp_from_tags(tags, default='white'):
+    """Finds the TLP level in a list of tags such as 'tlp:amber'."""
+    for tag in tags:
+        if str(tag).lower().startswith('tlp:'):
+            return str(tag)[4:].lower()
+    return default
+
+
+class Feed:
+    """
+    Base class for feeds. Subclasses implement 'collect' and register with 'register_feed'.
+    """
+
+    feed_type = None
+
+    def __init__(self, name, timeout=FEED_TIMEOUT, rate_limit=None):
+        """
+        Args:
+            name (str): A unique name for this feed, used in pulse IDs and messages.
+            timeout (int): Number of seconds the whole collection may take.
+            rate_limit (float, optional): Maximum number of requests per second to this source.
+        """
+        self.name = name
+        self.timeout = timeout
+        self.rate_limiter = RateLimiter(rate_limit)
+
+    def collect(self, since):
+        """
+        Collects the feed's pulses.
+
+        Args:
+            since (datetime): Only pulses created or modified after this time (naive UTC) are wanted.
+
+        Returns:
+            list: OTX-shaped pulse dictionaries.
+        """
+        raise NotImplementedError
+
+    def _read(self, location, headers=None, params=None, auth=None):
+        """Reads a URL (respecting the rate limit) or a local file, and returns the raw bytes."""
+        if not location.startswith(('http://', 'https://')):
+            with open(location, 'rb') as feed_file:
+                return feed_file.read()
+        self.rate_limiter.acquire()
+        response = requests.get(
+            location, headers=headers, params=params, auth=auth, timeout=min(self.timeout, REQUEST_TIMEOUT * 4)
+        )
+        response.raise_for_status()
+        return response.content
+
+
+@register_feed('otx')
+class OTXFeed(Feed):
+    """AlienVault OTX subscribed pulses, collected with the paginated, concurrent OTX collector."""
+
+    def __init__(self, name='otx', api_key=None, **options):
+        super().__init__(name, **options)
+        self.api_key = api_key or OTX_API_KEY
+
+    def collect(self, since):
+        # Every page request is paced by the feed's rate limit and given at most its timeout.
+        pulses = get_latest_pulses(
+            self.api_key, since=since, timeout=min(self.timeout, REQUEST_TIMEOUT), rate_limiter=self.rate_limiter
+        )
+        return [dict(pulse, source=self.name) for pulse in pulses]
+
+
+@register_feed('file')
+class LocalFileFeed(Feed):
+    """Local files of OTX-shaped pulses: a JSON list, an OTX page ('results') or JSON lines."""
+
+    def __init__(self, name, path, **options):
+        """
+        Args:
+            path (str): A file path, or a glob pattern matching several files.
+        """
+        super().__init__(name, **options)
+        self.path = path
+
+    def collect(self, since):
+        pulses = []
+        for path in sorted(glob.glob(self.path)):
+            with open(path, encoding='utf-8') as feed_file:
+                if path.endswith('.jsonl'):
+                    records = [json.loads(line) for line in feed_file if line.strip()]
+                else:
+                    data = json.load(feed_file)
+                    records = data.get('results', []) if isinstance(data, dict) else data
+            pulses.extend(
+                _utc_pulse(dict(pulse, source=self.name)) for pulse in records
+                if _is_recent(pulse.get('modified') or pulse.get('created'), since)
+            )
+        return pulses
+
+
+@register_feed('misp')
+class MISPFeed(Feed):
+    """MISP events, from a JSON export file or a MISP REST search URL."""
+
+    def __init__(self, name, url, api_key=None, **options):
+        """
+        Args:
+            url (str): The URL (e.g. '<misp>/events/restSearch') or path of a MISP JSON export.
+            api_key (str, optional): The MISP automation key, for URLs.
+        """
+        super().__init__(name, **options)
+        self.url = url
+        self.api_key = api_key
+
+    def collect(self, since):
+        headers = {'Accept': 'application/json'}
+        if self.api_key:
+            headers['Authorization'] = self.api_key
+        data = json.loads(self._read(self.url, headers=headers))
+        # Exports come as a single event, a list of events or a REST search response.
+        if isinstance(data, dict):
+            data = data.get('response', [data])
+        events = [item.get('Event', item) for item in data]
+
+        pulses = []
+        for event in events:
+            if not _is_recent(event.get('timestamp') or event.get('date'), since):
+                continue
+            attributes = list(event.get('Attribute', []))
+            for misp_object in event.get('Object', []):
+                attributes.extend(misp_object.get('Attribute', []))
+            indicators = [
+                {
+                    'indicator': str(attribute['value']).split('|')[0],
+                    'type': MISP_TYPE_MAP[attribute['type']],
+                    'description': attribute.get('comment', ''),
+                }
+                for attribute in attributes
+                if attribute.get('type') in MISP_TYPE_MAP and attribute.get('value')
+            ]
+            for indicator in indicators:
+                if indicator['type'] == 'IPv4' and ':' in indicator['indicator']:
+                    indicator['type'] = 'IPv6'
+            tags = [tag.get('name', '') for tag in event.get('Tag', [])]
+            created = _parse_time(event.get('date')) or _parse_time(event.get('timestamp')) or utc_now()
+            modified = _parse_time(event.get('timestamp'))
+            pulses.append(make_pulse(
+                f"{self.name}:{event.get('uuid') or event.get('id')}",
+                event.get('info', 'MISP event'),
+                event.get('info', ''),
+                created.isoformat(),
+                indicators,
+                tags=[tag for tag in tags if not tag.lower().startswith('tlp:')],
+                tlp=_tlp_from_tags(tags),
+                source=self.name,
+                modified=modified.isoformat() if modified else None,
+            ))
+        return pulses
+
+
+@register_feed('stix')
+class STIXFeed(Feed):
+    """STIX 2.1 bundles from a file or URL, or the objects of a TAXII 2.1 collection."""
+
+    def __init__(self, name, url, taxii=False, username=None, password=None, **options):
+        """
+        Args:
+            url (str): A bundle URL or path, or a TAXII collection's '.../objects/' URL.
+            taxii (bool): Whether 'url' is a TAXII 2.1 endpoint, which is paginated.
+            username (str, optional): The TAXII user name.
+            password (str, optional): The TAXII password.
+        """
+        super().__init__(name, **options)
+        self.url = url
+        self.taxii = taxii
+        self.auth = (username, password) if username else None
+
+    def _fetch_objects(self, since):
+        """Fetches every STIX object, following TAXII pagination."""
+        if not self.taxii:
+            return json.loads(self._read(self.url)).get('objects', [])
+        headers = {'Accept': 'application/taxii+json;version=2.1'}
+        params = {'added_after': since.strftime('%Y-%m-%dT%H:%M:%S.000Z')}
+        objects = []
+        while True:
+            envelope = json.loads(self._read(self.url, headers=headers, params=params, auth=self.auth))
+            objects.extend(envelope.get('objects', []))
+            if not (envelope.get('more') and envelope.get('next')):
+                return objects
+            params = {**params, 'next': envelope['next']}
+
+    def collect(self, since):
+        objects = self._fetch_objects(since)
+        indicators = {}
+        for stix_object in objects:
+            if stix_object.get('type') != 'indicator' or not _is_recent(stix_object.get('modified'), since):
+                continue
+            indicators[stix_object['id']] = [
+                {
+                    'indicator': value.replace("\\'", "'"),
+                    'type': STIX_TYPE_MAP[path],
+                    'created': stix_object.get('created'),
+                    'title': stix_object.get('name', ''),
+                    'description': stix_object.get('description', ''),
+                }
+                for path, value in STIX_COMPARISON.findall(stix_object.get('pattern', ''))
+                if path in STIX_TYPE_MAP
+            ]
+
+        # Reports group their indicators into pulses; any indicator outside a report goes into one catch-all pulse.
+        pulses, reported = [], set()
+        for report in (stix_object for stix_object in objects if stix_object.get('type') == 'report'):
+            refs = [ref for ref in report.get('object_refs', []) if ref in indicators]
+            if not refs:
+                continue
+            reported.update(refs)
+            labels = report.get('labels', [])
+            pulses.append(make_pulse(
+                f"{self.name}:{report['id']}",
+                report.get('name', 'STIX report'),
+                report.get('description', ''),
+                report.get('published') or report.get('created'),
+                [indicator for ref in refs for indicator in indicators[ref]],
+                tags=[label for label in labels if not label.lower().startswith('tlp:')],
+                tlp=_tlp_from_tags(labels),
+                source=self.name,
+                modified=report.get('modified'),
+            ))
+        unreported = [indicator for ref, found in indicators.items() if ref not in reported for indicator in found]
+        if unreported:
+            pulses.append(make_pulse(
+                f"{self.name}:indicators:{since.date().isoformat()}",
+                f"{self.name} indicators",
+                f"Indicators from the {self.name} STIX feed that are not part of a report.",
+                min(_iso_time(indicator['created']) or '' for indicator in unreported) or utc_now().isoformat(),
+                unreported,
+                source=self.name,
+            ))
+        return pulses
+
+
+@register_feed('abusech_csv')
+class AbuseCHCSVFeed(Feed):
+    """
+    abuse.ch style CSV feeds, where the header is often the last '#' comment line.
+
+    Rows are grouped into one pulse per value of 'group_column' (e.g. the malware family).
+    """
+
+    def __init__(self, name, url, indicator_column, indicator_type, group_column=None, date_column=None,
+                 tags=None, **options):
+        """
+        Args:
+            url (str): The CSV URL or path.
+            indicator_column (str): The column holding the indicator, e.g. 'url' or 'dst_ip'.
+            indicator_type (str): The OTX type of the indicators, e.g. 'URL' or 'IPv4'.
+            group_column (str, optional): The column to group rows into pulses by, e.g. 'malware'.
+            date_column (str, optional): The column with each row's date, e.g. 'dateadded'.
+            tags (list, optional): Tags added to every pulse.
+        """
+        super().__init__(name, **options)
+        self.url = url
+        self.indicator_column = indicator_column
+        self.indicator_type = indicator_type
+        self.group_column = group_column
+        self.date_column = date_column
+        self.tags = tags or []
+
+    def _rows(self):
+        """Parses the CSV into dictionaries, finding the header in a comment line if needed."""
+        lines = self._read(self.url).decode('utf-8', errors='replace').splitlines()
+        comments = [line.lstrip('#').strip() for line in lines if line.startswith('#')]
+        data = [line for line in lines if line.strip() and not line.startswith('#')]
+        if data and self.indicator_column in next(csv.reader([data[0]])):
+            return list(csv.DictReader(data))
+        header = next(csv.reader(comments[-1:]), [])
+        return list(csv.DictReader(data, fieldnames=[column.strip() for column in header]))
+
+    def collect(self, since):
+        groups = {}
+        for row in self._rows():
+            value = (row.get(self.indicator_column) or '').strip()
+            row_date = row.get(self.date_column) if self.date_column else None
+            if not value or not _is_recent(row_date, since):
+                continue
+            group = (row.get(self.group_column) or 'unknown').strip() if self.group_column else self.name
+            created = (_parse_time(row_date) or utc_now()).isoformat()
+            groups.setdefault(group, []).append({'indicator': value, 'type': self.indicator_type, 'created': created})
+
+        return [
+            make_pulse(
+                f"{self.name}:{group}:{since.date().isoformat()}",
+                f"{self.name}: {group}",
+                f"{len(indicators)} {self.indicator_type} indicators for '{group}' from the {self.name} feed.",
+                min(indicator['created'] for indicator in indicators),
+                indicators,
+                tags=self.tags + ([group] if self.group_column else []),
+                source=self.name,
+            )
+            for group, indicators in groups.items()
+        ]
+
+
+def load_feeds(path=FEEDS_CONFIG_PATH):
+    """
+    Builds the configured feeds.
+
+    Args:
+        path (str, optional): Path of a JSON file with a list of feed settings. Each entry has a
+                              'type' (a registered feed type), a 'name', and that feed's options,
+                              plus optional 'timeout' and 'rate_limit'. Defaults to OTX only.
+
+    Returns:
+        list: The feed objects.
+
+    Raises:
+        ValueError: If the config names a feed type that is not registered.
+    """
+    if not path:
+        return [OTXFeed()]
+    with open(path, encoding='utf-8') as config_file:
+        settings = json.load(config_file)
+
+    feeds = []
+    for entry in settings:
+        entry = dict(entry)
+        feed_type = entry.pop('type', None)
+        if feed_type not in FEED_TYPES:
+            raise ValueError(f"Unknown feed type '{feed_type}' in {path}. Known types: {', '.join(sorted(FEED_TYPES))}")
+        feeds.append(FEED_TYPES[feed_type](**entry))
+    return feeds
+
+
+def merge_pulses(pulse_lists):
+    """
+    Merges the pulses of several feeds, keeping the most recently modified copy of any duplicate ID.
+
+    Args:
+        pulse_lists (iterable): One list of pulses per feed.
+
+    Returns:
+        list: The merged pulses.
+    """
+    merged = {}
+    for pulses in pulse_lists:
+        for pulse in pulses:
+            pulse_id = pulse.get('id')
+            current = merged.get(pulse_id)
+            if current is None or str(pulse.get('modified') or '') > str(current.get('modified') or ''):
+                merged[pulse_id] = pulse
+    return list(merged.values())
+
+
+def collect_feeds(feeds, since=None, max_workers=FEED_MAX_WORKERS):
+    """
+    Collects every feed concurrently and merges the results.
+
+    Each feed is given its own 'timeout', counted from the start of collection. A feed that
+    fails or runs out of time is reported and skipped, and the other feeds' pulses are still
+    returned.
+
+    Args:
+        feeds (list): Feed objects, e.g. from 'load_feeds'.
+        since (datetime, optional): Only pulses created or modified after this time, rounded down to the
+                                    minute. A naive time is taken to be in UTC. Defaults to 24 hours ago.
+        max_workers (int): Maximum number of feeds collected at the same time.
+
+    Returns:
+        list: The merged pulses of every feed that finished in time.
+    """
+    # Rounded down to the minute, like OTX's 'modified_since', so polls within the same minute send
+    # identical requests and can be answered from the HTTP cache.
+    since = (_parse_time(since) or utc_now() - timedelta(days=1)).replace(second=0, microsecond=0)
+    started = time.monotonic()
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(feeds))))
+    futures = [(feed, executor.submit(feed.collect, since)) for feed in feeds]
+
+    results = []
+    try:
+        for feed, future in sorted(futures, key=lambda item: item[0].timeout):
+            try:
+                pulses = future.result(timeout=max(0, started + feed.timeout - time.monotonic()))
+            except FutureTimeoutError:
+                FEED_FAILURES.labels(feed=feed.name).inc()
+                print(f"Feed '{feed.name}' timed out after {feed.timeout} seconds; skipping it.")
+                continue
+            except Exception as e:
+                FEED_FAILURES.labels(feed=feed.name).inc()
+                print(f"Feed '{feed.name}' failed: {e}")
+                continue
+            FEED_PULSES.labels(feed=feed.name).inc(len(pulses))
+            print(f"Feed '{feed.name}': collected {len(pulses)} pulses.")
+            results.append(pulses)
+    finally:
+        # Do not wait for feeds that timed out; their own request timeouts end them soon after.
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return merge_pulses(results)
@@ -0,0 +1,196 @@
+# This script provides an on-disk HTTP response cache for the OTX collector, backed by SQLite.
+# Frequent polling mostly asks for pages that have not changed since the last poll, so
+# downloading (and paying for) the full body every time is wasted bandwidth.
+#
+# - Revalidation: when OTX sent an 'ETag' header for a page, the next request for the same
+#   page sends 'If-None-Match'. A '304 Not Modified' answer has no body, and the stored copy
+#   is used instead. Pages are identified by their URL and parameters except 'modified_since',
+#   which changes on every run. Only the ETag is sent, since it matches the body the server
+#   would send now; 'If-Modified-Since' would also accept a copy fetched for another window.
+# - Local reuse: every response is stored, with or without validators. Repeating exactly the
+#   same request within HTTP_CACHE_MAX_AGE seconds (e.g. polls in the same minute) is answered
+#   from the stored copy without contacting OTX.
+# - Content addressing: bodies are stored once per SHA-256 of their content, so identical
+#   pages returned for different requests share a single copy. Bodies are zlib-compressed.
+#
+# Entries expire after a TTL, and bodies no longer referenced by any entry are deleted.
+
+import os
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from urllib.parse import urlencode, urlsplit, parse_qsl
+
+# --- CACHE CONFIGURATION ---
+# Location of the SQLite database file. It is created on first use.
+HTTP_CACHE_PATH = os.environ.get("AUTOTI_HTTP_CACHE_PATH", "autoti_http_cache.db")
+# How long (in seconds) a stored response can still be revalidated.
+HTTP_CACHE_TTL = int(os.environ.get("AUTOTI_HTTP_CACHE_TTL", 24 * 3600))
+# How long (in seconds) an identical request is answered from the stored copy without contacting OTX.
+HTTP_CACHE_MAX_AGE = int(os.environ.get("AUTOTI_HTTP_CACHE_MAX_AGE", 60))
+# Query parameters that change from run to run without changing which page is requested.
+VOLATILE_PARAMS = frozenset(["modified_since"])
+
+
+def _digest(url, params, skip=frozenset()):
+    """Hashes a URL and its parameters, whether they are in 'params' or already in the URL's query string."""
+    parts = urlsplit(url)
+    items = parse_qsl(parts.query, keep_blank_values=True) + list((params or {}).items())
+    query = urlencode(sorted((str(name), str(value)) for name, value in items if name not in skip))
+    return hashlib.sha256(f"{parts._replace(query='', fragment='').geturl()}?{query}".encode("utf-8")).hexdigest()
+
+
+def request_key(url, params=None):
+    """
+    Builds the cache key of the page a GET request asks for.
+
+    Parameters in VOLATILE_PARAMS are left out (including from the URL's query string, as in
+    OTX's 'next' links), so the next run's request for the same page finds the stored
+    validators even though its 'modified_since' moved on.
+
+    Args:
+        url (str): The request URL.
+        params (dict, optional): The query parameters. Their order does not matter.
+
+    Returns:
+        str: A SHA-256 hex digest identifying the page.
+    """
+    return _digest(url, params, skip=VOLATILE_PARAMS)
+
+
+def request_digest(url, params=None):
+    """Builds a digest of the exact request, including every parameter, for 'ResponseCache.fresh'."""
+    return _digest(url, params)
+
+
+class ResponseCache:
+    """
+    A thread-safe, on-disk cache of HTTP response bodies and their validators.
+    """
+
+    def __init__(self, path=HTTP_CACHE_PATH, ttl=HTTP_CACHE_TTL, max_age=HTTP_CACHE_MAX_AGE):
+        """
+        Args:
+            path (str): Path to the SQLite database file.
+            ttl (int): Number of seconds a stored response is kept.
+            max_age (int): Number of seconds an identical request is answered without contacting the server.
+        """
+        self.ttl = ttl
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        # Pages are fetched from several threads at once, so the connection is shared under the lock.
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS http_responses (
+                key TEXT PRIMARY KEY,
+                request_digest TEXT,
+                etag TEXT,
+                body_hash TEXT NOT NULL,
+                stored_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS http_bodies (
+                hash TEXT PRIMARY KEY,
+                body BLOB NOT NULL
+            );
+            """
+        )
+        with self._lock:
+            self._evict_locked(time.time())
+            self._conn.commit()
+
+    def validators(self, key):
+        """
+        Returns the conditional request headers for a stored response.
+
+        Args:
+            key (str): A key built with 'request_key'.
+
+        Returns:
+            dict: An 'If-None-Match' header, or an empty dict.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag FROM http_responses WHERE key = ? AND stored_at >= ?",
+                (key, time.time() - self.ttl),
+            ).fetchone()
+        if row is None or not row[0]:
+            return {}
+        return {"If-None-Match": row[0]}
+
+    def fresh(self, key, digest):
+        """
+        Returns the stored body if exactly the same request was answered within the last 'max_age' seconds.
+
+        Args:
+            key (str): A key built with 'request_key'.
+            digest (str): A digest built with 'request_digest' for the same request.
+
+        Returns:
+            bytes: The stored body, or None if the request must be sent.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT b.body FROM http_responses r JOIN http_bodies b ON b.hash = r.body_hash "
+                "WHERE r.key = ? AND r.request_digest = ? AND r.stored_at >= ?",
+                (key, digest, time.time() - self.max_age),
+            ).fetchone()
+        return zlib.decompress(row[0]) if row else None
+
+    def load(self, key):
+        """
+        Returns the stored body for a request (after a '304 Not Modified'), or None if there is none.
+
+        Args:
+            key (str): A key built with 'request_key'.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT b.body FROM http_responses r JOIN http_bodies b ON b.hash = r.body_hash WHERE r.key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            # Revalidation proved the copy is current, so it counts as freshly stored.
+            self._conn.execute("UPDATE http_responses SET stored_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return zlib.decompress(row[0])
+
+    def store(self, key, body, etag=None, digest=None):
+        """
+        Stores a response body with its validator.
+
+        Responses without an 'ETag' header are stored too: they cannot be revalidated, but an
+        identical request can still reuse them (see 'fresh').
+
+        Args:
+            key (str): A key built with 'request_key'.
+            body (bytes): The raw (decompressed) response body.
+            etag (str, optional): The response's 'ETag' header.
+            digest (str, optional): The 'request_digest' of the request that was answered.
+        """
+        body_hash = hashlib.sha256(body).hexdigest()
+        now = time.time()
+        with self._lock:
+            # Identical bodies are only stored once, whichever request they came from.
+            self._conn.execute(
+                "INSERT OR IGNORE INTO http_bodies (hash, body) VALUES (?, ?)", (body_hash, zlib.compress(body))
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO http_responses (key, request_digest, etag, body_hash, stored_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, digest, etag, body_hash, now),
+            )
+            self._conn.commit()
+
+    def _evict_locked(self, now):
+        """Deletes expired entries and any bodies no longer referenced. Must be called with the lock held."""
+        self._conn.execute("DELETE FROM http_responses WHERE stored_at < ?", (now - self.ttl,))
+        self._conn.execute("DELETE FROM http_bodies WHERE hash NOT IN (SELECT body_hash FROM http_responses)")
+
+    def close(self):
+        """Closes the underlying database connection."""
+        with self._lock:
+            self._conn.close()
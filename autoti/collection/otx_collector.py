@@ -2,10 +2,26 @@
 # It fetches recent 'pulses', which are collections of threat indicators.
 
 import os
+import math
+import asyncio
 import requests
 import json
-from datetime import datetime, timedelta
+import aiohttp
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from autoti.collection.http_cache import ResponseCache, request_key, request_digest
+from autoti.metrics import PULSES_FETCHED, BYTES_FETCHED, HTTP_RETRIES, record_cache_lookup
+
+# orjson decodes large pages several times faster than the standard library, so it is used when installed.
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
 # Load environment variables from a '.env' file for secure handling of API keys.
 load_dotenv()
@@ -17,62 +33,481 @@ OTX_API_KEY = os.environ.get("OTX_API_KEY", "YOUR_API_KEY_HERE")
 # The base URL for the AlienVault OTX API.
 BASE_URL = "https://otx.alienvault.com/api/v1"
 
+# --- PAGINATION AND CONCURRENCY CONFIGURATION ---
+# Number of pulses requested per page. OTX may cap this server-side, in which case
+# the page size actually returned is used to work out how many pages there are.
+OTX_PAGE_LIMIT = int(os.environ.get("OTX_PAGE_LIMIT", 50))
+# Maximum number of pages fetched in parallel. This also sizes the connection pool,
+# so every worker thread can reuse an open TCP/TLS connection.
+OTX_MAX_WORKERS = int(os.environ.get("OTX_MAX_WORKERS", 4))
+# Number of retries (with exponential backoff) for rate-limited or failing requests.
+OTX_MAX_RETRIES = int(os.environ.get("OTX_MAX_RETRIES", 5))
+# Status codes that are worth retrying: rate limiting and transient server errors.
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# Per-request timeout in seconds.
+REQUEST_TIMEOUT = 15
+# When enabled, page responses are cached on disk and revalidated with their 'ETag'
+# (see 'autoti.collection.http_cache'), so unchanged pages are not downloaded again.
+HTTP_CACHE_ENABLED = os.environ.get("AUTOTI_HTTP_CACHE", "true").lower() in ("1", "true", "yes")
+
+
+def create_session(api_key, max_workers=OTX_MAX_WORKERS, max_retries=OTX_MAX_RETRIES):
+    """
+    Creates a pooled HTTP session for talking to the OTX API.
+
+    The session keeps connections alive between requests and retries with
+    exponential backoff on 429/5xx responses, honouring any 'Retry-After' header.
+
+    Args:
+        api_key (str): Your AlienVault OTX API key.
+        max_workers (int): Number of concurrent requests the pool should support.
+        max_retries (int): Maximum number of retries per request.
+
+    Returns:
+        requests.Session: A session with the API key header and retry policy configured.
+    """
+    retry_policy = Retry(
+        total=max_retries,
+        backoff_factor=1,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(["GET"]),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers, max_retries=retry_policy)
+
+    session = requests.Session()
+    # The API requires the key to be sent in the request headers.
+    # Pages are large, highly compressible JSON; requests already asks for gzip by default.
+    session.headers.update({"X-OTX-API-KEY": api_key})
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _since_timestamp(since):
+    """Returns the 'modified_since' value for a request, defaulting to 24 hours ago."""
+    # To get the most recent data, we default to the timestamp for 24 hours ago.
+    # The API will return pulses modified since this time.
+    # It is rounded down to the minute, so polls within the same minute send identical
+    # requests and can be answered from the HTTP cache.
+    # OTX timestamps are in UTC without an offset, so times are sent in that form too.
+    if since is None:
+        since = (datetime.now(timezone.utc) - timedelta(days=1)).replace(second=0, microsecond=0)
+    if isinstance(since, datetime):
+        if since.tzinfo is not None:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        since = since.isoformat()
+    return since
+
+
+def _load_fresh(cache, key, digest):
+    """Returns the decoded stored copy of a request repeated within the cache's max age, or None."""
+    body = cache.fresh(key, digest)
+    if body is None:
+        return None
+    record_cache_lookup("http", True)
+    page = _json_loads(body)
+    PULSES_FETCHED.inc(len(page.get("results", [])))
+    return page
+
+
+def _fetch_page(session, url, params=None, cache=None, timeout=REQUEST_TIMEOUT, rate_limiter=None):
+    """
+    Fetches a single page from the OTX API and returns the decoded JSON body.
+
+    If a 'ResponseCache' is given, a stored copy of the page is revalidated instead of
+    downloaded again (or reused as it is, for a repeat of the same request), and new
+    responses are stored in it. If a 'rate_limiter' is given, its 'acquire()' is called
+    before every request sent to OTX.
+    """
+    key = digest = headers = None
+    if cache is not None:
+        key, digest = request_key(url, params), request_digest(url, params)
+        page = _load_fresh(cache, key, digest)
+        if page is not None:
+            return page
+        headers = cache.validators(key)
+    if rate_limiter is not None:
+        rate_limiter.acquire()
+    response = session.get(url, params=params, headers=headers, timeout=timeout)
+    if response.status_code == 304:
+        body = cache.load(key)
+        if body is not None:
+            record_cache_lookup("http", True)
+            page = _json_loads(body)
+            PULSES_FETCHED.inc(len(page.get("results", [])))
+            return page
+        # The stored copy expired after its validators were read, so fetch the page in full.
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        response = session.get(url, params=params, timeout=timeout)
+    # This will raise an exception if the response has a bad status code (like 404 or 500).
+    response.raise_for_status()
+    # Retries happen inside urllib3, which keeps a history of them on the response.
+    retries = getattr(response.raw, "retries", None)
+    if retries is not None and retries.history:
+        HTTP_RETRIES.inc(len(retries.history))
+    BYTES_FETCHED.inc(len(response.content))
+    if key is not None:
+        record_cache_lookup("http", False)
+        cache.store(key, response.content, response.headers.get("ETag"), digest)
+    page = _json_loads(response.content)
+    PULSES_FETCHED.inc(len(page.get("results", [])))
+    return page
+
+
+def iter_pulse_pages(session, since=None, max_workers=OTX_MAX_WORKERS, page_limit=OTX_PAGE_LIMIT, cache=None,
+                     timeout=REQUEST_TIMEOUT, rate_limiter=None):
+    """
+    Yields pages of subscribed pulses modified since a given time, as they arrive.
+
+    The first page tells us the total number of pulses, so the remaining pages are
+    fanned out over a thread pool with at most 'max_workers' requests in flight.
+    If the API does not report a total, we fall back to following the 'next' links.
+    Pages are yielded in completion order, not page order.
+
+    Unlike 'get_latest_pulses', errors are not swallowed here: any request or
+    decoding error is raised to the caller.
+
+    Args:
+        session (requests.Session): A session created with 'create_session'.
+        since (datetime | str, optional): Only pulses modified after this time are returned.
+                                          Defaults to 24 hours ago.
+        max_workers (int): Maximum number of pages fetched in parallel.
+        page_limit (int): Number of pulses requested per page.
+        cache (ResponseCache, optional): If given, unchanged pages are revalidated instead of downloaded.
+        timeout (float): Per-request timeout in seconds.
+        rate_limiter (optional): An object whose 'acquire()' blocks until the next request is
+                                 allowed, such as a feed's 'RateLimiter'.
+
+    Yields:
+        list: The list of pulses contained in each page.
+    """
+    for _, results in iter_numbered_pulse_pages(
+        session, since=since, max_workers=max_workers, page_limit=page_limit, cache=cache, timeout=timeout,
+        rate_limiter=rate_limiter,
+    ):
+        yield results
+
+
+def iter_numbered_pulse_pages(session, since=None, max_workers=OTX_MAX_WORKERS, page_limit=OTX_PAGE_LIMIT, cache=None,
+                              timeout=REQUEST_TIMEOUT, rate_limiter=None, skip_pages=frozenset()):
+    """
+    Like 'iter_pulse_pages', but yields each page with its number and can skip pages, e.g. the
+    pages a long fetch already saved before it was interrupted.
+
+    Skipped pages are not yielded, and are not requested unless they have to be: the first page
+    is always requested for the total, and without a total every page is requested to follow
+    the 'next' links.
+
+    Args:
+        skip_pages (set, optional): Numbers of the pages (counted from 1) to leave out.
+        The other arguments are the same as for 'iter_pulse_pages'.
+
+    Yields:
+        tuple: The page number and the list of pulses contained in the page.
+    """
+    # We are querying the 'subscribed' pulses endpoint.
+    url = f"{BASE_URL}/pulses/subscribed"
+    params = {"modified_since": _since_timestamp(since), "limit": page_limit}
+    fetch_options = {"cache": cache, "timeout": timeout, "rate_limiter": rate_limiter}
+
+    first_page = _fetch_page(session, url, {**params, "page": 1}, **fetch_options)
+    first_results = first_page.get("results", [])
+    if 1 not in skip_pages:
+        yield 1, first_results
+
+    total = first_page.get("count")
+    if total is None:
+        # Without a total we cannot fan out, so walk the 'next' links one by one.
+        next_url = first_page.get("next")
+        page_number = 1
+        while next_url:
+            page = _fetch_page(session, next_url, **fetch_options)
+            page_number += 1
+            if page_number not in skip_pages:
+                yield page_number, page.get("results", [])
+            next_url = page.get("next")
+        return
+
+    # The server may cap the page size, so use what it actually returned.
+    page_size = len(first_results) or page_limit
+    page_count = math.ceil(total / page_size)
+    remaining_pages = (page_number for page_number in range(2, page_count + 1) if page_number not in skip_pages)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Keep at most 'max_workers' requests in flight, so a slow consumer
+        # does not cause every page to be buffered in memory.
+        in_flight = {}
+        for page_number in remaining_pages:
+            in_flight[executor.submit(_fetch_page, session, url, {**params, "page": page_number}, **fetch_options)] = page_number
+            if len(in_flight) >= max_workers:
+                break
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield in_flight.pop(future), future.result().get("results", [])
+                page_number = next(remaining_pages, None)
+                if page_number is not None:
+                    in_flight[executor.submit(_fetch_page, session, url, {**params, "page": page_number}, **fetch_options)] = page_number
+
+
+def iter_pulses(api_key, since=None, max_workers=OTX_MAX_WORKERS, timeout=REQUEST_TIMEOUT, rate_limiter=None):
+    """
+    Yields threat intelligence pulses from AlienVault OTX as pages arrive.
+
+    All pages are collected over a single pooled session. If a request fails part way
+    through, the error is printed and iteration stops, so callers receive whatever
+    pulses were fetched before the failure.
+
+    Args:
+        api_key (str): Your AlienVault OTX API key.
+        since (datetime | str, optional): Only pulses modified after this time are returned.
+                                          Defaults to 24 hours ago.
+        max_workers (int): Maximum number of pages fetched in parallel.
+        timeout (float): Per-request timeout in seconds.
+        rate_limiter (optional): Paces the requests (see 'iter_pulse_pages').
+
+    Yields:
+        dict: A single threat pulse.
+    """
+    if api_key in ("YOUR_API_KEY_HERE", None):
+        print("ERROR: OTX API Key is missing. Please set it in your .env file.")
+        return
+
+    cache = ResponseCache() if HTTP_CACHE_ENABLED else None
+    with create_session(api_key, max_workers=max_workers) as session:
+        try:
+            pages = iter_pulse_pages(
+                session, since=since, max_workers=max_workers, cache=cache, timeout=timeout, rate_limiter=rate_limiter
+            )
+            for page in pages:
+                yield from page
+
+        # --- ROBUST ERROR HANDLING ---
+        # It's important to handle different types of potential errors when making API calls.
+        except requests.exceptions.HTTPError as http_err:
+            print(f"HTTP error occurred: {http_err}")
+        except requests.exceptions.ConnectionError as conn_err:
+            print(f"Connection error occurred: {conn_err}")
+        except requests.exceptions.Timeout as timeout_err:
+            print(f"Timeout error occurred: {timeout_err}")
+        except requests.exceptions.RequestException as req_err:
+            print(f"An unexpected error occurred: {req_err}")
+        except json.JSONDecodeError:
+            print("Failed to decode JSON from response. The API might be down or returning invalid data.")
+        finally:
+            if cache is not None:
+                cache.close()
 
-def get_latest_pulses(api_key):
+
+def get_latest_pulses(api_key, since=None, max_workers=OTX_MAX_WORKERS, timeout=REQUEST_TIMEOUT, rate_limiter=None):
     """
     Fetches the latest threat intelligence pulses from AlienVault OTX from the last 24 hours.
 
+    Every page of results is collected, not just the first one.
+
     Args:
         api_key (str): Your AlienVault OTX API key.
+        since (datetime | str, optional): Only pulses modified after this time are returned.
+                                          Defaults to 24 hours ago.
+        max_workers (int): Maximum number of pages fetched in parallel.
+        timeout (float): Per-request timeout in seconds.
+        rate_limiter (optional): Paces the requests (see 'iter_pulse_pages').
 
     Returns:
         list: A list of dictionaries, where each dictionary is a threat pulse.
               Returns an empty list if the request fails.
     """
+    pulses = list(iter_pulses(api_key, since=since, max_workers=max_workers, timeout=timeout, rate_limiter=rate_limiter))
+    if pulses:
+        print(f"Successfully fetched {len(pulses)} pulses from AlienVault OTX.")
+    return pulses
+
+# --- ASYNC COLLECTION ---
+# The functions below mirror the ones above for asyncio callers (e.g. the ASGI app), so
+# waiting on OTX does not block a worker thread. They use an aiohttp session instead of
+# requests, with the same pagination, bounded parallelism and retry policy.
+
+def create_async_session(api_key, max_workers=OTX_MAX_WORKERS):
+    """
+    Creates a pooled aiohttp session for talking to the OTX API.
+
+    Must be called from inside a running event loop.
+
+    Args:
+        api_key (str): Your AlienVault OTX API key.
+        max_workers (int): Maximum number of open connections.
+
+    Returns:
+        aiohttp.ClientSession: A session with the API key header and timeout configured.
+    """
+    return aiohttp.ClientSession(
+        headers={"X-OTX-API-KEY": api_key},
+        connector=aiohttp.TCPConnector(limit=max_workers),
+        timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+    )
+
+
+async def _afetch_page(session, url, params=None, max_retries=OTX_MAX_RETRIES, cache=None):
+    """
+    Fetches a single page, retrying with exponential backoff on 429/5xx responses,
+    connection errors and timeouts, like the retry policy of 'create_session'.
+
+    If a 'ResponseCache' is given, a stored copy of the page is revalidated instead of downloaded again
+    (or reused as it is, for a repeat of the same request). Raises the last error if every attempt fails.
+    """
+    key = digest = None
+    headers = {}
+    if cache is not None:
+        key, digest = request_key(url, params), request_digest(url, params)
+        page = _load_fresh(cache, key, digest)
+        if page is not None:
+            return page
+        headers = cache.validators(key)
+    attempt = 0
+    while True:
+        try:
+            async with session.get(url, params=params, headers=headers) as response:
+                # A 304 is only expected when validators were sent; otherwise it is treated like any other response.
+                if response.status == 304 and headers:
+                    body = cache.load(key)
+                    if body is not None:
+                        record_cache_lookup("http", True)
+                        page = _json_loads(body)
+                        PULSES_FETCHED.inc(len(page.get("results", [])))
+                        return page
+                    # The stored copy expired after its validators were read, so fetch the page in full.
+                    # This is not a failure, so it does not use up a retry.
+                    headers = {}
+                    continue
+                if response.status in RETRY_STATUS_CODES and attempt < max_retries:
+                    # Honour the server's 'Retry-After' header when it sends one.
+                    retry_after = response.headers.get("Retry-After", "")
+                    delay = float(retry_after) if retry_after.isdigit() else 2 ** attempt
+                else:
+                    response.raise_for_status()
+                    body = await response.read()
+                    BYTES_FETCHED.inc(len(body))
+                    if key is not None:
+                        record_cache_lookup("http", False)
+                        cache.store(key, body, response.headers.get("ETag"), digest)
+                    page = _json_loads(body)
+                    PULSES_FETCHED.inc(len(page.get("results", [])))
+                    return page
+        except aiohttp.ClientResponseError:
+            # Error statuses that are not worth retrying (or out of retries) are raised as they are.
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if attempt >= max_retries:
+                raise
+            delay = 2 ** attempt
+        attempt += 1
+        HTTP_RETRIES.inc()
+        await asyncio.sleep(delay)
+
+
+async def aiter_pulse_pages(session, since=None, max_workers=OTX_MAX_WORKERS, page_limit=OTX_PAGE_LIMIT, cache=None):
+    """
+    Async version of 'iter_pulse_pages': yields pages of pulses as they arrive.
+
+    Errors are raised to the caller.
+
+    Args:
+        session (aiohttp.ClientSession): A session created with 'create_async_session'.
+        since (datetime | str, optional): Only pulses modified after this time are returned.
+                                          Defaults to 24 hours ago.
+        max_workers (int): Maximum number of pages fetched in parallel.
+        page_limit (int): Number of pulses requested per page.
+        cache (ResponseCache, optional): If given, unchanged pages are revalidated instead of downloaded.
+
+    Yields:
+        list: The list of pulses contained in each page.
+    """
+    url = f"{BASE_URL}/pulses/subscribed"
+    params = {"modified_since": _since_timestamp(since), "limit": page_limit}
+
+    first_page = await _afetch_page(session, url, {**params, "page": 1}, cache=cache)
+    first_results = first_page.get("results", [])
+    yield first_results
+
+    total = first_page.get("count")
+    if total is None:
+        # Without a total we cannot fan out, so walk the 'next' links one by one.
+        next_url = first_page.get("next")
+        while next_url:
+            page = await _afetch_page(session, next_url, cache=cache)
+            yield page.get("results", [])
+            next_url = page.get("next")
+        return
+
+    # The server may cap the page size, so use what it actually returned.
+    page_size = len(first_results) or page_limit
+    page_count = math.ceil(total / page_size)
+    remaining_pages = iter(range(2, page_count + 1))
+
+    # Keep at most 'max_workers' requests in flight, topping up as each one completes.
+    in_flight = set()
+    try:
+        for page_number in remaining_pages:
+            in_flight.add(asyncio.ensure_future(_afetch_page(session, url, {**params, "page": page_number}, cache=cache)))
+            if len(in_flight) >= max_workers:
+                break
+
+        while in_flight:
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result().get("results", [])
+                page_number = next(remaining_pages, None)
+                if page_number is not None:
+                    in_flight.add(asyncio.ensure_future(_afetch_page(session, url, {**params, "page": page_number}, cache=cache)))
+    finally:
+        # If the caller stops early or a page fails, do not leave requests running in the background.
+        for task in in_flight:
+            task.cancel()
+
+
+async def aget_latest_pulses(api_key, since=None, max_workers=OTX_MAX_WORKERS):
+    """
+    Async version of 'get_latest_pulses'.
+
+    Args:
+        api_key (str): Your AlienVault OTX API key.
+        since (datetime | str, optional): Only pulses modified after this time are returned.
+                                          Defaults to 24 hours ago.
+        max_workers (int): Maximum number of pages fetched in parallel.
+
+    Returns:
+        list: A list of dictionaries, where each dictionary is a threat pulse.
+              If a request fails, the pulses fetched before the failure are returned.
+    """
     if api_key in ("YOUR_API_KEY_HERE", None):
         print("ERROR: OTX API Key is missing. Please set it in your .env file.")
         return []
 
-    # The API requires the key to be sent in the request headers.
-    headers = {
-        "X-OTX-API-KEY": api_key
-    }
-
-    # To get the most recent data, we calculate the timestamp for 24 hours ago.
-    # The API will return pulses modified since this time.
-    since_timestamp = (datetime.now() - timedelta(days=1)).isoformat()
+    pulses = []
+    cache = ResponseCache() if HTTP_CACHE_ENABLED else None
+    async with create_async_session(api_key, max_workers=max_workers) as session:
+        try:
+            async for page in aiter_pulse_pages(session, since=since, max_workers=max_workers, cache=cache):
+                pulses.extend(page)
+        except aiohttp.ClientResponseError as http_err:
+            print(f"HTTP error occurred: {http_err}")
+        except asyncio.TimeoutError as timeout_err:
+            print(f"Timeout error occurred: {timeout_err}")
+        except aiohttp.ClientError as client_err:
+            print(f"Connection error occurred: {client_err}")
+        except json.JSONDecodeError:
+            print("Failed to decode JSON from response. The API might be down or returning invalid data.")
+        finally:
+            if cache is not None:
+                cache.close()
 
-    # Construct the full URL for the API endpoint.
-    # We are querying the 'subscribed' pulses endpoint.
-    url = f"{BASE_URL}/pulses/subscribed?modified_since={since_timestamp}"
+    if pulses:
+        print(f"Successfully fetched {len(pulses)} pulses from AlienVault OTX.")
+    return pulses
 
-    try:
-        # Make the GET request to the OTX API.
-        response = requests.get(url, headers=headers, timeout=15) # Adding a timeout is good practice.
-        # This will raise an exception if the response has a bad status code (like 404 or 500).
-        response.raise_for_status()
-
-        # Parse the JSON response from the API.
-        data = response.json()
-        print(f"Successfully fetched {len(data.get('results', []))} pulses from AlienVault OTX.")
-        # The actual pulse data is in the 'results' key of the response.
-        return data.get("results", [])
-
-    # --- ROBUST ERROR HANDLING ---
-    # It's important to handle different types of potential errors when making API calls.
-    except requests.exceptions.HTTPError as http_err:
-        print(f"HTTP error occurred: {http_err}")
-    except requests.exceptions.ConnectionError as conn_err:
-        print(f"Connection error occurred: {conn_err}")
-    except requests.exceptions.Timeout as timeout_err:
-        print(f"Timeout error occurred: {timeout_err}")
-    except requests.exceptions.RequestException as req_err:
-        print(f"An unexpected error occurred: {req_err}")
-    except json.JSONDecodeError:
-        print("Failed to decode JSON from response. The API might be down or returning invalid data.")
-
-    # Return an empty list if any error occurred.
-    return []
 
 # --- STANDALONE EXECUTION FOR TESTING ---
 if __name__ == "__main__":
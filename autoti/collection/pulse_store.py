@@ -0,0 +1,222 @@
+# This script provides a small on-disk store for OTX pulses, backed by SQLite.
+# It lets the pipeline collect incrementally: instead of refetching the whole day
+# on every run, we remember where the last successful run stopped (the "high-water mark")
+# and only ask OTX for pulses modified since then. Only the last STORE_WINDOW of pulses is kept.
+
+import os
+import json
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import requests
+
+from autoti.collection.otx_collector import create_session, iter_pulse_pages, HTTP_CACHE_ENABLED
+from autoti.collection.http_cache import ResponseCache
+
+# --- STORE CONFIGURATION ---
+# Location of the SQLite database file. It is created on first use.
+PULSE_STORE_PATH = os.environ.get("AUTOTI_PULSE_STORE", "autoti_pulses.db")
+# How far back the very first incremental run looks, before any cursor exists.
+INITIAL_LOOKBACK = timedelta(days=1)
+# How long pulses are kept, counted from their 'modified' time. Older ones are deleted on every sync.
+STORE_WINDOW = timedelta(days=1)
+# The key under which the high-water mark is saved in the 'collection_state' table.
+CURSOR_KEY = "otx_modified_since"
+
+
+def open_pulse_store(path=PULSE_STORE_PATH):
+    """
+    Opens (and if needed, creates) the local pulse store.
+
+    Args:
+        path (str): Path to the SQLite database file.
+
+    Returns:
+        sqlite3.Connection: An open connection with the schema in place.
+    """
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS pulses (
+            id TEXT PRIMARY KEY,
+            modified TEXT,
+            created TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_pulses_modified ON pulses (modified);
+        CREATE TABLE IF NOT EXISTS collection_state (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+        """
+    )
+    return conn
+
+
+def utc_now():
+    """Returns the current time as a naive UTC datetime, the form OTX uses for its timestamps."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def window_start():
+    """Returns the start of the rolling window the store keeps (STORE_WINDOW ago, in UTC)."""
+    return utc_now() - STORE_WINDOW
+
+
+def get_cursor(conn):
+    """Returns the saved high-water mark as an ISO timestamp string, or None if there is none yet."""
+    row = conn.execute("SELECT value FROM collection_state WHERE key = ?", (CURSOR_KEY,)).fetchone()
+    return row[0] if row else None
+
+
+def set_cursor(conn, timestamp):
+    """Saves the high-water mark. Accepts a datetime or an ISO timestamp string."""
+    if isinstance(timestamp, datetime):
+        timestamp = timestamp.isoformat()
+    conn.execute(
+        "INSERT INTO collection_state (key, value) VALUES (?, ?) "
+        "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (CURSOR_KEY, timestamp),
+    )
+    conn.commit()
+
+
+def upsert_pulses(conn, pulses):
+    """
+    Inserts new pulses and updates existing ones, keyed by pulse 'id'.
+
+    A stored pulse is only rewritten if the incoming copy has a different
+    'modified' timestamp, so unchanged pulses cost no writes.
+
+    Args:
+        conn (sqlite3.Connection): An open pulse store.
+        pulses (iterable): Raw pulse dictionaries from OTX.
+
+    Returns:
+        int: The number of pulses that were inserted or updated.
+    """
+    changes_before = conn.total_changes
+    conn.executemany(
+        "INSERT INTO pulses (id, modified, created, data) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(id) DO UPDATE SET modified = excluded.modified, created = excluded.created, data = excluded.data "
+        "WHERE pulses.modified IS NOT excluded.modified",
+        (
+            (pulse["id"], pulse.get("modified"), pulse.get("created"), json.dumps(pulse))
+            for pulse in pulses
+            if pulse.get("id")
+        ),
+    )
+    conn.commit()
+    return conn.total_changes - changes_before
+
+
+def iter_stored_pulses(conn, since=None):
+    """
+    Yields pulses from the store one at a time, without loading them all into memory.
+
+    Args:
+        conn (sqlite3.Connection): An open pulse store.
+        since (datetime | str, optional): Only return pulses modified after this time.
+
+    Yields:
+        dict: A raw pulse dictionary, in the same shape OTX returns it.
+    """
+    if isinstance(since, datetime):
+        since = since.isoformat()
+    if since is None:
+        rows = conn.execute("SELECT data FROM pulses")
+    else:
+        rows = conn.execute("SELECT data FROM pulses WHERE modified >= ?", (since,))
+    for (data,) in rows:
+        yield json.loads(data)
+
+
+def prune_pulses(conn, before):
+    """
+    Deletes the pulses last modified before a given time.
+
+    Args:
+        conn (sqlite3.Connection): An open pulse store.
+        before (datetime | str): Pulses modified before this UTC time are deleted.
+
+    Returns:
+        int: The number of pulses deleted.
+    """
+    if isinstance(before, datetime):
+        before = before.isoformat()
+    deleted = conn.execute("DELETE FROM pulses WHERE modified IS NULL OR modified < ?", (before,)).rowcount
+    conn.commit()
+    return deleted
+
+
+def load_pulses(conn, since=None):
+    """
+    Reads pulses back from the store.
+
+    Args:
+        conn (sqlite3.Connection): An open pulse store.
+        since (datetime | str, optional): Only return pulses modified after this time.
+
+    Returns:
+        list: A list of raw pulse dictionaries, in the same shape OTX returns them.
+    """
+    return list(iter_stored_pulses(conn, since=since))
+
+
+def collect_incremental(api_key, conn):
+    """
+    Fetches only the pulses modified since the last successful run and stores them.
+
+    The new high-water mark is the time the fetch *started* (in UTC, like OTX's 'modified'
+    timestamps), so anything modified while the fetch was running is picked up next time.
+    The cursor is only advanced once every page has been fetched and stored; if anything
+    fails, the next run retries the same window. Pulses that fell out of the rolling
+    STORE_WINDOW are then deleted.
+
+    Args:
+        api_key (str): Your AlienVault OTX API key.
+        conn (sqlite3.Connection): An open pulse store.
+
+    Returns:
+        list: The pulses that were new or changed since the previous run.
+              Returns an empty list if the request fails.
+    """
+    if api_key in ("YOUR_API_KEY_HERE", None):
+        print("ERROR: OTX API Key is missing. Please set it in your .env file.")
+        return []
+
+    fetch_started = utc_now()
+    since = get_cursor(conn) or (fetch_started - INITIAL_LOOKBACK).isoformat()
+
+    fetched = []
+    cache = ResponseCache() if HTTP_CACHE_ENABLED else None
+    try:
+        with create_session(api_key) as session:
+            for page in iter_pulse_pages(session, since=since, cache=cache):
+                fetched.extend(page)
+    except (requests.exceptions.RequestException, json.JSONDecodeError) as err:
+        print(f"Incremental collection failed, cursor left at {since}: {err}")
+        return []
+    finally:
+        if cache is not None:
+            cache.close()
+
+    changed = upsert_pulses(conn, fetched)
+    set_cursor(conn, fetch_started)
+    pruned = prune_pulses(conn, fetch_started - STORE_WINDOW)
+    print(f"Fetched {len(fetched)} pulses modified since {since} ({changed} new or changed, {pruned} expired).")
+    return fetched
+
+
+# --- STANDALONE EXECUTION FOR TESTING ---
+if __name__ == "__main__":
+    # Run 'python -m autoti.collection.pulse_store' twice in a row: the second run
+    # should only fetch the pulses modified in between.
+    from autoti.collection.otx_collector import OTX_API_KEY
+
+    print("--- Testing Incremental Pulse Collection ---")
+    store = open_pulse_store()
+    delta = collect_incremental(OTX_API_KEY, store)
+    print(f"Delta size: {len(delta)} pulses. Cursor is now {get_cursor(store)}.")
+    print(f"Pulses in store for the last 24 hours: {len(load_pulses(store, since=window_start()))}")
+    store.close()
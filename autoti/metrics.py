@@ -0,0 +1,114 @@
+# This script defines the pipeline's metrics and exposes them in the Prometheus text format.
+# Progress used to be reported only with 'print', so there was no way to see where time goes
+# in production. Each part of the pipeline records its own numbers here:
+# - Stage timers: how long fetching, normalizing and report generation take.
+# - Counters: pulses, indicators, bytes downloaded, HTTP retries, LLM calls and tokens.
+# - Cache lookups: hits and misses of the LLM and report caches, and their hit ratios.
+#
+# The web app serves them at '/metrics'. Metrics are kept per process: with several
+# Gunicorn workers, each worker reports its own numbers.
+
+import time
+import threading
+from contextlib import contextmanager
+
+from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST, REGISTRY
+
+# --- STAGE TIMINGS ---
+# Pipeline runs take from a few seconds to several minutes, so the buckets cover that range.
+STAGE_DURATION = Histogram(
+    "autoti_stage_duration_seconds", "Time spent in each pipeline stage.", ["stage"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+PIPELINE_RUNS = Counter("autoti_pipeline_runs", "Pipeline runs, by outcome.", ["status"])
+
+# --- COLLECTION ---
+PULSES_FETCHED = Counter("autoti_pulses_fetched", "Pulses downloaded from OTX.")
+BYTES_FETCHED = Counter("autoti_otx_bytes", "Bytes of response bodies downloaded from OTX.")
+HTTP_RETRIES = Counter("autoti_otx_retries", "OTX requests retried after a rate limit or server error.")
+FEED_PULSES = Counter("autoti_feed_pulses", "Pulses collected, by feed.", ["feed"])
+FEED_FAILURES = Counter("autoti_feed_failures", "Feed collections that failed or timed out, by feed.", ["feed"])
+
+# --- PROCESSING ---
+PULSES_NORMALIZED = Counter("autoti_pulses_normalized", "Pulses normalized.")
+IOCS_NORMALIZED = Counter("autoti_iocs_normalized", "Indicators of compromise in the normalized pulses.")
+DUPLICATE_PULSES = Counter("autoti_duplicate_pulses", "Near-duplicate pulses merged into another pulse.")
+
+# --- REPORT GENERATION ---
+LLM_CALLS = Counter("autoti_llm_calls", "Calls made to the LLM.")
+# Tokens are estimated from text length (see 'autoti.analysis.map_reduce.estimate_tokens').
+LLM_TOKENS = Counter("autoti_llm_tokens", "Estimated tokens sent to and received from the LLM.", ["direction"])
+
+# --- CACHES ---
+CACHE_REQUESTS = Counter("autoti_cache_requests", "Cache lookups, by cache and result.", ["cache", "result"])
+CACHE_HIT_RATIO = Gauge("autoti_cache_hit_ratio", "Share of cache lookups that were hits since the process started.", ["cache"])
+
+# Hits and lookups per cache, for the hit ratio gauge.
+_cache_lookups = {}
+_cache_lock = threading.Lock()
+
+
+@contextmanager
+def stage_timer(stage):
+    """
+    Times a block of code and records it as one pipeline stage.
+
+    Args:
+        stage (str): The stage name, e.g. 'fetch', 'normalize' or 'report'.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_DURATION.labels(stage=stage).observe(time.perf_counter() - start)
+
+
+@contextmanager
+def pipeline_run():
+    """Times a whole pipeline run and counts it as a success or an error."""
+    try:
+        with stage_timer("pipeline"):
+            yield
+    except Exception:
+        PIPELINE_RUNS.labels(status="error").inc()
+        raise
+    PIPELINE_RUNS.labels(status="success").inc()
+
+
+def record_cache_lookup(cache, hit):
+    """
+    Records one cache lookup and updates the cache's hit ratio.
+
+    Args:
+        cache (str): The cache name, e.g. 'llm' or 'report'.
+        hit (bool): Whether the lookup was answered from the cache.
+    """
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+    with _cache_lock:
+        hits, lookups = _cache_lookups.get(cache, (0, 0))
+        hits, lookups = hits + int(hit), lookups + 1
+        _cache_lookups[cache] = (hits, lookups)
+    CACHE_HIT_RATIO.labels(cache=cache).set(hits / lookups)
+
+
+def record_llm_call(prompt_tokens, completion_tokens):
+    """
+    Records one LLM call and its estimated token usage.
+
+    Args:
+        prompt_tokens (int): Estimated tokens in the prompt.
+        completion_tokens (int): Estimated tokens in the response.
+    """
+    LLM_CALLS.inc()
+    LLM_TOKENS.labels(direction="prompt").inc(prompt_tokens)
+    LLM_TOKENS.labels(direction="completion").inc(completion_tokens)
+
+
+def render_metrics():
+    """
+    Renders every metric in the Prometheus text exposition format.
+
+    Returns:
+        tuple: The response body (bytes) and its content type.
+    """
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
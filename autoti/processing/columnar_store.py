@@ -0,0 +1,347 @@
+# This script persists normalized pulses and the flat indicator (IOC) table in a columnar format.
+# Without it, every run starts again from raw JSON. With it, restarts are fast and analytics
+# jobs can scan weeks of data without loading it all into memory.
+#
+# Data is written as Parquet (or Feather / Arrow IPC) files, partitioned by creation day:
+#   <root>/pulses/creation_day=YYYY-MM-DD/part-<write id>-0.parquet
+#   <root>/iocs/creation_day=YYYY-MM-DD/part-<write id>-0.parquet
+#
+# Pipeline runs merge their pulses into each day they touch: the day is rewritten as one new file
+# holding the pulses saved by earlier runs plus this run's (which replace any earlier copies, with
+# all of their indicators). Backfills replace whole days instead (see 'autoti.backfill').
+# Both tables of a write share one write id. The indicator file is written first, the pulse file
+# second and the older files are deleted last, so a write interrupted part way is ignored on read:
+# a pulse's indicators are always those of the latest write that saved the pulse.
+#
+# Reads go through pyarrow datasets, which:
+# - memory-map the files instead of copying them into memory,
+# - only read the requested columns (projection),
+# - skip whole partitions and row groups that cannot match a filter (predicate pushdown),
+#   for 'creation_date' ranges and indicator types.
+
+import os
+import re
+import time
+import uuid
+from datetime import date, datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from pyarrow import fs
+
+# --- STORE CONFIGURATION ---
+# File format for new data: 'parquet' (compressed, compact) or 'feather' (uncompressed
+# Arrow IPC, which can be memory-mapped with zero copies).
+COLUMNAR_FORMAT = os.environ.get("AUTOTI_COLUMNAR_FORMAT", "parquet").lower()
+# The name of the partition column added to every table.
+PARTITION_COLUMN = "creation_day"
+# A special dataset column holding the path of the file each row was read from.
+FILENAME_COLUMN = "__filename"
+# Matches the write id in a data file name ('part-<write id>-<i>.<extension>').
+_WRITE_ID_PATTERN = re.compile(r"^part-(\d{20}-[0-9a-f]{8})-")
+
+# --- TABLE SCHEMAS ---
+# Fixed schemas, so every partition lines up no matter which optional fields a batch of pulses had.
+PULSE_SCHEMA = pa.schema([
+    ('pulse_id', pa.string()),
+    ('threat_name', pa.string()),
+    ('threat_description', pa.string()),
+    ('creation_date', pa.timestamp('us', tz='UTC')),
+    ('ioc_count', pa.int64()),
+    ('tags', pa.list_(pa.string())),
+    ('tlp', pa.string()),
+    ('duplicate_count', pa.int64()),
+])
+IOC_SCHEMA = pa.schema([
+    ('pulse_id', pa.string()),
+    ('indicator_id', pa.int64()),
+    ('type', pa.dictionary(pa.int32(), pa.string())),
+    ('indicator', pa.string()),
+    ('created', pa.timestamp('us')),
+    ('role', pa.string()),
+    ('title', pa.string()),
+    ('description', pa.string()),
+    ('expiration', pa.timestamp('us')),
+    ('is_active', pa.int8()),
+])
+TABLE_SCHEMAS = {'pulses': PULSE_SCHEMA, 'iocs': IOC_SCHEMA}
+PARTITIONING = ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor='hive')
+
+# Memory-mapping the files lets the OS page data in on demand instead of copying it.
+_LOCAL_FS = fs.LocalFileSystem(use_mmap=True)
+
+
+def _dataset_format(file_format):
+    """Maps our format names to the pyarrow dataset format names."""
+    return 'ipc' if file_format == 'feather' else 'parquet'
+
+
+def _to_arrow(df, schema):
+    """Converts a DataFrame to an Arrow table with exactly the given schema."""
+    df = df.reindex(columns=schema.names).copy()
+    if 'creation_date' in schema.names:
+        df['creation_date'] = pd.to_datetime(df['creation_date'], utc=True, errors='coerce')
+    # Missing optional columns come out of 'reindex' as float NaN; replace them with proper nulls.
+    df = df.astype(object).where(df.notna(), None)
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+
+def _write_id():
+    """Returns a unique id for one write. Ids sort in the order they were created, so later writes sort last."""
+    return f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}"
+
+
+def _file_write_id(path):
+    """Returns the write id in a data file's name, or '' for files not named by 'write_table'."""
+    match = _WRITE_ID_PATTERN.match(os.path.basename(path))
+    return match.group(1) if match else ''
+
+
+def write_table(df, root_dir, table, file_format=COLUMNAR_FORMAT, write_id=None):
+    """
+    Writes one table, partitioned by creation day, as a new file in each partition.
+
+    Files left in the partitions by earlier writes are kept; see 'write_normalized', which merges
+    them into the new files and then deletes them.
+
+    Args:
+        df (pd.DataFrame | pyarrow.Table): The table to write. It must have a 'creation_day' column ('YYYY-MM-DD').
+        root_dir (str): The root directory of the store.
+        table (str): 'pulses' or 'iocs'.
+        file_format (str): 'parquet' or 'feather'.
+        write_id (str, optional): The id the new files are named with. Defaults to a new one.
+    """
+    arrow_table = df if isinstance(df, pa.Table) else _with_partition(df, table)
+    extension = 'arrow' if file_format == 'feather' else 'parquet'
+    ds.write_dataset(
+        arrow_table,
+        os.path.join(root_dir, table),
+        format=_dataset_format(file_format),
+        partitioning=PARTITIONING,
+        basename_template=f"part-{write_id or _write_id()}-{{i}}.{extension}",
+        existing_data_behavior='overwrite_or_ignore',
+    )
+
+
+def _with_partition(df, table):
+    """Converts a DataFrame with a 'creation_day' column to an Arrow table in the table's schema, plus that column."""
+    return _to_arrow(df, TABLE_SCHEMAS[table]).append_column(
+        PARTITION_COLUMN, pa.array(df[PARTITION_COLUMN].astype(str).tolist(), pa.string())
+    )
+
+
+def write_normalized(df_pulses, df_iocs, root_dir, file_format=COLUMNAR_FORMAT, replace=False):
+    """
+    Writes normalized pulses and their indicator table, partitioned by the pulses' creation day.
+
+    Each day the pulses fall on is rewritten as one file per table. By default the pulses already
+    stored for that day are kept, except those in 'df_pulses', which replace their stored copies
+    along with all of their stored indicators. With 'replace', the day only holds the new rows,
+    which is meant for writes that cover whole days (e.g. a backfill).
+
+    Args:
+        df_pulses (pd.DataFrame): A DataFrame from 'normalize_pulses'.
+        df_iocs (pd.DataFrame): The matching table from 'normalize_indicators'.
+        root_dir (str): The root directory of the store.
+        file_format (str): 'parquet' or 'feather'.
+        replace (bool): Whether to replace the days being written instead of merging into them.
+    """
+    if df_pulses.empty:
+        return
+    write_id = _write_id()
+    creation_day = pd.to_datetime(df_pulses['creation_date'], utc=True, errors='coerce').dt.strftime('%Y-%m-%d').fillna('unknown')
+    pulses = _with_partition(df_pulses.assign(**{PARTITION_COLUMN: creation_day}), 'pulses')
+    # Indicators are partitioned by the creation day of the pulse they belong to.
+    day_by_pulse = pd.Series(creation_day.to_numpy(), index=df_pulses['pulse_id'].astype(str).to_numpy())
+    if df_iocs is None or df_iocs.empty:
+        iocs = _with_partition(pd.DataFrame(columns=IOC_SCHEMA.names + [PARTITION_COLUMN]), 'iocs')
+    else:
+        iocs = _with_partition(df_iocs.assign(**{PARTITION_COLUMN: df_iocs['pulse_id'].astype(str).map(day_by_pulse).fillna('unknown')}), 'iocs')
+
+    days = sorted(set(creation_day))
+    old_files = {table: _partition_files(root_dir, table, days, file_format) for table in TABLE_SCHEMAS}
+    if not replace and old_files['pulses']:
+        # Carry over the day's other pulses (and their indicators), as their latest writes saved them.
+        kept = ds.field(PARTITION_COLUMN).isin(days) & ~ds.field('pulse_id').isin(pulses['pulse_id'].to_pylist())
+        if old_files['iocs']:
+            iocs = pa.concat_tables([_read_latest(root_dir, 'iocs', iocs.schema.names, kept, file_format), iocs])
+        pulses = pa.concat_tables([_read_latest(root_dir, 'pulses', pulses.schema.names, kept, file_format), pulses])
+
+    # Indicators first and pulses second: until the pulse file exists, readers keep using the older write.
+    if iocs.num_rows:
+        write_table(iocs, root_dir, 'iocs', file_format, write_id=write_id)
+    write_table(pulses, root_dir, 'pulses', file_format, write_id=write_id)
+    for path in old_files['pulses'] + old_files['iocs']:
+        os.remove(path)
+
+
+def _partition_files(root_dir, table, days, file_format):
+    """Lists the data files currently stored in the given day partitions of a table."""
+    extension = 'arrow' if file_format == 'feather' else 'parquet'
+    files = []
+    for day in days:
+        directory = os.path.join(root_dir, table, f"{PARTITION_COLUMN}={day}")
+        if os.path.isdir(directory):
+            files.extend(os.path.join(directory, name) for name in sorted(os.listdir(directory)) if name.endswith(f".{extension}"))
+    return files
+
+
+def open_dataset(root_dir, table, file_format=COLUMNAR_FORMAT):
+    """
+    Opens one table as a memory-mapped pyarrow dataset, for scanning it in batches.
+
+    Args:
+        root_dir (str): The root directory of the store.
+        table (str): 'pulses' or 'iocs'.
+        file_format (str): 'parquet' or 'feather'.
+
+    Returns:
+        pyarrow.dataset.Dataset: The dataset. Use '.scanner(...)' / '.to_batches(...)' to process it
+                                 without loading everything into memory.
+    """
+    schema = TABLE_SCHEMAS[table].append(pa.field(PARTITION_COLUMN, pa.string()))
+    return ds.dataset(
+        os.path.join(os.path.abspath(root_dir), table),
+        schema=schema,
+        format=_dataset_format(file_format),
+        partitioning=PARTITIONING,
+        filesystem=_LOCAL_FS,
+    )
+
+
+def _day_string(value):
+    """Converts a date, datetime or ISO string to 'YYYY-MM-DD'."""
+    if isinstance(value, (date, datetime)):
+        return value.strftime('%Y-%m-%d')
+    return pd.Timestamp(value).strftime('%Y-%m-%d')
+
+
+def _utc_timestamp(value):
+    """Converts a date, datetime or ISO string to a UTC timestamp, treating naive values as UTC."""
+    timestamp = pd.Timestamp(value)
+    return timestamp.tz_localize('UTC') if timestamp.tzinfo is None else timestamp.tz_convert('UTC')
+
+
+def build_filter(start=None, end=None, types=None, date_column=None):
+    """
+    Builds a pyarrow filter expression for a creation date range and indicator types.
+
+    The date range is applied to the partition column, so whole days are skipped without
+    opening their files. If 'date_column' is given, it is also applied exactly to that column;
+    otherwise the range works at day granularity.
+
+    Args:
+        start (date | datetime | str, optional): Earliest creation time, inclusive.
+        end (date | datetime | str, optional): Latest creation time, exclusive.
+        types (list, optional): Indicator types to keep, e.g. ['IPv4', 'domain'].
+        date_column (str, optional): A timestamp column to filter exactly, e.g. 'creation_date'.
+
+    Returns:
+        pyarrow.dataset.Expression: The filter, or None if there is nothing to filter on.
+    """
+    conditions = []
+    if start is not None:
+        conditions.append(ds.field(PARTITION_COLUMN) >= _day_string(start))
+        if date_column:
+            conditions.append(ds.field(date_column) >= pa.scalar(_utc_timestamp(start), pa.timestamp('us', tz='UTC')))
+    if end is not None:
+        if date_column:
+            # The end day itself may still hold rows before 'end', so keep its partition and filter exactly.
+            conditions.append(ds.field(PARTITION_COLUMN) <= _day_string(end))
+            conditions.append(ds.field(date_column) < pa.scalar(_utc_timestamp(end), pa.timestamp('us', tz='UTC')))
+        else:
+            conditions.append(ds.field(PARTITION_COLUMN) < _day_string(end))
+    if types:
+        conditions.append(ds.field('type').isin(list(types)))
+
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def _has_repeated_writes(dataset):
+    """Returns True if any partition holds more than one file, i.e. a write was interrupted before it finished."""
+    directories = [os.path.dirname(path) for path in dataset.files]
+    return len(set(directories)) < len(directories)
+
+
+def _latest_writes(root_dir, file_format):
+    """Maps each pulse id to the write id of the most recent write that saved the pulse."""
+    keys = open_dataset(root_dir, 'pulses', file_format).to_table(columns=['pulse_id', FILENAME_COLUMN]).to_pandas()
+    keys['write_id'] = keys[FILENAME_COLUMN].map(_file_write_id)
+    # Write ids start with their creation time, so the greatest one is the latest write.
+    return keys.groupby('pulse_id', sort=False)['write_id'].max()
+
+
+def _latest_mask(root_dir, rows, file_format):
+    """
+    Marks the rows (read with the file name column) that belong to their pulse's latest write.
+
+    Freshness is always decided on the pulses table, so a pulse that was saved again is read back
+    with exactly the indicators of that write, even if it then had none.
+    """
+    latest = _latest_writes(root_dir, file_format)
+    write_ids = pd.Series(rows.column(FILENAME_COLUMN).to_pylist()).map(_file_write_id)
+    pulse_ids = pd.Series(rows.column('pulse_id').to_pylist())
+    return (write_ids.to_numpy() == pulse_ids.map(latest).to_numpy()).tolist()
+
+
+def _read_latest(root_dir, table, columns, expression, file_format):
+    """
+    Reads a table's rows as an Arrow table, keeping for each pulse only the rows of its latest write
+    (see '_latest_mask'). That check is skipped while every partition holds a single file.
+    """
+    dataset = open_dataset(root_dir, table, file_format)
+    pulses_dataset = dataset if table == 'pulses' else open_dataset(root_dir, 'pulses', file_format)
+    if not _has_repeated_writes(dataset) and not _has_repeated_writes(pulses_dataset):
+        return dataset.to_table(columns=columns, filter=expression)
+
+    read_columns = list(columns or dataset.schema.names)
+    extra_columns = [column for column in ('pulse_id', FILENAME_COLUMN) if column not in read_columns]
+    rows = dataset.to_table(columns=read_columns + extra_columns, filter=expression)
+    rows = rows.filter(pa.array(_latest_mask(root_dir, rows, file_format)))
+    return rows.drop_columns(extra_columns)
+
+
+def read_pulses(root_dir, columns=None, start=None, end=None, file_format=COLUMNAR_FORMAT):
+    """
+    Reads normalized pulses back, reading only the requested columns and date range.
+
+    A pulse saved by several runs is returned once, as the most recent run saved it.
+
+    Args:
+        root_dir (str): The root directory of the store.
+        columns (list, optional): Columns to read. Defaults to all of them.
+        start (date | datetime | str, optional): Earliest creation time, inclusive.
+        end (date | datetime | str, optional): Latest creation time, exclusive.
+        file_format (str): 'parquet' or 'feather'.
+
+    Returns:
+        pd.DataFrame: The matching pulses.
+    """
+    expression = build_filter(start=start, end=end, date_column='creation_date')
+    return _read_latest(root_dir, 'pulses', columns, expression, file_format).to_pandas()
+
+
+def read_iocs(root_dir, columns=None, start=None, end=None, types=None, file_format=COLUMNAR_FORMAT):
+    """
+    Reads the indicator table back, reading only the requested columns, days and types.
+
+    The date range refers to the creation day of the pulse each indicator belongs to.
+    For a pulse saved by several runs, only the indicators from the most recent run are returned.
+
+    Args:
+        root_dir (str): The root directory of the store.
+        columns (list, optional): Columns to read. Defaults to all of them.
+        start (date | datetime | str, optional): First pulse creation day, inclusive.
+        end (date | datetime | str, optional): Last pulse creation day, exclusive.
+        types (list, optional): Indicator types to keep, e.g. ['IPv4', 'domain'].
+        file_format (str): 'parquet' or 'feather'.
+
+    Returns:
+        pd.DataFrame: The matching indicators.
+    """
+    expression = build_filter(start=start, end=end, types=types)
+    return _read_latest(root_dir, 'iocs', columns, expression, file_format).to_pandas()
@@ -2,9 +2,24 @@
 # Data normalization is a critical step to ensure the data is consistent and easy to work with
 # in the analysis phase. We use the pandas library for efficient data manipulation.
 
+import os
+from itertools import islice
+
 import pandas as pd
 
-def normalize_pulses(raw_pulses):
+from autoti.metrics import PULSES_NORMALIZED, IOCS_NORMALIZED
+
+# --- STREAMING CONFIGURATION ---
+# Number of raw pulses normalized at a time in streaming mode. Peak memory is
+# bounded by this chunk size rather than by the total number of pulses.
+NORMALIZE_CHUNK_SIZE = int(os.environ.get("AUTOTI_NORMALIZE_CHUNK_SIZE", 500))
+
+# --- INDICATOR TABLE SCHEMA ---
+# The columns kept for every indicator in the flat IOC table built by 'normalize_indicators'.
+IOC_COLUMNS = ['pulse_id', 'indicator_id', 'type', 'indicator', 'created', 'role', 'title', 'description', 'expiration', 'is_active']
+
+
+def normalize_pulses(raw_pulses, verbose=True):
     """
     Normalizes a list of raw threat intelligence pulses into a structured pandas DataFrame.
 
@@ -17,12 +32,14 @@ def normalize_pulses(raw_pulses):
 
     Args:
         raw_pulses (list): A list of dictionaries, where each is a raw pulse from OTX.
+        verbose (bool): Whether to print progress messages.
 
     Returns:
         pandas.DataFrame: A clean, structured DataFrame. Returns an empty DataFrame on failure.
     """
     if not raw_pulses:
-        print("Input pulse list is empty. Returning an empty DataFrame.")
+        if verbose:
+            print("Input pulse list is empty. Returning an empty DataFrame.")
         return pd.DataFrame()
 
     # Convert the list of dictionaries into a pandas DataFrame for easier processing.
@@ -32,7 +49,9 @@ def normalize_pulses(raw_pulses):
 
     # 1. Select Relevant Columns
     # We choose the columns that are most useful for our analysis.
-    required_columns = ['id', 'name', 'description', 'created', 'indicators']
+    # 'tags' and 'tlp' (Traffic Light Protocol) are kept for relevance ranking, as is
+    # 'duplicate_count' (the number of near-duplicate pulses merged, see 'autoti.processing.deduplication').
+    required_columns = ['id', 'name', 'description', 'created', 'indicators', 'tags', 'tlp', 'duplicate_count']
 
     # We filter for columns that actually exist in the DataFrame to avoid errors
     # if the API response changes.
@@ -51,24 +70,157 @@ def normalize_pulses(raw_pulses):
 
     # 3. Handle Missing Values
     # We replace any empty 'description' fields with a standard placeholder.
-    df_normalized['threat_description'].fillna('No description provided.', inplace=True)
+    df_normalized['threat_description'] = df_normalized['threat_description'].fillna('No description provided.')
 
     # 4. Convert Data Types
     # The 'created' field is a string, but it's more useful as a datetime object
     # for any time-based analysis.
-    df_normalized['creation_date'] = pd.to_datetime(df_normalized['creation_date'])
+    # 'ISO8601' accepts every ISO variant, since pulses from different feeds may be formatted differently.
+    # 'utc=True' converts timestamps with an offset to UTC and takes those without one (as OTX sends them)
+    # to be in UTC, so feeds that disagree on offsets can still be mixed.
+    df_normalized['creation_date'] = pd.to_datetime(df_normalized['creation_date'], format='ISO8601', utc=True)
 
     # 5. Feature Engineering: Extract and Count IOCs
     # We create a new column, 'ioc_count', to store the number of Indicators of Compromise
     # for each threat pulse. This is a useful metric for assessing the pulse's scope.
+    # Missing or malformed lists count as 0. A plain comprehension is used rather than '.str.len()',
+    # which fails outright when no pulse in the batch has a list at all.
     if 'indicators' in df_normalized.columns:
-        df_normalized['ioc_count'] = df_normalized['indicators'].apply(lambda ioc_list: len(ioc_list) if isinstance(ioc_list, list) else 0)
+        df_normalized['ioc_count'] = pd.Series(
+            [len(value) if isinstance(value, list) else 0 for value in df_normalized['indicators']],
+            index=df_normalized.index, dtype='int64',
+        )
     else:
         df_normalized['ioc_count'] = 0
 
-    print("Data normalization complete.")
+    if 'duplicate_count' in df_normalized.columns:
+        df_normalized['duplicate_count'] = df_normalized['duplicate_count'].fillna(1).astype('int64')
+
+    PULSES_NORMALIZED.inc(len(df_normalized))
+    IOCS_NORMALIZED.inc(int(df_normalized['ioc_count'].sum()))
+
+    if verbose:
+        print("Data normalization complete.")
     return df_normalized
 
+
+def normalize_indicators(raw_pulses):
+    """
+    Flattens the indicators (IOCs) of every pulse into a single typed table.
+
+    Where 'normalize_pulses' gives one row per pulse, this gives one row per indicator,
+    which is the shape downstream matching and aggregation need. The whole table is
+    built in one 'json_normalize' pass rather than row by row.
+
+    Args:
+        raw_pulses (list): A list of dictionaries, where each is a raw pulse from OTX.
+
+    Returns:
+        pandas.DataFrame: One row per indicator with the columns in 'IOC_COLUMNS'.
+                          'type' is categorical and 'created' is a datetime.
+    """
+    # json_normalize expects every record to have an 'indicators' list, so skip pulses without one.
+    pulses_with_iocs = [pulse for pulse in raw_pulses or [] if isinstance(pulse.get('indicators'), list) and pulse['indicators']]
+    if not pulses_with_iocs:
+        return _empty_indicator_table()
+
+    # 'meta_prefix' turns the pulse 'id' into 'pulse_id', so it does not clash with the indicator's own 'id'.
+    df_iocs = pd.json_normalize(pulses_with_iocs, record_path='indicators', meta=['id'], meta_prefix='pulse_')
+    df_iocs.rename(columns={'id': 'indicator_id'}, inplace=True)
+
+    # Not every indicator carries every optional field, so add any missing columns as empty.
+    df_iocs = df_iocs.reindex(columns=IOC_COLUMNS)
+    return _apply_indicator_dtypes(df_iocs)
+
+
+def count_indicators(df_iocs):
+    """
+    Counts indicators per pulse from a table produced by 'normalize_indicators'.
+
+    Args:
+        df_iocs (pandas.DataFrame): The flat indicator table.
+
+    Returns:
+        pandas.Series: The number of indicators for each 'pulse_id'.
+    """
+    return df_iocs.groupby('pulse_id', sort=False).size()
+
+
+def _empty_indicator_table():
+    """Returns an empty indicator table with the expected columns and types."""
+    return _apply_indicator_dtypes(pd.DataFrame(columns=IOC_COLUMNS))
+
+
+def _apply_indicator_dtypes(df_iocs):
+    """Converts the indicator table columns to compact, analysis-friendly types."""
+    # Every column gets a fixed type, even when all its values are missing, so tables built
+    # from different batches of pulses always line up (e.g. when written as partitions).
+    df_iocs['pulse_id'] = df_iocs['pulse_id'].astype('string')
+    df_iocs['indicator_id'] = pd.to_numeric(df_iocs['indicator_id'], errors='coerce').astype('Int64')
+    df_iocs['indicator'] = df_iocs['indicator'].astype('string')
+    df_iocs['type'] = df_iocs['type'].astype('string').astype('category')
+    df_iocs['role'] = df_iocs['role'].astype('string')
+    df_iocs['title'] = df_iocs['title'].astype('string')
+    df_iocs['description'] = df_iocs['description'].astype('string')
+    df_iocs['is_active'] = pd.to_numeric(df_iocs['is_active'], errors='coerce').astype('Int8')
+    # Timestamps are converted to UTC (as in 'normalize_pulses') and stored without an offset,
+    # so indicators from feeds that write 'Z' or '+02:00' share one column type with OTX's.
+    for column in ('created', 'expiration'):
+        parsed = pd.to_datetime(df_iocs[column], errors='coerce', utc=True, format='ISO8601')
+        df_iocs[column] = parsed.dt.tz_localize(None).astype('datetime64[us]')
+    return df_iocs
+
+
+def iter_normalized_chunks(pulses, chunk_size=NORMALIZE_CHUNK_SIZE, transform=None):
+    """
+    Normalizes a stream of raw pulses in fixed-size chunks.
+
+    Only one chunk of raw pulses is held in memory at a time. The heavy nested
+    'indicators' column is dropped once 'ioc_count' has been computed from it.
+
+    Args:
+        pulses (iterable): Raw pulse dictionaries, e.g. from 'iter_pulses'.
+        chunk_size (int): Number of raw pulses to normalize at a time.
+        transform (callable, optional): A function applied to each normalized chunk while it
+                                        still has its 'indicators' column, e.g. 'score_pulses'.
+
+    Yields:
+        pandas.DataFrame: A normalized DataFrame for each chunk, without the 'indicators' column.
+    """
+    pulses = iter(pulses)
+    while True:
+        chunk = list(islice(pulses, chunk_size))
+        if not chunk:
+            return
+        df_chunk = normalize_pulses(chunk, verbose=False)
+        if transform is not None:
+            df_chunk = transform(df_chunk)
+        yield df_chunk.drop(columns=['indicators'], errors='ignore')
+
+
+def select_top_k(chunks, k=5, by='ioc_count'):
+    """
+    Keeps only the 'k' highest-ranked rows from a stream of normalized chunks.
+
+    Each chunk is merged with the current top rows and immediately cut back down
+    with 'nlargest', so memory stays at O(chunk + k) no matter how long the stream is.
+
+    Args:
+        chunks (iterable): Normalized DataFrames, e.g. from 'iter_normalized_chunks'.
+        k (int): Number of rows to keep.
+        by (str): The column to rank rows by.
+
+    Returns:
+        pandas.DataFrame: The top 'k' rows, highest first. Returns an empty DataFrame if there were no rows.
+    """
+    top_rows = pd.DataFrame()
+    for df_chunk in chunks:
+        if df_chunk.empty:
+            continue
+        candidates = pd.concat([top_rows, df_chunk], ignore_index=True) if not top_rows.empty else df_chunk
+        top_rows = candidates.nlargest(k, by)
+    return top_rows.reset_index(drop=True)
+
 # --- STANDALONE EXECUTION FOR TESTING ---
 if __name__ == "__main__":
     # This block allows the script to be run directly for testing.
@@ -105,3 +257,10 @@ if __name__ == "__main__":
     print("\n--- DataFrame Info ---")
     # .info() gives a useful summary of the DataFrame's structure and data types.
     normalized_df.info()
+
+    # The flat indicator table has one row per IOC, linked back to its pulse by 'pulse_id'.
+    indicators_df = normalize_indicators(sample_raw_data)
+    print("\n--- Indicator Table ---")
+    print(indicators_df[['pulse_id', 'type', 'indicator']])
+    print("\n--- IOC Count per Pulse ---")
+    print(count_indicators(indicators_df))
@@ -0,0 +1,207 @@
+# This script merges near-duplicate pulses before they are analysed.
+# OTX subscriptions contain many near-identical pulses (re-shares, the same campaign published
+# by several authors). Without this step every later stage (normalization, ranking, the LLM)
+# processes the same content several times over.
+#
+# How it works:
+# - Each pulse is turned into a set of tokens: its indicators plus word shingles
+#   (runs of consecutive words) from its name and description.
+# - A MinHash signature is computed for every set. The share of equal signature values between
+#   two pulses estimates the Jaccard similarity of their token sets.
+# - Locality-sensitive hashing (LSH) splits signatures into bands, and only pulses that share a
+#   band are compared, so the work grows with the number of pulses rather than its square.
+# - Candidate pairs at or above DEDUP_THRESHOLD are clustered, and each cluster is replaced by
+#   one representative pulse carrying the merged indicators and tags of the whole cluster.
+
+import os
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+from autoti.metrics import DUPLICATE_PULSES
+
+# --- CLUSTERING CONFIGURATION ---
+# Estimated Jaccard similarity at or above which two pulses count as near-duplicates.
+DEDUP_THRESHOLD = float(os.environ.get("AUTOTI_DEDUP_THRESHOLD", 0.7))
+# Number of hash functions in each MinHash signature. More functions give better estimates.
+MINHASH_PERMUTATIONS = 128
+# Number of LSH bands the signature is split into. With 128 hash functions, 32 bands of
+# 4 values find pairs well below DEDUP_THRESHOLD, which are then checked against it.
+LSH_BANDS = 32
+# Number of consecutive words in each name/description shingle.
+SHINGLE_SIZE = 3
+# Pulses are hashed in batches of this size, which bounds the memory used for signatures.
+SIGNATURE_BATCH_SIZE = 256
+# Each hash function maps a 64-bit token hash to '(a * x + b) >> 32' (multiply-add-shift, with
+# 64-bit wrap-around), which needs no modulo and so is several times faster than '(a * x + b) mod p'.
+_MINHASH_SEED = 1
+
+
+def pulse_tokens(pulse):
+    """
+    Builds the token set MinHash is computed over for one pulse.
+
+    Args:
+        pulse (dict): A raw pulse from OTX.
+
+    Returns:
+        set: Indicator tokens ('ioc:<value>') and text shingles ('txt:<words>'). Never empty.
+    """
+    tokens = {
+        f"ioc:{str(indicator.get('indicator', '')).strip().lower()}"
+        for indicator in pulse.get('indicators') or []
+        if isinstance(indicator, dict) and indicator.get('indicator')
+    }
+    words = f"{pulse.get('name') or ''} {pulse.get('description') or ''}".lower().split()
+    if len(words) < SHINGLE_SIZE:
+        tokens.update(f"txt:{word}" for word in words)
+    else:
+        tokens.update(f"txt:{' '.join(words[i:i + SHINGLE_SIZE])}" for i in range(len(words) - SHINGLE_SIZE + 1))
+    if not tokens:
+        # A pulse with no indicators and no text can only ever match itself.
+        tokens.add(f"id:{pulse.get('id')}")
+    return tokens
+
+
+def minhash_signatures(token_sets, num_perm=MINHASH_PERMUTATIONS):
+    """
+    Computes a MinHash signature for each token set.
+
+    Args:
+        token_sets (list): Non-empty sets of string tokens, e.g. from 'pulse_tokens'.
+        num_perm (int): Number of hash functions (the signature length).
+
+    Returns:
+        np.ndarray: A '(len(token_sets), num_perm)' array of 32-bit unsigned integers.
+    """
+    rng = np.random.default_rng(_MINHASH_SEED)
+    # The multipliers must be odd for the hash functions to be universal.
+    a = (rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64) << np.uint64(1)) | np.uint64(1)
+    b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+
+    signatures = np.empty((len(token_sets), num_perm), dtype=np.uint32)
+    for start in range(0, len(token_sets), SIGNATURE_BATCH_SIZE):
+        batch = token_sets[start:start + SIGNATURE_BATCH_SIZE]
+        lengths = np.fromiter(map(len, batch), dtype=np.int64, count=len(batch))
+        tokens = np.fromiter(chain.from_iterable(batch), dtype=object, count=int(lengths.sum()))
+        # pandas hashes a whole array of strings in C, with a fixed key, so signatures are stable across runs.
+        # The tokens of a set are already unique, so factorizing them first ('categorize') would only cost time.
+        hashes = pd.util.hash_array(tokens, categorize=False)
+        # One row per hash function, so each row is reduced over contiguous memory.
+        permuted = ((a[:, None] * hashes + b[:, None]) >> np.uint64(32)).astype(np.uint32)
+        # Each set's tokens are contiguous, so the minimum per set is a single 'reduceat'.
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        signatures[start:start + len(batch)] = np.minimum.reduceat(permuted, offsets, axis=1).T
+    return signatures
+
+
+def cluster_signatures(signatures, threshold=DEDUP_THRESHOLD, bands=LSH_BANDS):
+    """
+    Groups near-duplicate signatures using locality-sensitive hashing.
+
+    Args:
+        signatures (np.ndarray): Signatures from 'minhash_signatures'.
+        threshold (float): Minimum estimated Jaccard similarity for two rows to be clustered.
+        bands (int): Number of LSH bands. Must divide the signature length.
+
+    Returns:
+        list: Clusters as lists of row numbers, each in ascending order, ordered by their first row.
+    """
+    n, num_perm = signatures.shape
+    rows = num_perm // bands
+    parent = list(range(n))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    positions = np.arange(n)
+    for band in range(bands):
+        band_values = signatures[:, band * rows:(band + 1) * rows]
+        # Sorting the band brings equal bands (the LSH bucket) next to each other.
+        order = np.lexsort(band_values.T[::-1])
+        sorted_values = band_values[order]
+        starts = np.ones(n, dtype=bool)
+        starts[1:] = (sorted_values[1:] != sorted_values[:-1]).any(axis=1)
+        bucket_first = order[np.maximum.accumulate(np.where(starts, positions, 0))]
+
+        # Every bucket member is checked against the bucket's first member only.
+        candidates = bucket_first != order
+        if not candidates.any():
+            continue
+        members, firsts = order[candidates], bucket_first[candidates]
+        similarity = (signatures[members] == signatures[firsts]).mean(axis=1)
+        for member, first in zip(members[similarity >= threshold].tolist(), firsts[similarity >= threshold].tolist()):
+            root_member, root_first = find(member), find(first)
+            if root_member != root_first:
+                parent[max(root_member, root_first)] = min(root_member, root_first)
+
+    clusters = {}
+    for i in range(n):
+        clusters.setdefault(find(i), []).append(i)
+    return list(clusters.values())
+
+
+def merge_cluster(pulses):
+    """
+    Merges a cluster of near-duplicate pulses into one representative.
+
+    The pulse with the most indicators is kept, with the indicators and tags of the other
+    pulses added to it. The input pulses are not modified.
+
+    Args:
+        pulses (list): The raw pulses of one cluster, in their original order.
+
+    Returns:
+        dict: The representative pulse, with 'duplicate_count' (the cluster size) and
+              'duplicate_ids' (the ids of the pulses merged into it).
+    """
+    representative = max(pulses, key=lambda pulse: len(pulse.get('indicators') or []))
+    merged = dict(representative)
+    merged['duplicate_count'] = len(pulses)
+    merged['duplicate_ids'] = [pulse.get('id') for pulse in pulses if pulse is not representative]
+    if len(pulses) == 1:
+        return merged
+
+    indicators, seen = [], set()
+    tags = []
+    for pulse in [representative] + [pulse for pulse in pulses if pulse is not representative]:
+        for indicator in pulse.get('indicators') or []:
+            key = (indicator.get('type'), indicator.get('indicator'))
+            if key not in seen:
+                seen.add(key)
+                indicators.append(indicator)
+        tags.extend(tag for tag in pulse.get('tags') or [] if tag not in tags)
+    merged['indicators'] = indicators
+    if 'tags' in representative or tags:
+        merged['tags'] = tags
+    return merged
+
+
+def deduplicate_pulses(raw_pulses, threshold=DEDUP_THRESHOLD, verbose=True):
+    """
+    Replaces each cluster of near-duplicate pulses with one merged representative.
+
+    Args:
+        raw_pulses (list): A list of raw pulse dictionaries from OTX (or the other feeds).
+        threshold (float): Minimum estimated Jaccard similarity for two pulses to be merged.
+        verbose (bool): Whether to print progress messages.
+
+    Returns:
+        list: One pulse per cluster, in the order each cluster first appeared.
+    """
+    raw_pulses = list(raw_pulses or [])
+    if not raw_pulses:
+        return []
+
+    signatures = minhash_signatures([pulse_tokens(pulse) for pulse in raw_pulses])
+    clusters = cluster_signatures(signatures, threshold=threshold)
+    deduplicated = [merge_cluster([raw_pulses[i] for i in cluster]) for cluster in clusters]
+
+    DUPLICATE_PULSES.inc(len(raw_pulses) - len(deduplicated))
+    if verbose:
+        print(f"Near-duplicate merging reduced {len(raw_pulses)} pulses to {len(deduplicated)}.")
+    return deduplicated
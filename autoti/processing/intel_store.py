@@ -0,0 +1,395 @@
+# This script provides the indexed local store behind the JSON API ('autoti.api'), backed by SQLite.
+# Every pipeline run saves its pulses and their indicators here, already flattened, so other tools
+# (e.g. SIEM integrations) can query them without going back to OTX.
+#
+# - Pulses and indicators are stored one row each, with the field names 'normalize_pulses' and
+#   'normalize_indicators' use.
+# - Indexes cover the queries the API makes: indicator lookups by value, filters by indicator
+#   type and time range, and paging through results newest first.
+# - Paging uses keyset cursors ('created', 'id') instead of offsets, so later pages cost the same
+#   as the first one.
+#
+# Only pulses whose 'modified' time (or merged counts) changed are rewritten on each run. Pulses
+# merged into another one by 'deduplicate_pulses' are deleted, so they are only served once.
+# Pulses created more than INTEL_STORE_RETENTION_DAYS ago are deleted.
+
+import os
+import json
+import base64
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+# --- STORE CONFIGURATION ---
+# Location of the SQLite database file. It is created on first use.
+INTEL_STORE_PATH = os.environ.get("AUTOTI_INTEL_STORE_PATH", "autoti_intel.db")
+# Number of days pulses are kept, counted from their creation date.
+INTEL_STORE_RETENTION_DAYS = int(os.environ.get("AUTOTI_INTEL_STORE_RETENTION_DAYS", 30))
+# Pulse ids and indicator values are looked up in batches of this size, below SQLite's limit on query parameters.
+ID_BATCH_SIZE = 500
+# Maximum number of idle connections kept open for reuse. Connections returned to a full pool are closed,
+# so a burst of concurrent requests never leaves more than this many open afterwards.
+INTEL_STORE_POOL_SIZE = int(os.environ.get("AUTOTI_INTEL_STORE_POOL_SIZE", 4))
+
+# The fields returned for each pulse and each indicator.
+PULSE_FIELDS = ['pulse_id', 'threat_name', 'threat_description', 'creation_date', 'modified', 'tlp', 'tags', 'ioc_count', 'duplicate_count']
+IOC_FIELDS = ['pulse_id', 'indicator_id', 'type', 'indicator', 'created', 'role', 'title', 'description', 'expiration', 'is_active']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pulses (
+    id INTEGER PRIMARY KEY,
+    pulse_id TEXT NOT NULL UNIQUE,
+    threat_name TEXT,
+    threat_description TEXT,
+    creation_date TEXT NOT NULL,
+    modified TEXT,
+    tlp TEXT,
+    tags TEXT,
+    ioc_count INTEGER NOT NULL,
+    duplicate_count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pulses_created ON pulses (creation_date, id);
+CREATE TABLE IF NOT EXISTS iocs (
+    id INTEGER PRIMARY KEY,
+    pulse_id TEXT NOT NULL,
+    indicator_id INTEGER,
+    type TEXT,
+    indicator TEXT NOT NULL,
+    lookup_value TEXT NOT NULL,
+    created TEXT NOT NULL,
+    role TEXT,
+    title TEXT,
+    description TEXT,
+    expiration TEXT,
+    is_active INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_iocs_lookup ON iocs (lookup_value);
+CREATE INDEX IF NOT EXISTS idx_iocs_pulse ON iocs (pulse_id, type);
+CREATE INDEX IF NOT EXISTS idx_iocs_created ON iocs (created, id);
+CREATE INDEX IF NOT EXISTS idx_iocs_type_created ON iocs (type, created, id);
+"""
+
+
+def sortable_time(value):
+    """
+    Converts a timestamp to a naive UTC ISO string, so timestamps from every feed sort and compare correctly.
+
+    Args:
+        value (str | datetime | None): An ISO 8601 timestamp or date.
+
+    Returns:
+        str: 'YYYY-MM-DDTHH:MM:SS', or an empty string for a missing value.
+
+    Raises:
+        ValueError: If the value is not an ISO 8601 timestamp.
+    """
+    if not value:
+        return ''
+    parsed = value if isinstance(value, datetime) else datetime.fromisoformat(str(value).strip().replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.isoformat(timespec='seconds')
+
+
+def lookup_value(indicator):
+    """Normalizes an indicator value for exact-match lookups (trimmed and case-insensitive)."""
+    return str(indicator).strip().lower()
+
+
+def encode_cursor(sort_time, row_id):
+    """Encodes the position after a row as an opaque, URL-safe cursor string."""
+    return base64.urlsafe_b64encode(json.dumps([sort_time, row_id]).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decodes a cursor from 'encode_cursor'.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        sort_time, row_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as err:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from err
+    if not isinstance(sort_time, str) or not isinstance(row_id, int):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return sort_time, row_id
+
+
+def _safe_time(value):
+    """Like 'sortable_time', but keeps an unparseable timestamp as it is rather than failing."""
+    try:
+        return sortable_time(value)
+    except (ValueError, TypeError):
+        return str(value)
+
+
+class IntelStore:
+    """
+    A thread-safe, indexed store of pulses and indicators for the JSON API.
+
+    Each call borrows a connection from a small pool and returns it when it is done, so
+    connections are shared by the threads that serve requests instead of one being left open
+    per thread. The database runs in WAL mode, so API requests can read while a pipeline run
+    (in this or another process) is writing.
+    """
+
+    def __init__(self, path=INTEL_STORE_PATH, retention_days=INTEL_STORE_RETENTION_DAYS, pool_size=INTEL_STORE_POOL_SIZE):
+        """
+        Args:
+            path (str): Path to the SQLite database file.
+            retention_days (int): Number of days pulses are kept after their creation date.
+            pool_size (int): Maximum number of idle connections kept open for reuse.
+        """
+        self.path = path
+        self.retention_days = retention_days
+        self.pool_size = pool_size
+        self._idle = []
+        self._pool_lock = threading.Lock()
+        self._closed = False
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connection(self):
+        """Borrows an idle connection (or opens a new one) for the duration of a 'with' block."""
+        with self._pool_lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            # A connection is only used by one thread at a time, but may move between threads.
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            with self._pool_lock:
+                keep = not self._closed and len(self._idle) < self.pool_size
+                if keep:
+                    self._idle.append(conn)
+            if not keep:
+                conn.close()
+
+    # --- WRITING ---
+    def upsert_pulses(self, raw_pulses):
+        """
+        Saves pulses and their indicators, replacing older copies of the same pulses.
+
+        Stored copies of the pulses merged into each one ('duplicate_ids') are deleted: a pulse
+        saved on its own in an earlier run may have been merged into a larger one since.
+
+        Args:
+            raw_pulses (list): Raw pulse dictionaries, e.g. after 'deduplicate_pulses'.
+
+        Returns:
+            int: The number of pulses that were inserted or updated.
+        """
+        now = sortable_time(datetime.now(timezone.utc))
+        rows = {}
+        merged_ids = set()
+        for pulse in raw_pulses or []:
+            if not pulse.get('id'):
+                continue
+            merged_ids.update(str(pulse_id) for pulse_id in pulse.get('duplicate_ids') or [])
+            indicators = [ioc for ioc in pulse.get('indicators') or [] if isinstance(ioc, dict) and ioc.get('indicator')]
+            rows[str(pulse['id'])] = (pulse, indicators, (
+                str(pulse['id']),
+                pulse.get('name'),
+                pulse.get('description') or 'No description provided.',
+                _safe_time(pulse.get('created')) or now,
+                _safe_time(pulse.get('modified')),
+                pulse.get('tlp'),
+                json.dumps(pulse.get('tags') or []),
+                len(indicators),
+                int(pulse.get('duplicate_count') or 1),
+            ))
+
+        merged_ids = [(pulse_id,) for pulse_id in merged_ids - rows.keys()]
+        with self._connection() as conn, conn:
+            conn.executemany("DELETE FROM iocs WHERE pulse_id = ?", merged_ids)
+            conn.executemany("DELETE FROM pulses WHERE pulse_id = ?", merged_ids)
+            # Pulses whose stored copy is identical are skipped, so re-saving the same window costs no writes.
+            stored = self._stored_versions(conn, list(rows))
+            changed = [row for pulse_id, row in rows.items() if stored.get(pulse_id) != (row[2][4], row[2][7], row[2][8])]
+            conn.executemany(
+                "INSERT INTO pulses (pulse_id, threat_name, threat_description, creation_date, modified, tlp, tags, ioc_count, duplicate_count) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(pulse_id) DO UPDATE SET threat_name = excluded.threat_name, "
+                "threat_description = excluded.threat_description, creation_date = excluded.creation_date, "
+                "modified = excluded.modified, tlp = excluded.tlp, tags = excluded.tags, "
+                "ioc_count = excluded.ioc_count, duplicate_count = excluded.duplicate_count",
+                (values for _, _, values in changed),
+            )
+            conn.executemany("DELETE FROM iocs WHERE pulse_id = ?", ((values[0],) for _, _, values in changed))
+            conn.executemany(
+                "INSERT INTO iocs (pulse_id, indicator_id, type, indicator, lookup_value, created, role, title, description, expiration, is_active) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        values[0], ioc.get('id'), ioc.get('type'), str(ioc['indicator']), lookup_value(ioc['indicator']),
+                        # Indicators without their own timestamp are dated by their pulse.
+                        _safe_time(ioc.get('created')) or values[3], ioc.get('role'), ioc.get('title'),
+                        ioc.get('description'), _safe_time(ioc.get('expiration')) or None, ioc.get('is_active'),
+                    )
+                    for _, indicators, values in changed
+                    for ioc in indicators
+                ),
+            )
+            self._evict(conn)
+        return len(changed)
+
+    def _stored_versions(self, conn, pulse_ids):
+        """Returns what decides whether each stored pulse must be rewritten, keyed by pulse id."""
+        versions = {}
+        for start in range(0, len(pulse_ids), ID_BATCH_SIZE):
+            batch = pulse_ids[start:start + ID_BATCH_SIZE]
+            rows = conn.execute(
+                f"SELECT pulse_id, modified, ioc_count, duplicate_count FROM pulses WHERE pulse_id IN ({', '.join('?' * len(batch))})",
+                batch,
+            )
+            versions.update((row['pulse_id'], (row['modified'], row['ioc_count'], row['duplicate_count'])) for row in rows)
+        return versions
+
+    def _evict(self, conn):
+        """Deletes pulses (and their indicators) older than the retention period."""
+        cutoff = (datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=self.retention_days)).isoformat(timespec='seconds')
+        conn.execute("DELETE FROM iocs WHERE pulse_id IN (SELECT pulse_id FROM pulses WHERE creation_date < ?)", (cutoff,))
+        conn.execute("DELETE FROM pulses WHERE creation_date < ?", (cutoff,))
+
+    # --- QUERIES ---
+    def query_pulses(self, since=None, until=None, ioc_type=None, limit=100, cursor=None):
+        """
+        Lists pulses, newest first.
+
+        Args:
+            since (str, optional): Only pulses created at or after this ISO timestamp.
+            until (str, optional): Only pulses created before this ISO timestamp.
+            ioc_type (str, optional): Only pulses with at least one indicator of this type (e.g. 'IPv4').
+            limit (int): The page size.
+            cursor (str, optional): The 'next_cursor' of the previous page.
+
+        Returns:
+            tuple: (list of pulse dicts, the cursor for the next page or None).
+        """
+        where, params = self._time_filters('p.creation_date', 'p.id', since, until, cursor)
+        if ioc_type:
+            where.append("EXISTS (SELECT 1 FROM iocs i WHERE i.pulse_id = p.pulse_id AND i.type = ?)")
+            params.append(ioc_type)
+        with self._connection() as conn:
+            rows = conn.execute(
+                f"SELECT p.* FROM pulses p {self._where(where)} ORDER BY p.creation_date DESC, p.id DESC LIMIT ?",
+                params + [limit + 1],
+            ).fetchall()
+        return self._page(rows, limit, 'creation_date', self._pulse_dict)
+
+    def query_iocs(self, since=None, until=None, ioc_type=None, pulse_id=None, limit=100, cursor=None):
+        """
+        Lists indicators, newest first.
+
+        Args:
+            since (str, optional): Only indicators created at or after this ISO timestamp.
+            until (str, optional): Only indicators created before this ISO timestamp.
+            ioc_type (str, optional): Only indicators of this type (e.g. 'domain').
+            pulse_id (str, optional): Only the indicators of this pulse.
+            limit (int): The page size.
+            cursor (str, optional): The 'next_cursor' of the previous page.
+
+        Returns:
+            tuple: (list of indicator dicts, the cursor for the next page or None).
+        """
+        where, params = self._time_filters('created', 'id', since, until, cursor)
+        if ioc_type:
+            where.append("type = ?")
+            params.append(ioc_type)
+        if pulse_id:
+            where.append("pulse_id = ?")
+            params.append(pulse_id)
+        with self._connection() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM iocs {self._where(where)} ORDER BY created DESC, id DESC LIMIT ?",
+                params + [limit + 1],
+            ).fetchall()
+        return self._page(rows, limit, 'created', self._ioc_dict)
+
+    def lookup(self, values):
+        """
+        Finds the pulses that reported each of the given indicator values.
+
+        Args:
+            values (list): Indicator values (IPs, domains, hashes, ...). Matching ignores case and surrounding whitespace.
+
+        Returns:
+            dict: Each requested value mapped to a list of matches. A match is the indicator's fields plus
+                  'threat_name' and 'creation_date' of its pulse. Values with no match map to an empty list.
+        """
+        keys = {value: lookup_value(value) for value in values}
+        matches = {key: [] for key in keys.values()}
+        unique_keys = list(matches)
+        with self._connection() as conn:
+            for start in range(0, len(unique_keys), ID_BATCH_SIZE):
+                batch = unique_keys[start:start + ID_BATCH_SIZE]
+                rows = conn.execute(
+                    "SELECT i.*, p.threat_name, p.creation_date FROM iocs i LEFT JOIN pulses p ON p.pulse_id = i.pulse_id "
+                    f"WHERE i.lookup_value IN ({', '.join('?' * len(batch))}) ORDER BY i.created DESC, i.id DESC",
+                    batch,
+                ).fetchall()
+                for row in rows:
+                    match = self._ioc_dict(row)
+                    match['threat_name'] = row['threat_name']
+                    match['creation_date'] = row['creation_date']
+                    matches[row['lookup_value']].append(match)
+        return {value: matches[key] for value, key in keys.items()}
+
+    def _time_filters(self, time_column, id_column, since, until, cursor):
+        """Builds the WHERE conditions shared by the paged queries."""
+        where, params = [], []
+        if since:
+            where.append(f"{time_column} >= ?")
+            params.append(sortable_time(since))
+        if until:
+            where.append(f"{time_column} < ?")
+            params.append(sortable_time(until))
+        if cursor:
+            # Rows sort by (time, id) descending, so the next page starts strictly below the cursor.
+            where.append(f"({time_column}, {id_column}) < (?, ?)")
+            params.extend(decode_cursor(cursor))
+        return where, params
+
+    @staticmethod
+    def _where(conditions):
+        return f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    @staticmethod
+    def _page(rows, limit, time_column, to_dict):
+        """Cuts one extra row off the results, which tells whether there is a next page."""
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][time_column], rows[-1]['id'])
+        return [to_dict(row) for row in rows], next_cursor
+
+    @staticmethod
+    def _pulse_dict(row):
+        pulse = {field: row[field] for field in PULSE_FIELDS}
+        pulse['tags'] = json.loads(pulse['tags'] or '[]')
+        return pulse
+
+    @staticmethod
+    def _ioc_dict(row):
+        return {field: row[field] for field in IOC_FIELDS}
+
+    def clear(self):
+        """Deletes every pulse and indicator in the store."""
+        with self._connection() as conn, conn:
+            conn.execute("DELETE FROM iocs")
+            conn.execute("DELETE FROM pulses")
+
+    def close(self):
+        """Closes the idle connections. Connections still in use are closed as soon as they are returned."""
+        with self._pool_lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
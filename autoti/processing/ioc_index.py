@@ -0,0 +1,261 @@
+# This script builds an in-memory lookup index over the indicators (IOCs) collected from OTX.
+# It is what lets us use the threat intelligence against real traffic: log lines or events
+# are checked against the index, and any match tells us which pulses mention the observable.
+#
+# The index is organised for fast lookups rather than analysis:
+# - Domains, URLs, hashes and other exact values live in hash maps (O(1) lookups).
+# - IP addresses and CIDR ranges live in a prefix table keyed by prefix length, so an address
+#   is checked against every network containing it with at most one lookup per prefix length.
+
+import ipaddress
+from urllib.parse import urlsplit
+
+# --- INDICATOR TYPE MAPPING ---
+# OTX indicator types grouped by how they are matched.
+NETWORK_TYPES = {'IPv4', 'IPv6', 'CIDR'}
+DOMAIN_TYPES = {'domain', 'hostname'}
+URL_TYPES = {'URL', 'URI'}
+# Ports implied by a URL scheme, which are dropped when URLs are compared.
+DEFAULT_PORTS = {'http': 80, 'https': 443, 'ftp': 21}
+
+
+class IOCIndex:
+    """
+    An in-memory index of indicators, mapping each observable to the pulses that mention it.
+
+    Build it with 'build_ioc_index' from the flat indicator table, or add indicators one by one.
+    """
+
+    def __init__(self):
+        # Normalized domain -> set of pulse ids. Subdomains of a listed domain (of two labels or more) also match.
+        self._domains = {}
+        # Normalized URL -> set of pulse ids.
+        self._urls = {}
+        # Any other exact value (hashes, emails, CVEs, ...) -> set of pulse ids.
+        self._values = {}
+        # IP version -> {prefix length -> {network address as int -> set of pulse ids}}.
+        self._networks = {4: {}, 6: {}}
+        # IP version -> prefix lengths in use, longest first, so lookups only probe lengths that exist.
+        self._prefix_lengths = {4: [], 6: []}
+        self._size = 0
+
+    def __len__(self):
+        """Returns the number of indicators added to the index."""
+        return self._size
+
+    def add(self, ioc_type, value, pulse_id):
+        """
+        Adds one indicator to the index.
+
+        Args:
+            ioc_type (str): The OTX indicator type, e.g. 'IPv4', 'domain' or 'FileHash-SHA256'.
+            value (str): The indicator value.
+            pulse_id (str): The id of the pulse the indicator belongs to.
+        """
+        if not isinstance(value, str) or not value.strip():
+            return
+        value = value.strip()
+
+        if ioc_type in NETWORK_TYPES:
+            try:
+                network = ipaddress.ip_network(value, strict=False)
+            except ValueError:
+                # Malformed addresses are indexed as plain values so they are not silently lost.
+                self._values.setdefault(value.lower(), set()).add(pulse_id)
+            else:
+                self._add_network(network, pulse_id)
+        elif ioc_type in DOMAIN_TYPES:
+            self._domains.setdefault(_normalize_domain(value), set()).add(pulse_id)
+        elif ioc_type in URL_TYPES:
+            self._urls.setdefault(_normalize_url(value), set()).add(pulse_id)
+        else:
+            # Hashes and emails are case-insensitive, so all other values are lowercased.
+            self._values.setdefault(value.lower(), set()).add(pulse_id)
+        self._size += 1
+
+    def _add_network(self, network, pulse_id):
+        """Stores an IP network under its prefix length."""
+        version = network.version
+        by_length = self._networks[version]
+        if network.prefixlen not in by_length:
+            by_length[network.prefixlen] = {}
+            self._prefix_lengths[version] = sorted(by_length, reverse=True)
+        by_length[network.prefixlen].setdefault(int(network.network_address), set()).add(pulse_id)
+
+    def lookup(self, observable):
+        """
+        Looks up a single observable.
+
+        The type of the observable is inferred: IP addresses are matched against listed
+        addresses and CIDR ranges, URLs are matched exactly (ignoring the case of the scheme
+        and host, and default ports) and by their host, domains are matched along with their
+        parent domains of at least two labels, and anything else is matched exactly.
+
+        Args:
+            observable (str): An IP address, domain, URL, hash or other value seen in a log or event.
+
+        Returns:
+            set: The ids of the pulses that mention the observable. Empty if there is no match.
+        """
+        if not isinstance(observable, str):
+            return set()
+        observable = observable.strip()
+        if not observable:
+            return set()
+
+        if '://' in observable:
+            matches = set(self._urls.get(_normalize_url(observable), ()))
+            host = urlsplit(observable).hostname
+            if host:
+                matches |= self._lookup_host(host)
+            return matches
+
+        matches = self._lookup_host(observable)
+        matches |= self._values.get(observable.lower(), set())
+        return matches
+
+    def _lookup_host(self, host):
+        """Looks up a bare host, which may be an IP address or a domain name."""
+        # Only attempt IP parsing for strings that can be addresses; exceptions are costly in hot loops.
+        if host[0].isdigit() or ':' in host:
+            try:
+                address = ipaddress.ip_address(host.strip('[]'))
+            except ValueError:
+                pass
+            else:
+                return self._lookup_address(address)
+        return self._lookup_domain(host)
+
+    def _lookup_address(self, address):
+        """Returns the pulses for every listed network that contains the address."""
+        matches = set()
+        version = address.version
+        address_int = int(address)
+        max_length = address.max_prefixlen
+        by_length = self._networks[version]
+        for prefix_length in self._prefix_lengths[version]:
+            # Zero the host bits to get the network address for this prefix length.
+            network_int = (address_int >> (max_length - prefix_length)) << (max_length - prefix_length)
+            pulse_ids = by_length[prefix_length].get(network_int)
+            if pulse_ids:
+                matches |= pulse_ids
+        return matches
+
+    def _lookup_domain(self, domain):
+        """Returns the pulses for the domain and each of its parent domains, down to two labels."""
+        if not self._domains:
+            return set()
+        matches = set()
+        labels = _normalize_domain(domain).split('.')
+        # 'a.b.evil.com' is checked as 'a.b.evil.com', 'b.evil.com' and 'evil.com', but not 'com', so a
+        # listed top-level domain does not match every name under it.
+        for i in range(max(1, len(labels) - 1)):
+            pulse_ids = self._domains.get('.'.join(labels[i:]))
+            if pulse_ids:
+                matches |= pulse_ids
+        return matches
+
+    def match(self, observables):
+        """
+        Matches a batch of observables against the index.
+
+        Repeated observables in the batch are only looked up once.
+
+        Args:
+            observables (iterable): Observables (IPs, domains, URLs, hashes, ...) to check.
+
+        Returns:
+            dict: Maps each observable that matched to the set of pulse ids it matched.
+                  Observables without a match are left out.
+        """
+        results = {}
+        seen = set()
+        for observable in observables:
+            if observable in seen:
+                continue
+            seen.add(observable)
+            pulse_ids = self.lookup(observable)
+            if pulse_ids:
+                results[observable] = pulse_ids
+        return results
+
+
+def _normalize_domain(domain):
+    """Lowercases a domain and strips any trailing dot, so equivalent names compare equal."""
+    return domain.strip().lower().rstrip('.')
+
+
+def _normalize_url(url):
+    """
+    Lowercases a URL's scheme and host and drops a default port, so equivalent URLs compare equal.
+
+    The path and query are kept as they are, since they can be case-sensitive.
+    Values that are not absolute URLs are returned unchanged.
+    """
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    if not parts.scheme or not parts.hostname:
+        return url
+    scheme = parts.scheme.lower()
+    host = parts.hostname.rstrip('.')
+    if ':' in host:
+        host = f"[{host}]"
+    if port is not None and DEFAULT_PORTS.get(scheme) != port:
+        host = f"{host}:{port}"
+    userinfo = parts.netloc.rpartition('@')[0]
+    netloc = f"{userinfo}@{host}" if userinfo else host
+    return parts._replace(scheme=scheme, netloc=netloc).geturl()
+
+
+def build_ioc_index(df_iocs):
+    """
+    Builds an IOC index from the flat indicator table.
+
+    Args:
+        df_iocs (pandas.DataFrame): The table produced by 'normalize_indicators',
+                                    with 'pulse_id', 'type' and 'indicator' columns.
+
+    Returns:
+        IOCIndex: An index ready for 'lookup' and 'match'.
+    """
+    index = IOCIndex()
+    if df_iocs is None or df_iocs.empty:
+        return index
+
+    # Iterating over plain column arrays avoids building a pandas object for every row.
+    for ioc_type, value, pulse_id in zip(
+        df_iocs['type'].astype(object), df_iocs['indicator'].astype(object), df_iocs['pulse_id'].astype(object)
+    ):
+        index.add(ioc_type, value, pulse_id)
+    return index
+
+
+# --- STANDALONE EXECUTION FOR TESTING ---
+if __name__ == "__main__":
+    # This block allows the script to be run directly for testing, using sample indicators.
+    import pandas as pd
+
+    print("--- Testing IOC Index with Sample Data ---")
+    sample_iocs = pd.DataFrame([
+        {"pulse_id": "pulse-1", "type": "IPv4", "indicator": "198.51.100.1"},
+        {"pulse_id": "pulse-1", "type": "CIDR", "indicator": "203.0.113.0/24"},
+        {"pulse_id": "pulse-2", "type": "domain", "indicator": "evil-site.com"},
+        {"pulse_id": "pulse-2", "type": "URL", "indicator": "http://evil-site.com/update.js"},
+        {"pulse_id": "pulse-3", "type": "FileHash-MD5", "indicator": "44D88612FEA8A8F36DE82E1278ABB02F"},
+    ])
+    ioc_index = build_ioc_index(sample_iocs)
+
+    sample_log_observables = [
+        "198.51.100.1",
+        "203.0.113.77",
+        "cdn.evil-site.com",
+        "http://evil-site.com/update.js",
+        "44d88612fea8a8f36de82e1278abb02f",
+        "192.0.2.10",
+        "example.org",
+    ]
+    for observable, pulse_ids in ioc_index.match(sample_log_observables).items():
+        print(f"  {observable} -> {sorted(pulse_ids)}")
@@ -0,0 +1,152 @@
+# This script ranks normalized pulses by how relevant they are for the threat report.
+# Only a handful of pulses can be sent to the LLM, so instead of taking the first few
+# in API order we score every pulse on a few cheap, vectorized features and keep the best.
+#
+# Features (each scaled to the 0-1 range):
+# - ioc_score: how many indicators the pulse carries (log-scaled, so huge pulses do not dominate).
+# - recency_score: how recently the pulse was created (exponential decay).
+# - type_score: how varied and actionable the pulse's indicator types are.
+# - tag_score: whether the pulse is tagged with high-priority keywords, weighted by its TLP level.
+# - corroboration_score: how many of its indicators also appear in other pulses. A pulse that
+#   near-duplicates were merged into (see 'autoti.processing.deduplication') is fully corroborated.
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from autoti.processing.data_normalizer import normalize_indicators
+
+# --- SCORING CONFIGURATION ---
+# How much each feature contributes to the final relevance score.
+SCORE_WEIGHTS = {
+    'ioc_score': 0.30,
+    'recency_score': 0.25,
+    'type_score': 0.15,
+    'tag_score': 0.15,
+    'corroboration_score': 0.15,
+}
+# Age (in hours) at which a pulse's recency score has halved.
+RECENCY_HALF_LIFE_HOURS = float(os.environ.get("AUTOTI_RECENCY_HALF_LIFE_HOURS", 12))
+# IOC count at which the IOC score reaches its maximum.
+IOC_COUNT_SATURATION = 1000
+# Indicator types that are directly actionable for blocking or detection, and their weights.
+INDICATOR_TYPE_WEIGHTS = {
+    'FileHash-SHA256': 1.0,
+    'FileHash-SHA1': 0.9,
+    'FileHash-MD5': 0.8,
+    'IPv4': 0.9,
+    'IPv6': 0.9,
+    'CIDR': 0.7,
+    'domain': 0.9,
+    'hostname': 0.8,
+    'URL': 0.8,
+    'URI': 0.6,
+    'CVE': 1.0,
+    'email': 0.6,
+    'YARA': 0.7,
+}
+# Tags that mark a pulse as high priority (matched case-insensitively).
+PRIORITY_TAGS = {'ransomware', 'apt', 'zero-day', '0day', 'exploit', 'cve', 'botnet', 'phishing', 'supply chain', 'backdoor'}
+# TLP levels: more restricted sharing usually means more sensitive, higher-value intelligence.
+TLP_WEIGHTS = {'red': 1.0, 'amber': 0.8, 'green': 0.6, 'white': 0.4, 'clear': 0.4}
+DEFAULT_TLP_WEIGHT = 0.4
+
+
+def score_pulses(normalized_data, df_iocs=None):
+    """
+    Adds a 'relevance_score' column (and the feature columns it is built from) to normalized pulses.
+
+    Args:
+        normalized_data (pd.DataFrame): A DataFrame from 'normalize_pulses'.
+        df_iocs (pd.DataFrame, optional): The matching table from 'normalize_indicators'.
+                                          If omitted, it is built from the 'indicators' column when present.
+
+    Returns:
+        pd.DataFrame: A copy of the input with the feature columns and 'relevance_score' added.
+    """
+    df_scored = normalized_data.copy()
+    if df_scored.empty:
+        df_scored['relevance_score'] = pd.Series(dtype='float64')
+        return df_scored
+
+    if df_iocs is None and 'indicators' in df_scored.columns:
+        df_iocs = normalize_indicators(
+            df_scored[['pulse_id', 'indicators']].rename(columns={'pulse_id': 'id'}).to_dict('records')
+        )
+
+    # 1. IOC count, log-scaled and capped.
+    ioc_count = df_scored['ioc_count'] if 'ioc_count' in df_scored.columns else pd.Series(0, index=df_scored.index)
+    df_scored['ioc_score'] = (np.log1p(ioc_count) / np.log1p(IOC_COUNT_SATURATION)).clip(upper=1.0)
+
+    # 2. Recency, as exponential decay from the creation date.
+    created = pd.to_datetime(df_scored['creation_date'], utc=True, errors='coerce')
+    age_hours = ((pd.Timestamp.now(tz='UTC') - created).dt.total_seconds() / 3600).clip(lower=0)
+    df_scored['recency_score'] = np.exp2(-age_hours / RECENCY_HALF_LIFE_HOURS).fillna(0.0)
+
+    # 3 and 5. Indicator type mix and corroboration, both from the flat indicator table.
+    if df_iocs is not None and not df_iocs.empty:
+        df_scored['type_score'] = df_scored['pulse_id'].map(_type_scores(df_iocs)).fillna(0.0)
+        df_scored['corroboration_score'] = df_scored['pulse_id'].map(_corroboration_scores(df_iocs)).fillna(0.0)
+    else:
+        df_scored['type_score'] = 0.0
+        df_scored['corroboration_score'] = 0.0
+    if 'duplicate_count' in df_scored.columns:
+        # Merging near-duplicates removes the overlap they had with each other, so count it back in.
+        df_scored['corroboration_score'] = df_scored['corroboration_score'].where(df_scored['duplicate_count'] <= 1, 1.0)
+
+    # 4. Priority tags, weighted by TLP.
+    df_scored['tag_score'] = _tag_scores(df_scored)
+
+    df_scored['relevance_score'] = sum(df_scored[feature] * weight for feature, weight in SCORE_WEIGHTS.items())
+    return df_scored
+
+
+def _type_scores(df_iocs):
+    """Scores each pulse by the weights of its distinct indicator types, saturating at three types."""
+    distinct_types = df_iocs[['pulse_id', 'type']].dropna().drop_duplicates()
+    weights = distinct_types['type'].astype(object).map(INDICATOR_TYPE_WEIGHTS).fillna(0.2)
+    return (weights.groupby(distinct_types['pulse_id']).sum() / 3).clip(upper=1.0)
+
+
+def _corroboration_scores(df_iocs):
+    """Scores each pulse by the share of its indicators that other pulses also report."""
+    distinct_iocs = df_iocs[['pulse_id', 'indicator']].dropna().drop_duplicates()
+    pulses_per_indicator = distinct_iocs.groupby('indicator')['pulse_id'].transform('size')
+    return (pulses_per_indicator > 1).groupby(distinct_iocs['pulse_id']).mean()
+
+
+def _tag_scores(df_scored):
+    """Scores each pulse by whether it has a priority tag, scaled by its TLP weight."""
+    if 'tags' in df_scored.columns:
+        tags = df_scored['tags'].explode().dropna().astype(str).str.lower()
+        has_priority_tag = tags.isin(PRIORITY_TAGS).groupby(level=0).any().reindex(df_scored.index, fill_value=False)
+    else:
+        has_priority_tag = pd.Series(False, index=df_scored.index)
+
+    if 'tlp' in df_scored.columns:
+        tlp_weight = df_scored['tlp'].astype(str).str.lower().map(TLP_WEIGHTS).fillna(DEFAULT_TLP_WEIGHT)
+    else:
+        tlp_weight = pd.Series(DEFAULT_TLP_WEIGHT, index=df_scored.index)
+
+    # Untagged pulses still get a small share of their TLP weight, so TLP alone can break ties.
+    return tlp_weight * np.where(has_priority_tag, 1.0, 0.25)
+
+
+def select_top_pulses(normalized_data, k=5, df_iocs=None):
+    """
+    Scores pulses and returns the 'k' most relevant, highest first.
+
+    Uses 'nlargest' (a partial sort) rather than sorting every pulse.
+
+    Args:
+        normalized_data (pd.DataFrame): A DataFrame from 'normalize_pulses'.
+        k (int): Number of pulses to return.
+        df_iocs (pd.DataFrame, optional): The matching table from 'normalize_indicators'.
+
+    Returns:
+        pd.DataFrame: The top 'k' pulses with their scores.
+    """
+    if 'relevance_score' not in normalized_data.columns:
+        normalized_data = score_pulses(normalized_data, df_iocs=df_iocs)
+    return normalized_data.nlargest(k, 'relevance_score')
@@ -0,0 +1,398 @@
+# This script keeps rolling threat-trend statistics across pipeline runs, backed by SQLite.
+# Each run is otherwise stateless, so questions like "which indicator types or campaigns grew
+# this week" would mean recomputing everything from the raw pulses.
+#
+# - Counts: hourly and daily counts of indicators per type, and of pulses per tag and per adversary.
+#   Pulses are bucketed by their creation time.
+# - Heavy hitters: there are far too many distinct indicators to count each one exactly, so a
+#   count-min sketch per day estimates how many pulses reported each indicator, and a short list
+#   of candidates per day tracks the most reported ones.
+#
+# Statistics are only ever updated with what was not counted before (the delta): new pulses, and
+# indicators added to a pulse since it was counted. For that, each counted pulse keeps a 64-bit hash
+# of every indicator it was counted with (8 bytes per indicator, in one row per pulse id), never the
+# indicators themselves. A run therefore costs the same whether the store holds a day or three months.
+# Reading the trends only sums a few precomputed rows. Hourly buckets are kept for
+# TREND_HOURLY_RETENTION_HOURS and daily buckets (and sketches) for TREND_DAILY_RETENTION_DAYS.
+
+import os
+import zlib
+import heapq
+import sqlite3
+import hashlib
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from autoti.processing.intel_store import ID_BATCH_SIZE, sortable_time, lookup_value
+
+# --- TREND CONFIGURATION ---
+# Location of the SQLite database file. It is created on first use.
+TREND_STORE_PATH = os.environ.get("AUTOTI_TREND_STORE_PATH", "autoti_trends.db")
+# How long hourly and daily buckets are kept.
+TREND_HOURLY_RETENTION_HOURS = int(os.environ.get("AUTOTI_TREND_HOURLY_RETENTION_HOURS", 7 * 24))
+TREND_DAILY_RETENTION_DAYS = int(os.environ.get("AUTOTI_TREND_RETENTION_DAYS", 90))
+# The window trends are reported over: the last N days, compared with the N days before.
+TREND_WINDOW_DAYS = int(os.environ.get("AUTOTI_TREND_WINDOW_DAYS", 7))
+# Number of entries reported per statistic.
+TREND_TOP_N = 5
+# The statistics kept, as the names used in the store and in 'summary'.
+TREND_DIMENSIONS = ['indicator_type', 'tag', 'adversary']
+
+# --- COUNT-MIN SKETCH CONFIGURATION ---
+# With width w and depth d, an estimate exceeds the true count by at most e/w of the day's total
+# with probability 1 - e^-d: for 4096 x 4, under 0.07% of the total for about 98% of lookups.
+SKETCH_WIDTH = 4096
+SKETCH_DEPTH = 4
+# Number of heavy-hitter candidates remembered per day.
+HEAVY_HITTER_CANDIDATES = 100
+_SKETCH_SEED = 7
+_NO_HASHES = np.empty(0, dtype=np.uint64)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trend_counts (
+    granularity TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    key TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (granularity, bucket, dimension, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS trend_sketches (
+    day TEXT PRIMARY KEY,
+    sketch BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trend_candidates (
+    day TEXT NOT NULL,
+    value TEXT NOT NULL,
+    estimate INTEGER NOT NULL,
+    PRIMARY KEY (day, value)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS trend_seen (
+    pulse_id TEXT PRIMARY KEY,
+    day TEXT NOT NULL,
+    indicator_hashes BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_trend_seen_day ON trend_seen (day);
+"""
+
+
+class CountMinSketch:
+    """
+    A count-min sketch: approximate counts for any number of distinct values in fixed memory.
+
+    Estimates are never below the true count, and sketches of different days can be added together.
+    """
+
+    def __init__(self, width=SKETCH_WIDTH, depth=SKETCH_DEPTH, counts=None):
+        self.width = width
+        self.depth = depth
+        self.counts = counts if counts is not None else np.zeros((depth, width), dtype=np.int64)
+        # One multiply-add-shift hash function per row (see 'autoti.processing.deduplication').
+        rng = np.random.default_rng(_SKETCH_SEED)
+        self._a = (rng.integers(0, 2 ** 63, depth, dtype=np.uint64) << np.uint64(1)) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, depth, dtype=np.uint64)
+
+    def _columns(self, values):
+        """Returns the '(depth, len(values))' column of each value in each row."""
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'little') for value in values),
+            dtype=np.uint64, count=len(values),
+        )
+        return ((self._a[:, None] * hashes + self._b[:, None]) >> np.uint64(32)) % np.uint64(self.width)
+
+    def add(self, values):
+        """Counts each value once per occurrence in 'values' (a list of strings)."""
+        if values:
+            rows = np.arange(self.depth)[:, None]
+            np.add.at(self.counts, (rows, self._columns(values).astype(np.intp)), 1)
+
+    def estimate(self, values):
+        """Returns the estimated count of each value in 'values', as a list of ints."""
+        if not values:
+            return []
+        rows = np.arange(self.depth)[:, None]
+        return self.counts[rows, self._columns(values).astype(np.intp)].min(axis=0).tolist()
+
+    def merge(self, other):
+        """Adds another sketch's counts to this one."""
+        self.counts += other.counts
+
+    def to_bytes(self):
+        """Serializes the counts. Sketches are mostly zeros, so they compress well."""
+        return zlib.compress(self.counts.tobytes())
+
+    @classmethod
+    def from_bytes(cls, data, width=SKETCH_WIDTH, depth=SKETCH_DEPTH):
+        counts = np.frombuffer(zlib.decompress(data), dtype=np.int64).reshape(depth, width).copy()
+        return cls(width=width, depth=depth, counts=counts)
+
+
+def _pulse_ids(pulse):
+    """Returns a pulse's id and the ids of any near-duplicates merged into it."""
+    return [str(pulse['id'])] + [str(merged_id) for merged_id in pulse.get('duplicate_ids') or [] if merged_id]
+
+
+def _indicator_hashes(indicators):
+    """Hashes '(type, value)' indicator pairs to 64-bit integers, with a fixed key so hashes are stable across runs."""
+    if not indicators:
+        return _NO_HASHES
+    return pd.util.hash_array(np.array([f"{ioc_type}\x00{value}" for ioc_type, value in indicators], dtype=object), categorize=False)
+
+
+def _pulse_time(pulse, now):
+    """Returns a pulse's creation time as a sortable UTC string, falling back to 'now' if it is missing or invalid."""
+    try:
+        return sortable_time(pulse.get('created')) or now
+    except (ValueError, TypeError):
+        return now
+
+
+class TrendStore:
+    """
+    Incrementally maintained threat-trend statistics.
+
+    A single connection is shared under a lock; updates run once per pipeline run and reads only sum a few rows.
+    """
+
+    def __init__(self, path=TREND_STORE_PATH):
+        """
+        Args:
+            path (str): Path to the SQLite database file.
+        """
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    # --- UPDATING ---
+    def update(self, raw_pulses, now=None):
+        """
+        Adds what was not counted before to every statistic.
+
+        A pulse is counted once, by id, so the same window can be passed on every run. If it comes
+        back with indicators it did not have when it was counted (it was modified, or near-duplicates
+        were merged into it by 'deduplicate_pulses'), only those indicators are added. Its tags and
+        adversary are counted when any of its ids is first seen.
+
+        Args:
+            raw_pulses (list): Raw pulse dictionaries, e.g. after 'deduplicate_pulses'.
+            now (datetime, optional): The current UTC time. Defaults to now.
+
+        Returns:
+            int: The number of pulses that added to the statistics.
+        """
+        now = sortable_time(now or datetime.now(timezone.utc))
+        oldest_day = self._day_cutoff(now)
+        pulses = {str(pulse['id']): pulse for pulse in raw_pulses or [] if pulse.get('id')}
+
+        with self._lock, self._conn:
+            counted_before = self._seen([pulse_id for pulse in pulses.values() for pulse_id in _pulse_ids(pulse)])
+            counts = Counter()
+            indicators_by_day = defaultdict(list)
+            seen_rows = []
+            counted = 0
+            for pulse_id, pulse in pulses.items():
+                created = _pulse_time(pulse, now)
+                day, hour = created[:10], created[:13]
+                if day < oldest_day:
+                    # Too old to fall in any bucket that is still kept.
+                    continue
+                merged_ids = _pulse_ids(pulse)
+                indicators = list({
+                    (ioc.get('type') or 'unknown', lookup_value(ioc['indicator']))
+                    for ioc in pulse.get('indicators') or [] if isinstance(ioc, dict) and ioc.get('indicator')
+                })
+                hashes = _indicator_hashes(indicators)
+                # What was counted for the pulse, and for any pulse merged into it, is not counted again.
+                previous = np.concatenate([counted_before.get(merged_id, _NO_HASHES) for merged_id in merged_ids])
+                added = [indicator for indicator, is_added in zip(indicators, ~np.isin(hashes, previous)) if is_added]
+                is_new = not any(merged_id in counted_before for merged_id in merged_ids)
+                if not (is_new or added):
+                    continue
+                counted += 1
+                # Every id of a merged pulse keeps the hashes, so none of them is counted again if the cluster splits up later.
+                counted_hashes = np.union1d(previous, hashes).tobytes()
+                seen_rows.extend((merged_id, day, counted_hashes) for merged_id in merged_ids)
+
+                keys = [('indicator_type', ioc_type, n) for ioc_type, n in Counter(ioc_type for ioc_type, _ in added).items()]
+                if is_new:
+                    keys += [('tag', tag, 1) for tag in {str(tag).strip().lower() for tag in pulse.get('tags') or []} if tag]
+                    if pulse.get('adversary'):
+                        keys.append(('adversary', str(pulse['adversary']).strip(), 1))
+                for dimension, key, n in keys:
+                    counts[('day', day, dimension, key)] += n
+                    counts[('hour', hour, dimension, key)] += n
+                # Each pulse counts once per indicator, however many times (or with how many types) it lists it.
+                indicators_by_day[day].extend({value for _, value in added})
+
+            self._conn.executemany(
+                "INSERT INTO trend_counts (granularity, bucket, dimension, key, count) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(granularity, bucket, dimension, key) DO UPDATE SET count = count + excluded.count",
+                ((*bucket_key, n) for bucket_key, n in counts.items()),
+            )
+            self._conn.executemany(
+                "INSERT INTO trend_seen (pulse_id, day, indicator_hashes) VALUES (?, ?, ?) "
+                "ON CONFLICT(pulse_id) DO UPDATE SET indicator_hashes = excluded.indicator_hashes",
+                seen_rows,
+            )
+            for day, values in indicators_by_day.items():
+                if values:
+                    self._update_heavy_hitters(day, values)
+            self._evict(now)
+        return counted
+
+    def _seen(self, pulse_ids):
+        """Returns the indicator hashes counted for each of 'pulse_ids' that was already counted, keyed by id."""
+        seen = {}
+        for start in range(0, len(pulse_ids), ID_BATCH_SIZE):
+            batch = pulse_ids[start:start + ID_BATCH_SIZE]
+            rows = self._conn.execute(
+                f"SELECT pulse_id, indicator_hashes FROM trend_seen WHERE pulse_id IN ({', '.join('?' * len(batch))})", batch
+            )
+            seen.update((pulse_id, np.frombuffer(data, dtype=np.uint64)) for pulse_id, data in rows)
+        return seen
+
+    def _update_heavy_hitters(self, day, values):
+        """Adds indicator sightings to a day's sketch and refreshes that day's candidates."""
+        row = self._conn.execute("SELECT sketch FROM trend_sketches WHERE day = ?", (day,)).fetchone()
+        sketch = CountMinSketch.from_bytes(row[0]) if row else CountMinSketch()
+        sketch.add(values)
+        self._conn.execute("INSERT OR REPLACE INTO trend_sketches (day, sketch) VALUES (?, ?)", (day, sketch.to_bytes()))
+
+        # Only values seen today or already among the candidates can be the day's heavy hitters.
+        candidates = list({value for (value,) in self._conn.execute("SELECT value FROM trend_candidates WHERE day = ?", (day,))} | set(values))
+        top = heapq.nlargest(HEAVY_HITTER_CANDIDATES, zip(sketch.estimate(candidates), candidates))
+        self._conn.execute("DELETE FROM trend_candidates WHERE day = ?", (day,))
+        self._conn.executemany(
+            "INSERT INTO trend_candidates (day, value, estimate) VALUES (?, ?, ?)", ((day, value, estimate) for estimate, value in top)
+        )
+
+    @staticmethod
+    def _day_cutoff(now):
+        return (datetime.fromisoformat(now) - timedelta(days=TREND_DAILY_RETENTION_DAYS)).isoformat()[:10]
+
+    def _evict(self, now):
+        """Deletes buckets, sketches and seen pulses older than their retention period."""
+        oldest_hour = (datetime.fromisoformat(now) - timedelta(hours=TREND_HOURLY_RETENTION_HOURS)).isoformat()[:13]
+        oldest_day = self._day_cutoff(now)
+        self._conn.execute("DELETE FROM trend_counts WHERE granularity = 'hour' AND bucket < ?", (oldest_hour,))
+        self._conn.execute("DELETE FROM trend_counts WHERE granularity = 'day' AND bucket < ?", (oldest_day,))
+        self._conn.execute("DELETE FROM trend_sketches WHERE day < ?", (oldest_day,))
+        self._conn.execute("DELETE FROM trend_candidates WHERE day < ?", (oldest_day,))
+        self._conn.execute("DELETE FROM trend_seen WHERE day < ?", (oldest_day,))
+
+    # --- READING ---
+    def summary(self, window_days=TREND_WINDOW_DAYS, top_n=TREND_TOP_N, now=None):
+        """
+        Reads the current trends.
+
+        Args:
+            window_days (int): The window length: the last 'window_days' days (including today)
+                               are compared with the 'window_days' days before them.
+            top_n (int): Number of entries returned per statistic.
+            now (datetime, optional): The current UTC time. Defaults to now.
+
+        Returns:
+            dict: {
+                'window_days': the window length,
+                'growth': {dimension: [{'key', 'current', 'previous', 'change'}]} with the biggest
+                          increases first ('change' is the relative change, or None if 'previous' was 0),
+                'last_24_hours': {dimension: [{'key', 'count'}]}, the most frequent first,
+                'heavy_hitters': [{'indicator', 'pulses'}], the indicators reported by the most pulses in the window,
+            }
+        """
+        now = datetime.fromisoformat(sortable_time(now or datetime.now(timezone.utc)))
+        current_start = (now - timedelta(days=window_days - 1)).isoformat()[:10]
+        previous_start = (now - timedelta(days=2 * window_days - 1)).isoformat()[:10]
+        last_hour = (now - timedelta(hours=23)).isoformat()[:13]
+
+        with self._lock:
+            growth_rows = self._conn.execute(
+                "SELECT dimension, key, SUM(CASE WHEN bucket >= ? THEN count ELSE 0 END) AS current, "
+                "SUM(CASE WHEN bucket < ? THEN count ELSE 0 END) AS previous "
+                "FROM trend_counts WHERE granularity = 'day' AND bucket >= ? GROUP BY dimension, key",
+                (current_start, current_start, previous_start),
+            ).fetchall()
+            recent_rows = self._conn.execute(
+                "SELECT dimension, key, SUM(count) FROM trend_counts WHERE granularity = 'hour' AND bucket >= ? "
+                "GROUP BY dimension, key",
+                (last_hour,),
+            ).fetchall()
+            sketch_rows = self._conn.execute("SELECT sketch FROM trend_sketches WHERE day >= ?", (current_start,)).fetchall()
+            candidates = [value for (value,) in self._conn.execute(
+                "SELECT DISTINCT value FROM trend_candidates WHERE day >= ?", (current_start,)
+            )]
+
+        growth = {dimension: [] for dimension in TREND_DIMENSIONS}
+        for dimension, key, current, previous in growth_rows:
+            growth[dimension].append({
+                'key': key, 'current': current, 'previous': previous,
+                'change': round((current - previous) / previous, 3) if previous else None,
+            })
+        recent = {dimension: [] for dimension in TREND_DIMENSIONS}
+        for dimension, key, count in recent_rows:
+            recent[dimension].append({'key': key, 'count': count})
+
+        # Sketches are linear, so the window's sketch is the sum of its days.
+        heavy_hitters = []
+        if sketch_rows:
+            window_sketch = CountMinSketch.from_bytes(sketch_rows[0][0])
+            for (data,) in sketch_rows[1:]:
+                window_sketch.merge(CountMinSketch.from_bytes(data))
+            heavy_hitters = [
+                {'indicator': value, 'pulses': estimate}
+                for estimate, value in heapq.nlargest(top_n, zip(window_sketch.estimate(candidates), candidates))
+            ]
+
+        return {
+            'window_days': window_days,
+            'growth': {
+                dimension: heapq.nlargest(top_n, rows, key=lambda row: (row['current'] - row['previous'], row['current']))
+                for dimension, rows in growth.items()
+            },
+            'last_24_hours': {
+                dimension: heapq.nlargest(top_n, rows, key=lambda row: row['count']) for dimension, rows in recent.items()
+            },
+            'heavy_hitters': heavy_hitters,
+        }
+
+    def clear(self):
+        """Deletes every statistic, and forgets which pulses were counted."""
+        with self._lock, self._conn:
+            for table in ('trend_counts', 'trend_sketches', 'trend_candidates', 'trend_seen'):
+                self._conn.execute(f"DELETE FROM {table}")
+
+    def close(self):
+        """Closes the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+def format_trends(summary):
+    """
+    Renders a trend summary as a few compact lines for the report prompt.
+
+    Args:
+        summary (dict): A summary from 'TrendStore.summary'.
+
+    Returns:
+        str: The trend lines, or an empty string if there are no trends yet.
+    """
+    labels = {'indicator_type': 'Indicator types', 'tag': 'Tags', 'adversary': 'Adversaries'}
+    lines = []
+    for dimension, rows in summary['growth'].items():
+        rising = [row for row in rows if row['current'] > row['previous']]
+        if rising:
+            entries = ", ".join(
+                f"{row['key']} {row['current']} ({'new' if row['change'] is None else format(row['change'], '+.0%')})"
+                for row in rising
+            )
+            lines.append(f"{labels.get(dimension, dimension)} rising over the last {summary['window_days']} days: {entries}")
+    if summary['heavy_hitters']:
+        entries = ", ".join(f"{row['indicator']} ({row['pulses']} pulses)" for row in summary['heavy_hitters'])
+        lines.append(f"Most reported indicators: {entries}")
+    return "\n".join(lines)
@@ -0,0 +1,102 @@
+# This script runs the threat intelligence pipeline on a fixed schedule, off the request path.
+# Each run's report is saved as a new version in the report store, and the web app only
+# ever reads the latest saved report, so page latency no longer depends on OTX or the LLM.
+#
+# The scheduler can run in a background thread inside the web app, or on its own
+# via the 'autoti schedule' command.
+
+import os
+import threading
+
+from autoti.analysis.report_store import REPORT_DIR, save_report
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; scheduling then runs without a cross-process lock.
+    fcntl = None
+
+# --- SCHEDULER CONFIGURATION ---
+# Number of seconds between pipeline runs.
+SCHEDULE_INTERVAL = int(os.environ.get("AUTOTI_SCHEDULE_INTERVAL", 3600))
+# Lock file (inside the report directory) that ensures only one process runs the schedule,
+# e.g. when every gunicorn worker starts its own scheduler thread.
+SCHEDULER_LOCK_FILE = ".scheduler.lock"
+
+
+def _default_pipeline():
+    """Runs the full pipeline. Imported lazily so the scheduler module itself stays lightweight."""
+    from autoti.analysis.langchain_agent import run_pipeline
+    return run_pipeline()
+
+
+class ReportScheduler:
+    """
+    Periodically runs the pipeline and saves each report as a new version.
+    """
+
+    def __init__(self, interval=SCHEDULE_INTERVAL, report_dir=REPORT_DIR, pipeline=_default_pipeline):
+        """
+        Args:
+            interval (int): Number of seconds between pipeline runs.
+            report_dir (str): Directory where report versions are written.
+            pipeline (callable): A function with no arguments that returns the report text.
+        """
+        self.interval = interval
+        self.report_dir = report_dir
+        self._pipeline = pipeline
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._lock_file = None
+
+    def run_once(self):
+        """
+        Runs the pipeline once and saves the resulting report.
+
+        Returns:
+            dict: The saved report artifact.
+        """
+        print("Scheduler: running pipeline...")
+        artifact = save_report(self._pipeline(), report_dir=self.report_dir)
+        print(f"Scheduler: saved report version {artifact['version']}.")
+        return artifact
+
+    def run_forever(self):
+        """Runs the pipeline every 'interval' seconds until 'stop' is called."""
+        if not self._acquire_process_lock():
+            print("Scheduler: another process already runs the schedule. This one will stay idle.")
+            return
+
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                # A failed run must not kill the schedule; the previous report stays available.
+                print(f"Scheduler: pipeline run failed: {e}")
+            self._stop_event.wait(self.interval)
+
+    def start(self):
+        """Starts the schedule in a background daemon thread and returns immediately."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self.run_forever, name="autoti-scheduler", daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def stop(self):
+        """Stops the schedule after the current run (if any) finishes."""
+        self._stop_event.set()
+
+    def _acquire_process_lock(self):
+        """Takes an exclusive, non-blocking file lock so only one process schedules runs."""
+        if fcntl is None:
+            return True
+        os.makedirs(self.report_dir, exist_ok=True)
+        self._lock_file = open(os.path.join(self.report_dir, SCHEDULER_LOCK_FILE), "w")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._lock_file.close()
+            self._lock_file = None
+            return False
+        # The lock is held for the lifetime of the process and released by the OS on exit.
+        return True
@@ -0,0 +1,29 @@
+# Benchmarks for the OTX collector, against the local OTX stand-in.
+
+import asyncio
+
+import autoti.collection.otx_collector as otx_collector
+from autoti.collection.http_cache import ResponseCache
+from autoti.collection.otx_collector import get_latest_pulses, aget_latest_pulses
+
+
+def bench_get_latest_pulses(run_stage, fake_otx, pulses, scale):
+    """Fetches every page with the pooled, concurrent synchronous collector."""
+    fetched = run_stage(get_latest_pulses, "benchmark-key", items=scale)
+    assert len(fetched) == len(pulses)
+
+
+def bench_get_latest_pulses_revalidated(run_stage, fake_otx, pulses, scale, monkeypatch, tmp_path):
+    """Polls again when nothing has changed, so every page is revalidated from the HTTP cache."""
+    monkeypatch.setattr(otx_collector, "HTTP_CACHE_ENABLED", True)
+    # With no max age, every repeated request is revalidated rather than reused as it is.
+    monkeypatch.setattr(otx_collector, "ResponseCache", lambda: ResponseCache(path=str(tmp_path / "http_cache.db"), max_age=0))
+    get_latest_pulses("benchmark-key")
+    fetched = run_stage(get_latest_pulses, "benchmark-key", items=scale)
+    assert len(fetched) == len(pulses)
+
+
+def bench_aget_latest_pulses(run_stage, fake_otx, pulses, scale):
+    """Fetches every page with the asyncio collector."""
+    fetched = run_stage(lambda: asyncio.run(aget_latest_pulses("benchmark-key")), items=scale)
+    assert len(fetched) == len(pulses)
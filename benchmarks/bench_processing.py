@@ -0,0 +1,94 @@
+# Benchmarks for the normalization and processing stages.
+
+from autoti.processing.data_normalizer import normalize_pulses, normalize_indicators, iter_normalized_chunks, select_top_k
+from autoti.processing.ranking import score_pulses
+from autoti.processing.ioc_index import build_ioc_index
+from autoti.processing.deduplication import deduplicate_pulses
+from autoti.processing.intel_store import IntelStore
+from autoti.processing.trends import TrendStore
+
+
+def bench_normalize_pulses(run_stage, pulses, scale):
+    """Builds the per-pulse DataFrame, including the IOC counts."""
+    df = run_stage(normalize_pulses, pulses, verbose=False, items=scale)
+    assert len(df) == len(pulses)
+
+
+def bench_normalize_indicators(run_stage, pulses, scale):
+    """Builds the flat, typed indicator table."""
+    df_iocs = run_stage(normalize_indicators, pulses, items=scale)
+    assert len(df_iocs) == scale
+
+
+def bench_streaming_top_k(run_stage, pulses, scale):
+    """Normalizes and scores in chunks, keeping only the top rows, as the streaming pipeline does."""
+    top = run_stage(
+        lambda: select_top_k(iter_normalized_chunks(iter(pulses), transform=score_pulses), k=5, by='relevance_score'),
+        items=scale,
+    )
+    assert len(top) == min(5, len(pulses))
+
+
+def bench_score_pulses(run_stage, pulses, scale):
+    """Scores every pulse for relevance."""
+    df = normalize_pulses(pulses, verbose=False)
+    df_iocs = normalize_indicators(pulses)
+    scored = run_stage(score_pulses, df, df_iocs=df_iocs, items=scale)
+    assert 'relevance_score' in scored.columns
+
+
+def bench_build_ioc_index(run_stage, pulses, scale):
+    """Builds the in-memory IOC lookup index."""
+    df_iocs = normalize_indicators(pulses)
+    index = run_stage(build_ioc_index, df_iocs, items=scale)
+    assert len(index) > 0
+
+
+def bench_ioc_index_match(run_stage, pulses, scale):
+    """Matches a batch of observables (half known, half unknown) against the index."""
+    df_iocs = normalize_indicators(pulses)
+    index = build_ioc_index(df_iocs)
+    known = df_iocs['indicator'].astype(object).tolist()
+    observables = known + [f"10.{i % 256}.{i // 256 % 256}.1" for i in range(len(known))]
+    matches = run_stage(index.match, observables, items=len(observables))
+    assert matches
+
+
+def bench_deduplicate_pulses(run_stage, pulses, scale):
+    """Clusters near-duplicate pulses with MinHash/LSH and merges each cluster."""
+    deduplicated = run_stage(deduplicate_pulses, pulses, verbose=False, items=scale)
+    assert len(deduplicated) <= len(pulses)
+
+
+def bench_intel_store(run_stage, pulses, scale, tmp_path):
+    """Saves pulses and their indicators to the indexed store behind the JSON API."""
+    store = IntelStore(str(tmp_path / "intel.db"))
+
+    def save():
+        # Every round starts from an empty store; re-saving unchanged pulses would be a no-op.
+        store.clear()
+        return store.upsert_pulses(pulses)
+
+    try:
+        run_stage(save, items=scale)
+        items, _ = store.query_iocs(limit=10)
+        assert len(items) == min(10, scale)
+    finally:
+        store.close()
+
+
+def bench_trend_update(run_stage, pulses, scale, tmp_path):
+    """Adds a run's pulses to the rolling trend counts and heavy-hitter sketches."""
+    store = TrendStore(str(tmp_path / "trends.db"))
+
+    def update():
+        # Every round starts from an empty store; pulses already counted would be skipped.
+        store.clear()
+        return store.update(pulses)
+
+    try:
+        counted = run_stage(update, items=scale)
+        assert counted == len(pulses)
+        assert store.summary()['heavy_hitters']
+    finally:
+        store.close()
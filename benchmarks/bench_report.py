@@ -0,0 +1,30 @@
+# Benchmarks for report generation and the end-to-end pipeline, using the local stand-in LLM.
+
+import autoti.analysis.langchain_agent as langchain_agent
+from autoti.analysis.langchain_agent import generate_threat_report
+from autoti.processing.data_normalizer import normalize_pulses
+
+
+def bench_generate_report_top(run_stage, fake_llm, pulses, scale):
+    """Ranks pulses and generates the report from the top threats."""
+    df = normalize_pulses(pulses, verbose=False)
+    report = run_stage(generate_threat_report, df, fake_llm, mode="top", items=scale)
+    assert not report.startswith("Failed")
+
+
+def bench_generate_report_map_reduce(run_stage, fake_llm, pulses, scale):
+    """Chunks every pulse, summarises the chunks concurrently and reduces them into the report."""
+    df = normalize_pulses(pulses, verbose=False)
+    report = run_stage(generate_threat_report, df, fake_llm, mode="map_reduce", items=scale)
+    assert not report.startswith("Failed")
+
+
+def bench_run_pipeline(run_stage, fake_otx, fake_llm, monkeypatch, scale):
+    """Runs the whole pipeline: fetch from the OTX stand-in, normalize, rank and report."""
+    monkeypatch.setattr(langchain_agent, "get_llm", lambda api_key: fake_llm)
+    monkeypatch.setattr(langchain_agent, "LLM_CACHE_ENABLED", False)
+    # The API and trend stores are measured in 'bench_processing.py'; here they would only leave databases behind.
+    monkeypatch.setattr(langchain_agent, "INTEL_STORE_ENABLED", False)
+    monkeypatch.setattr(langchain_agent, "TRENDS_ENABLED", False)
+    report = run_stage(langchain_agent.run_pipeline, incremental=False, streaming=False, items=scale)
+    assert not report.startswith("Failed")
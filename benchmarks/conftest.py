@@ -0,0 +1,83 @@
+# Shared fixtures for the benchmark suite.
+#
+# Every benchmark is parametrized over the scales in 'AUTOTI_BENCH_SCALES' (a comma-separated
+# list of total indicator counts, e.g. "1000,100000,1000000"). Besides pytest-benchmark's timing,
+# each benchmark records its throughput and peak Python memory in the report's 'extra_info'.
+
+import os
+import tracemalloc
+
+import pytest
+
+from fake_otx_server import FakeOTXServer
+from synthetic import generate_pulses
+
+import autoti.collection.otx_collector as otx_collector
+from autoti.analysis.langchain_agent import get_fake_llm
+
+# --- BENCHMARK CONFIGURATION ---
+# Total indicator counts to benchmark at.
+BENCH_SCALES = [int(scale) for scale in os.environ.get("AUTOTI_BENCH_SCALES", "1000,10000,100000").split(",")]
+# Number of timed rounds per benchmark.
+BENCH_ROUNDS = int(os.environ.get("AUTOTI_BENCH_ROUNDS", 3))
+
+# Generated pulses are reused across benchmarks at the same scale, since generating 1M indicators is slow.
+_pulse_cache = {}
+
+
+@pytest.fixture(params=BENCH_SCALES, ids=lambda scale: f"{scale}_iocs")
+def scale(request):
+    """The total number of indicators for this benchmark run."""
+    return request.param
+
+
+@pytest.fixture
+def pulses(scale):
+    """Synthetic OTX pulses with 'scale' indicators in total."""
+    if scale not in _pulse_cache:
+        _pulse_cache[scale] = generate_pulses(scale)
+    return _pulse_cache[scale]
+
+
+@pytest.fixture
+def fake_otx(pulses, monkeypatch):
+    """A local OTX stand-in serving the synthetic pulses, with the collector pointed at it."""
+    with FakeOTXServer(pulses) as server:
+        monkeypatch.setattr(otx_collector, "BASE_URL", server.base_url)
+        # Full downloads are measured by default; 'bench_collector.py' enables the HTTP cache explicitly.
+        monkeypatch.setattr(otx_collector, "HTTP_CACHE_ENABLED", False)
+        monkeypatch.setenv("OTX_API_KEY", "benchmark-key")
+        yield server
+
+
+@pytest.fixture
+def fake_llm():
+    """A local stand-in LLM, so report benchmarks measure our code rather than the provider."""
+    return get_fake_llm()
+
+
+@pytest.fixture
+def run_stage(benchmark):
+    """
+    Returns a function that benchmarks one pipeline stage.
+
+    It runs the stage once under tracemalloc to record peak memory, then times it with
+    pytest-benchmark, and records 'items', 'items_per_second' and 'peak_memory_mb'.
+    """
+    def run(func, *args, items, **kwargs):
+        tracemalloc.start()
+        try:
+            func(*args, **kwargs)
+            _, peak_bytes = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        result = benchmark.pedantic(func, args=args, kwargs=kwargs, rounds=BENCH_ROUNDS, iterations=1)
+
+        benchmark.extra_info["items"] = items
+        benchmark.extra_info["peak_memory_mb"] = round(peak_bytes / 2 ** 20, 2)
+        if benchmark.stats is not None:
+            benchmark.extra_info["items_per_second"] = round(items / benchmark.stats.stats.mean)
+        return result
+
+    return run
@@ -0,0 +1,99 @@
+# This script runs a local HTTP stand-in for the OTX API, for benchmarking the collector.
+# It serves '/api/v1/pulses/subscribed' with the same pagination fields as OTX ('count',
+# 'next', 'results'), from an in-memory list of pulses, so collector benchmarks measure our
+# code and the HTTP stack rather than the internet.
+
+import json
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# The largest page size the stand-in serves, like the real API's server-side cap.
+MAX_PAGE_SIZE = 50
+
+
+class FakeOTXServer:
+    """
+    A threaded local HTTP server serving a fixed list of pulses, page by page.
+
+    Use it as a context manager; 'base_url' can be assigned to 'otx_collector.BASE_URL'.
+    """
+
+    def __init__(self, pulses, page_size=MAX_PAGE_SIZE):
+        """
+        Args:
+            pulses (list): The pulses to serve.
+            page_size (int): The largest page size to serve.
+        """
+        self.pulses = pulses
+        self.page_size = page_size
+        # Serialized pages are cached, so the server's JSON encoding does not skew the benchmark.
+        self._pages = {}
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        """The base API URL of the running server."""
+        return f"http://127.0.0.1:{self._server.server_port}/api/v1"
+
+    def _page_body(self, page, limit):
+        """Returns the JSON body of one page, building it on first request."""
+        key = (page, limit)
+        if key not in self._pages:
+            start = (page - 1) * limit
+            next_url = f"{self.base_url}/pulses/subscribed?page={page + 1}&limit={limit}" if start + limit < len(self.pulses) else None
+            self._pages[key] = json.dumps({
+                "count": len(self.pulses),
+                "next": next_url,
+                "results": self.pulses[start:start + limit],
+            }).encode("utf-8")
+        return self._pages[key]
+
+    def _make_handler(self):
+        """Builds the request handler class bound to this server."""
+        fake_server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive lets the collector's pooled session reuse connections, as it would with OTX.
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                """Silences per-request logging."""
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if not parsed.path.endswith("/pulses/subscribed"):
+                    self.send_error(404)
+                    return
+                query = parse_qs(parsed.query)
+                page = int(query.get("page", ["1"])[0])
+                limit = min(int(query.get("limit", [fake_server.page_size])[0]), fake_server.page_size)
+                body = fake_server._page_body(page, limit)
+                # Like a real API behind a CDN, pages carry an ETag and can be revalidated.
+                etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
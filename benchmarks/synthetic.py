@@ -0,0 +1,113 @@
+# This script generates synthetic OTX pulses for benchmarking.
+# The pulses have the same shape as real '/pulses/subscribed' results, with a realistic mix
+# of indicator types and some indicators shared between pulses, and are fully deterministic
+# for a given seed so benchmark runs are comparable.
+
+import random
+from datetime import datetime, timedelta
+
+# The indicator types generated, with their relative frequencies.
+INDICATOR_TYPE_MIX = {
+    'IPv4': 30,
+    'domain': 20,
+    'hostname': 10,
+    'URL': 15,
+    'FileHash-SHA256': 10,
+    'FileHash-MD5': 5,
+    'CIDR': 3,
+    'IPv6': 2,
+    'email': 3,
+    'CVE': 2,
+}
+TAGS = ['ransomware', 'phishing', 'botnet', 'apt', 'malware', 'c2', 'exploit', 'stealer', 'loader', 'scanner']
+TLP_LEVELS = ['white', 'white', 'green', 'green', 'amber', 'red']
+# Share of indicators drawn from a common pool, so some IOCs appear in several pulses.
+SHARED_INDICATOR_RATE = 0.2
+
+
+def _indicator_value(rng, ioc_type, n):
+    """Builds a plausible indicator value of the given type."""
+    if ioc_type == 'IPv4':
+        return f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+    if ioc_type == 'IPv6':
+        return f"2001:db8:{rng.randint(0, 0xffff):x}::{rng.randint(1, 0xffff):x}"
+    if ioc_type == 'CIDR':
+        return f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.0/24"
+    if ioc_type in ('domain', 'hostname'):
+        prefix = 'cdn.' if ioc_type == 'hostname' else ''
+        return f"{prefix}bad-{n}-{rng.randint(0, 10 ** 6)}.example"
+    if ioc_type == 'URL':
+        return f"http://bad-{n}.example/{rng.randint(0, 10 ** 9):x}/payload.js"
+    if ioc_type == 'FileHash-SHA256':
+        return f"{rng.getrandbits(256):064x}"
+    if ioc_type == 'FileHash-MD5':
+        return f"{rng.getrandbits(128):032x}"
+    if ioc_type == 'email':
+        return f"attacker{n}@bad-mail.example"
+    return f"CVE-{rng.randint(2015, 2025)}-{rng.randint(1000, 49999)}"
+
+
+def generate_pulses(n_indicators, indicators_per_pulse=50, seed=42, now=None):
+    """
+    Generates synthetic OTX pulses with a given total number of indicators.
+
+    Args:
+        n_indicators (int): Total number of indicators across all pulses.
+        indicators_per_pulse (int): Average number of indicators per pulse.
+        seed (int): Random seed, so the same arguments always give the same pulses.
+        now (datetime, optional): The reference time for creation dates. Defaults to now.
+
+    Returns:
+        list: A list of pulse dictionaries in the OTX API format.
+    """
+    rng = random.Random(seed)
+    now = now or datetime.now()
+    types = list(INDICATOR_TYPE_MIX)
+    weights = list(INDICATOR_TYPE_MIX.values())
+    shared_pool = [
+        (ioc_type, _indicator_value(rng, ioc_type, n))
+        for n, ioc_type in enumerate(rng.choices(types, weights, k=max(10, n_indicators // 100)))
+    ]
+
+    pulses = []
+    remaining = n_indicators
+    pulse_number = 0
+    while remaining > 0:
+        # Pulse sizes vary a lot in practice, so draw them from an exponential distribution.
+        size = min(remaining, max(1, int(rng.expovariate(1 / indicators_per_pulse))))
+        created = now - timedelta(minutes=rng.randint(0, 24 * 60))
+        indicators = []
+        for i in range(size):
+            if rng.random() < SHARED_INDICATOR_RATE:
+                ioc_type, value = rng.choice(shared_pool)
+            else:
+                ioc_type = rng.choices(types, weights)[0]
+                value = _indicator_value(rng, ioc_type, pulse_number * 1000 + i)
+            indicators.append({
+                "id": pulse_number * 100000 + i,
+                "indicator": value,
+                "type": ioc_type,
+                "created": created.isoformat(),
+                "content": "",
+                "title": "",
+                "description": "",
+                "expiration": None,
+                "is_active": 1,
+                "role": None,
+            })
+        pulses.append({
+            "id": f"{pulse_number:024x}",
+            "name": f"Synthetic campaign {pulse_number}",
+            "description": " ".join(rng.choices(TAGS, k=rng.randint(0, 60))),
+            "author_name": f"author-{rng.randint(1, 50)}",
+            "created": created.isoformat(),
+            "modified": created.isoformat(),
+            "tlp": rng.choice(TLP_LEVELS),
+            "tags": rng.sample(TAGS, k=rng.randint(0, 3)),
+            "adversary": "",
+            "malware_families": [],
+            "indicators": indicators,
+        })
+        remaining -= size
+        pulse_number += 1
+    return pulses
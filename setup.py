@@ -4,6 +4,13 @@ setup(
     name='autoti',
     version='0.1.0',
     packages=find_packages(),
+    # 'Executor.shutdown(cancel_futures=True)' and 'asyncio.to_thread' need Python 3.9.
+    python_requires='>=3.9',
     description='Automated Threat Intelligence pipeline.',
     long_description='A collection of tools for threat data collection, processing, and analysis.',
+    entry_points={
+        'console_scripts': [
+            'autoti=autoti.cli:main',
+        ],
+    },
 )
@@ -0,0 +1,162 @@
+# Regression tests for resuming an interrupted backfill.
+
+import contextlib
+import json
+import os
+from datetime import date, datetime
+from types import SimpleNamespace
+
+import pytest
+
+from autoti import backfill
+from autoti.collection.otx_collector import iter_numbered_pulse_pages
+from autoti.backfill import FETCH_CHECKPOINT, FETCH_COMPLETE_MARKER, PARTITION_COMPLETE_MARKER, partition_path, run_backfill, spool_pulses
+from autoti.processing.columnar_store import read_pulses
+
+START, END = date(2025, 3, 1), date(2025, 3, 3)
+
+
+def make_pulse(pulse_id, created, modified=None):
+    return {'id': pulse_id, 'name': pulse_id, 'description': '', 'created': created, 'modified': modified or created,
+            'indicators': [{'type': 'IPv4', 'indicator': '198.51.100.1'}]}
+
+
+PAGES = {
+    1: [make_pulse('p1', '2025-03-01T10:00:00')],
+    2: [make_pulse('p2', '2025-03-01T11:00:00')],
+    3: [make_pulse('p3', '2025-03-02T10:00:00')],
+    4: [make_pulse('p4', '2025-03-02T11:00:00')],
+}
+
+
+class FakeOTX:
+    """Serves PAGES, failing after 'fail_after' pages, and records what each fetch asked for."""
+
+    def __init__(self, fail_after=None, updates=()):
+        self.fail_after = fail_after
+        self.updates = list(updates)
+        self.calls = []
+
+    def __call__(self, session, since=None, skip_pages=frozenset(), **kwargs):
+        self.calls.append((since, set(skip_pages)))
+        if len(self.calls) > 1 and skip_pages == frozenset():
+            # The pulses modified since the interrupted fetch started.
+            yield 1, self.updates
+            return
+        for served, page_number in enumerate(page for page in PAGES if page not in skip_pages):
+            if served == self.fail_after:
+                raise ConnectionError("connection reset")
+            yield page_number, PAGES[page_number]
+
+
+@pytest.fixture
+def fake_otx(monkeypatch):
+    monkeypatch.setattr(backfill, 'create_session', lambda api_key: contextlib.nullcontext())
+
+    def install(otx):
+        monkeypatch.setattr(backfill, 'iter_numbered_pulse_pages', otx)
+        return otx
+    return install
+
+
+def spooled_ids(output_dir, day):
+    with open(os.path.join(output_dir, "_spool", f"{day}.jsonl"), encoding="utf-8") as spool_file:
+        return [json.loads(line)['id'] for line in spool_file]
+
+
+def test_interrupted_fetch_resumes_from_its_checkpoint(tmp_path, fake_otx):
+    output_dir = str(tmp_path)
+    fake_otx(FakeOTX(fail_after=2))
+    with pytest.raises(ConnectionError):
+        spool_pulses('key', START, END, output_dir)
+
+    resumed = fake_otx(FakeOTX(updates=[make_pulse('p1', '2025-03-01T10:00:00', modified='2025-03-05T10:00:00')]))
+    assert spool_pulses('key', START, END, output_dir) == 3
+
+    # Only the pages that were not spooled are requested again, then the pulses modified since the first attempt.
+    with open(os.path.join(output_dir, "_spool", FETCH_CHECKPOINT), encoding="utf-8") as checkpoint_file:
+        started = json.loads(checkpoint_file.readline())['started']
+    assert resumed.calls == [(datetime(2025, 3, 1), {1, 2}), (started, set())]
+    assert spooled_ids(output_dir, '2025-03-01') == ['p1', 'p2', 'p1']
+    assert spooled_ids(output_dir, '2025-03-02') == ['p3', 'p4']
+
+
+def test_pulse_cut_short_by_an_interruption_is_dropped(tmp_path, fake_otx):
+    output_dir = str(tmp_path)
+    fake_otx(FakeOTX(fail_after=1))
+    with pytest.raises(ConnectionError):
+        spool_pulses('key', START, END, output_dir)
+    with open(os.path.join(output_dir, "_spool", "2025-03-01.jsonl"), "a", encoding="utf-8") as spool_file:
+        spool_file.write('{"id": "p2", "crea')
+
+    fake_otx(FakeOTX())
+    spool_pulses('key', START, END, output_dir)
+
+    assert spooled_ids(output_dir, '2025-03-01') == ['p1', 'p2']
+
+
+def test_fetch_for_another_range_starts_over(tmp_path, fake_otx):
+    output_dir = str(tmp_path)
+    fake_otx(FakeOTX(fail_after=2))
+    with pytest.raises(ConnectionError):
+        spool_pulses('key', START, END, output_dir)
+
+    otx = fake_otx(FakeOTX())
+    spool_pulses('key', START, date(2025, 3, 2), output_dir)
+
+    assert otx.calls[0][1] == set()
+    assert not os.path.exists(os.path.join(output_dir, "_spool", "2025-03-02.jsonl"))
+
+
+def test_finished_partitions_are_skipped(tmp_path, fake_otx):
+    output_dir = str(tmp_path)
+    fake_otx(FakeOTX())
+    spool_pulses('key', START, END, output_dir)
+    with open(os.path.join(output_dir, "_spool", FETCH_COMPLETE_MARKER), "w") as marker_file:
+        marker_file.write(f"{START.isoformat()}/{END.isoformat()}")
+    # The first day was finished by an earlier run.
+    os.makedirs(partition_path(output_dir, "pulses", START))
+    open(os.path.join(partition_path(output_dir, "pulses", START), PARTITION_COMPLETE_MARKER), "w").close()
+
+    assert run_backfill(START, END, output_dir=output_dir, workers=1) == 1
+    assert os.path.exists(os.path.join(partition_path(output_dir, "pulses", date(2025, 3, 2)), PARTITION_COMPLETE_MARKER))
+    assert not any(name.endswith(".parquet") for name in os.listdir(partition_path(output_dir, "pulses", START)))
+    assert run_backfill(START, END, output_dir=output_dir, workers=1) == 0
+
+
+def test_pulses_spooled_twice_are_written_once(tmp_path, fake_otx):
+    output_dir = str(tmp_path)
+    fake_otx(FakeOTX(fail_after=2))
+    with pytest.raises(ConnectionError):
+        spool_pulses('key', START, END, output_dir)
+    fake_otx(FakeOTX(updates=[make_pulse('p1', '2025-03-01T10:00:00', modified='2025-03-05T10:00:00')]))
+    spool_pulses('key', START, END, output_dir)
+    with open(os.path.join(output_dir, "_spool", FETCH_COMPLETE_MARKER), "w") as marker_file:
+        marker_file.write(f"{START.isoformat()}/{END.isoformat()}")
+
+    run_backfill(START, END, output_dir=output_dir, workers=1)
+
+    pulses = read_pulses(output_dir, columns=['pulse_id'])
+    assert sorted(pulses['pulse_id']) == ['p1', 'p2', 'p3', 'p4']
+
+
+class PagedSession:
+    """Answers every page request with two pulses out of a total of eight, and records the pages requested."""
+
+    def __init__(self):
+        self.requested = []
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        self.requested.append(params['page'])
+        body = json.dumps({'count': 8, 'results': [{'id': f"p{params['page']}"}] * 2}).encode()
+        return SimpleNamespace(status_code=200, content=body, raw=None, headers={}, raise_for_status=lambda: None)
+
+
+def test_skipped_pages_are_not_requested():
+    session = PagedSession()
+
+    pages = dict(iter_numbered_pulse_pages(session, since='2025-03-01T00:00:00', max_workers=1, skip_pages={1, 3}))
+
+    assert sorted(pages) == [2, 4]
+    # The first page is still requested, for the total.
+    assert sorted(session.requested) == [1, 2, 4]
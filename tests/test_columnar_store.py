@@ -0,0 +1,89 @@
+# Regression tests for the partitioned columnar store.
+
+from autoti.processing.columnar_store import write_normalized, read_pulses, read_iocs
+from autoti.processing.data_normalizer import normalize_pulses, normalize_indicators
+
+
+def make_pulse(pulse_id, name, indicators, created='2025-03-01T10:00:00'):
+    """Builds a raw pulse with the given (type, value) indicators."""
+    return {
+        'id': pulse_id,
+        'name': name,
+        'description': f"{name} description",
+        'created': created,
+        'indicators': [{'id': i, 'type': ioc_type, 'indicator': value} for i, (ioc_type, value) in enumerate(indicators)],
+    }
+
+
+def write_run(raw_pulses, root_dir, **kwargs):
+    """Writes pulses the way a pipeline run does."""
+    df_pulses = normalize_pulses(raw_pulses, verbose=False).drop(columns=['indicators'])
+    write_normalized(df_pulses, normalize_indicators(raw_pulses), str(root_dir), **kwargs)
+
+
+def test_later_runs_keep_pulses_from_earlier_runs(tmp_path):
+    write_run([make_pulse('p1', 'one', [('IPv4', '198.51.100.1')]), make_pulse('p2', 'two', [('IPv4', '198.51.100.2')])], tmp_path)
+    write_run([make_pulse('p2', 'two', [('IPv4', '198.51.100.2')]), make_pulse('p3', 'three', [('IPv4', '198.51.100.3')])], tmp_path)
+
+    assert sorted(read_pulses(tmp_path)['pulse_id']) == ['p1', 'p2', 'p3']
+    assert sorted(read_iocs(tmp_path)['indicator']) == ['198.51.100.1', '198.51.100.2', '198.51.100.3']
+
+
+def test_pulse_saved_twice_is_read_from_the_latest_run(tmp_path):
+    write_run([make_pulse('p1', 'old name', [('IPv4', '198.51.100.1')])], tmp_path)
+    write_run([make_pulse('p1', 'new name', [('domain', 'evil.example')])], tmp_path)
+
+    pulses = read_pulses(tmp_path, columns=['threat_name'])
+    assert pulses['threat_name'].tolist() == ['new name']
+    assert read_iocs(tmp_path, columns=['indicator'])['indicator'].tolist() == ['evil.example']
+    # The older run's IPv4 indicator must not come back through a type filter either.
+    assert read_iocs(tmp_path, types=['IPv4']).empty
+
+
+def test_replace_rewrites_the_whole_day(tmp_path):
+    write_run([make_pulse('p1', 'one', [('IPv4', '198.51.100.1')])], tmp_path)
+    write_run([make_pulse('p2', 'two', [('IPv4', '198.51.100.2')])], tmp_path, replace=True)
+
+    assert read_pulses(tmp_path)['pulse_id'].tolist() == ['p2']
+
+
+def data_files(root_dir, table):
+    return sorted(path for path in (root_dir / table).rglob('part-*') if path.is_file())
+
+
+def test_each_run_compacts_the_days_it_touches(tmp_path):
+    for run in range(5):
+        write_run([make_pulse(f"p{run}", 'run', [('IPv4', f"198.51.100.{run}")]), make_pulse('shared', 'run', [('IPv4', '203.0.113.1')])], tmp_path)
+
+    assert len(data_files(tmp_path, 'pulses')) == 1
+    assert len(data_files(tmp_path, 'iocs')) == 1
+    assert sorted(read_pulses(tmp_path)['pulse_id']) == ['p0', 'p1', 'p2', 'p3', 'p4', 'shared']
+    assert len(read_iocs(tmp_path)) == 6
+
+
+def test_pulse_saved_again_without_indicators_drops_its_old_ones(tmp_path):
+    write_run([make_pulse('p1', 'one', [('IPv4', '198.51.100.1')]), make_pulse('p2', 'two', [('IPv4', '198.51.100.2')])], tmp_path)
+    write_run([make_pulse('p1', 'one', [])], tmp_path)
+
+    assert read_iocs(tmp_path)['pulse_id'].tolist() == ['p2']
+    assert read_pulses(tmp_path, columns=['pulse_id', 'ioc_count']).set_index('pulse_id')['ioc_count'].to_dict() == {'p1': 0, 'p2': 1}
+
+
+def test_interrupted_write_is_ignored_until_the_next_one(tmp_path):
+    write_run([make_pulse('p1', 'one', [('IPv4', '198.51.100.1')])], tmp_path)
+    # A run that stopped after writing its indicators, before its pulses: the indicator file is left over.
+    [ioc_file] = data_files(tmp_path, 'iocs')
+    leftover = ioc_file.with_name('part-99999999999999999999-00000000-0.parquet')
+    leftover.write_bytes(ioc_file.read_bytes())
+
+    assert read_iocs(tmp_path)['indicator'].tolist() == ['198.51.100.1']
+
+    write_run([make_pulse('p2', 'two', [('IPv4', '198.51.100.2')])], tmp_path)
+    assert sorted(read_iocs(tmp_path)['indicator']) == ['198.51.100.1', '198.51.100.2']
+    assert len(data_files(tmp_path, 'iocs')) == 1
+
+
+def test_duplicate_count_is_stored(tmp_path):
+    write_run([dict(make_pulse('p1', 'one', [('IPv4', '198.51.100.1')]), duplicate_count=3)], tmp_path)
+
+    assert read_pulses(tmp_path, columns=['duplicate_count'])['duplicate_count'].tolist() == [3]
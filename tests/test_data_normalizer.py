@@ -0,0 +1,34 @@
+# Regression tests for pulse and indicator normalization.
+
+from autoti.processing.data_normalizer import normalize_pulses, normalize_indicators
+
+
+def make_pulse(pulse_id, **fields):
+    return {'id': pulse_id, 'name': pulse_id, 'description': '', 'created': '2025-03-01T10:00:00', **fields}
+
+
+def test_pulses_without_indicator_lists_count_zero():
+    # No pulse in the batch has a list: one is None and the other has no 'indicators' key.
+    df = normalize_pulses([make_pulse('p1', indicators=None), make_pulse('p2')], verbose=False)
+    assert df['ioc_count'].tolist() == [0, 0]
+
+    df = normalize_pulses([make_pulse('p1')], verbose=False)
+    assert df['ioc_count'].tolist() == [0]
+
+
+def test_ioc_count_mixes_lists_and_missing_values():
+    df = normalize_pulses([make_pulse('p1', indicators=[{'type': 'IPv4', 'indicator': '198.51.100.1'}] * 3), make_pulse('p2', indicators=None)], verbose=False)
+    assert df['ioc_count'].tolist() == [3, 0]
+    assert str(df['ioc_count'].dtype) == 'int64'
+
+
+def test_indicator_timestamps_with_offsets_are_stored_in_utc():
+    df = normalize_indicators([make_pulse('p1', indicators=[
+        {'type': 'IPv4', 'indicator': '198.51.100.1', 'created': '2025-03-01T10:00:00Z', 'expiration': '2025-03-08T12:00:00+02:00'},
+        {'type': 'IPv4', 'indicator': '198.51.100.2', 'created': '2025-03-01T10:00:00.500', 'expiration': None},
+    ])])
+
+    assert str(df['created'].dtype) == 'datetime64[us]'
+    assert df['created'].dt.strftime('%Y-%m-%dT%H:%M:%S').tolist() == ['2025-03-01T10:00:00', '2025-03-01T10:00:00']
+    assert df['expiration'].iloc[0].isoformat() == '2025-03-08T10:00:00'
+    assert df['expiration'].isna().iloc[1]
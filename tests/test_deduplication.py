@@ -0,0 +1,61 @@
+# Regression tests for near-duplicate pulse merging.
+
+from autoti.processing.deduplication import deduplicate_pulses, merge_cluster, pulse_tokens
+
+
+def make_pulse(pulse_id, name, indicators, tags=()):
+    """Builds a raw pulse with the given indicator values."""
+    return {
+        'id': pulse_id,
+        'name': name,
+        'description': f"{name} campaign delivering a loader through phishing attachments",
+        'tags': list(tags),
+        'indicators': [{'type': 'IPv4', 'indicator': value} for value in indicators],
+    }
+
+
+def ips(start, count):
+    return [f"198.51.100.{i}" for i in range(start, start + count)]
+
+
+def test_reshared_pulses_are_merged_into_one():
+    original = make_pulse('p1', 'Emotet wave', ips(1, 40), tags=['emotet'])
+    # A re-share with one extra indicator and tag.
+    reshare = make_pulse('p2', 'Emotet wave', ips(1, 40) + ['203.0.113.9'], tags=['emotet', 'loader'])
+
+    [merged] = deduplicate_pulses([original, reshare], verbose=False)
+
+    assert merged['id'] == 'p2'
+    assert merged['duplicate_count'] == 2
+    assert merged['duplicate_ids'] == ['p1']
+    assert len(merged['indicators']) == 41
+    assert merged['tags'] == ['emotet', 'loader']
+
+
+def test_distinct_pulses_are_kept_in_order():
+    pulses = [
+        make_pulse('p1', 'Emotet wave', ips(1, 20)),
+        make_pulse('p2', 'Cobalt Strike beacons', ips(100, 20)),
+        make_pulse('p3', 'Emotet wave', ips(1, 20)),
+    ]
+
+    deduplicated = deduplicate_pulses(pulses, verbose=False)
+
+    assert [pulse['id'] for pulse in deduplicated] == ['p1', 'p2']
+    assert [pulse['duplicate_count'] for pulse in deduplicated] == [2, 1]
+    assert deduplicated[1]['duplicate_ids'] == []
+
+
+def test_merging_leaves_the_input_pulses_unchanged():
+    first, second = make_pulse('p1', 'a', ips(1, 3)), make_pulse('p2', 'a', ips(3, 3))
+
+    merged = merge_cluster([first, second])
+
+    assert [indicator['indicator'] for indicator in merged['indicators']] == ips(1, 5)
+    assert len(first['indicators']) == len(second['indicators']) == 3
+    assert 'duplicate_count' not in first
+
+
+def test_empty_pulse_only_matches_itself():
+    assert pulse_tokens({'id': 'p1'}) == {'id:p1'}
+    assert len(deduplicate_pulses([{'id': 'p1'}, {'id': 'p2'}], verbose=False)) == 2
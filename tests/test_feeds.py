@@ -0,0 +1,75 @@
+# Regression tests for feed timestamps, which must agree on UTC so feeds can be mixed.
+
+import json
+from datetime import datetime
+
+from autoti.collection import feeds
+from autoti.collection.feeds import LocalFileFeed, OTXFeed, collect_feeds, make_pulse, merge_pulses
+from autoti.processing.data_normalizer import normalize_pulses
+
+SINCE = datetime(2025, 3, 1)
+
+
+def otx_pulse(pulse_id, created):
+    """A pulse as OTX sends it: UTC timestamps without an offset."""
+    return {'id': pulse_id, 'name': pulse_id, 'description': '', 'created': created, 'modified': created, 'indicators': []}
+
+
+def test_file_feed_timestamps_are_converted_to_utc(tmp_path):
+    path = tmp_path / "pulses.json"
+    path.write_text(json.dumps([
+        otx_pulse('zulu', '2025-03-01T10:00:00Z'),
+        otx_pulse('offset', '2025-03-01T12:00:00+02:00'),
+    ]))
+
+    pulses = LocalFileFeed('file', str(path)).collect(SINCE)
+
+    assert [pulse['created'] for pulse in pulses] == ['2025-03-01T10:00:00', '2025-03-01T10:00:00']
+
+
+def test_feeds_with_and_without_offsets_normalize_together(tmp_path):
+    path = tmp_path / "pulses.jsonl"
+    path.write_text(json.dumps(otx_pulse('file', '2025-03-01T10:00:00Z')) + "\n")
+    stix = make_pulse('stix', 'stix', '', '2025-03-01T11:00:00-01:00', [])
+
+    pulses = merge_pulses([[otx_pulse('otx', '2025-03-01T12:00:00.123456')], LocalFileFeed('file', str(path)).collect(SINCE), [stix]])
+    df = normalize_pulses(pulses, verbose=False)
+
+    created = dict(zip(df['pulse_id'], df['creation_date'].dt.strftime('%Y-%m-%dT%H:%M:%S%z')))
+    assert created == {'otx': '2025-03-01T12:00:00+0000', 'file': '2025-03-01T10:00:00+0000', 'stix': '2025-03-01T12:00:00+0000'}
+
+
+def test_recent_filter_compares_in_utc(tmp_path):
+    path = tmp_path / "pulses.json"
+    # 00:30 at +01:00 is 23:30 UTC the day before, so it is older than 'since'.
+    path.write_text(json.dumps([otx_pulse('old', '2025-03-01T00:30:00+01:00'), otx_pulse('new', '2025-03-01T00:30:00Z')]))
+
+    assert [pulse['id'] for pulse in LocalFileFeed('file', str(path)).collect(SINCE)] == ['new']
+
+
+def test_otx_feed_passes_its_timeout_and_rate_limit(monkeypatch):
+    calls = []
+    monkeypatch.setattr(feeds, 'get_latest_pulses', lambda api_key, **kwargs: calls.append(kwargs) or [otx_pulse('p1', '2025-03-01T10:00:00')])
+    feed = OTXFeed(api_key='key', timeout=5, rate_limit=2)
+
+    assert feed.collect(SINCE)[0]['source'] == 'otx'
+    assert calls == [{'since': SINCE, 'timeout': 5, 'rate_limiter': feed.rate_limiter}]
+
+
+def test_since_is_rounded_to_the_minute():
+    class RecordingFeed:
+        name, timeout = 'recording', 5
+
+        def __init__(self):
+            self.since = []
+
+        def collect(self, since):
+            self.since.append(since)
+            return []
+
+    feed = RecordingFeed()
+    collect_feeds([feed], since=datetime(2025, 3, 1, 10, 15, 42, 123456))
+    collect_feeds([feed])
+
+    assert feed.since[0] == datetime(2025, 3, 1, 10, 15)
+    assert feed.since[1].second == feed.since[1].microsecond == 0
@@ -0,0 +1,68 @@
+# Regression tests for revalidating OTX pages from the HTTP cache.
+
+import json
+
+import pytest
+
+from autoti.collection.http_cache import ResponseCache
+from autoti.collection.otx_collector import _fetch_page
+
+URL = "https://otx.example/api/v1/pulses/subscribed"
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=b"", headers=None):
+        self.status_code = status_code
+        self.content = body
+        self.headers = headers or {}
+        self.raw = None
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    """Answers with the given responses in turn and records the headers of every request."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.sent = []
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        self.sent.append(headers or {})
+        return self.responses.pop(0)
+
+
+def page(*pulse_ids):
+    return json.dumps({"results": [{"id": pulse_id} for pulse_id in pulse_ids]}).encode()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "http_cache.db"), max_age=0)
+    yield cache
+    cache.close()
+
+
+def test_page_for_another_window_is_revalidated_with_its_etag(cache):
+    session = FakeSession(FakeResponse(200, page("p1"), {"ETag": '"v1"'}), FakeResponse(304))
+
+    _fetch_page(session, URL, {"modified_since": "2025-03-01T10:00:00", "page": 1}, cache=cache)
+    result = _fetch_page(session, URL, {"modified_since": "2025-03-01T11:00:00", "page": 1}, cache=cache)
+
+    assert session.sent[1] == {"If-None-Match": '"v1"'}
+    assert result["results"] == [{"id": "p1"}]
+
+
+def test_last_modified_alone_does_not_revalidate(cache):
+    # A 304 to 'If-Modified-Since' would not prove that the earlier window's body is the one asked for now.
+    session = FakeSession(
+        FakeResponse(200, page("p1"), {"Last-Modified": "Sat, 01 Mar 2025 10:00:00 GMT"}),
+        FakeResponse(200, page("p2")),
+    )
+
+    _fetch_page(session, URL, {"modified_since": "2025-03-01T10:00:00", "page": 1}, cache=cache)
+    result = _fetch_page(session, URL, {"modified_since": "2025-03-01T09:00:00", "page": 1}, cache=cache)
+
+    assert session.sent[1] == {}
+    assert result["results"] == [{"id": "p2"}]
@@ -0,0 +1,104 @@
+# Regression tests for the indexed store behind the JSON API.
+
+import sqlite3
+import threading
+
+import pytest
+
+from autoti.processing import intel_store
+from autoti.processing.intel_store import IntelStore
+
+
+def make_pulse(pulse_id, created, indicators, modified=None):
+    """Builds a raw pulse with the given (type, value) indicators."""
+    return {
+        'id': pulse_id,
+        'name': pulse_id,
+        'created': created,
+        'modified': modified or created,
+        'indicators': [{'id': i, 'type': ioc_type, 'indicator': value} for i, (ioc_type, value) in enumerate(indicators)],
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = IntelStore(str(tmp_path / "intel.db"), retention_days=100000)
+    yield store
+    store.close()
+
+
+def test_unchanged_pulses_are_not_rewritten(store):
+    pulses = [make_pulse('p1', '2025-03-01T10:00:00', [('IPv4', '198.51.100.1')])]
+    assert store.upsert_pulses(pulses) == 1
+    assert store.upsert_pulses(pulses) == 0
+
+    modified = [make_pulse('p1', '2025-03-01T10:00:00', [('domain', 'evil.example')], modified='2025-03-02T10:00:00')]
+    assert store.upsert_pulses(modified) == 1
+    assert [ioc['indicator'] for ioc in store.query_iocs()[0]] == ['evil.example']
+
+
+def test_cursor_walks_every_page_newest_first(store):
+    store.upsert_pulses([make_pulse(f"p{i}", f"2025-03-01T10:00:{i:02d}", [('IPv4', f"198.51.100.{i}")]) for i in range(7)])
+
+    seen, cursor = [], None
+    while True:
+        items, cursor = store.query_pulses(limit=3, cursor=cursor)
+        seen.extend(item['pulse_id'] for item in items)
+        if cursor is None:
+            break
+
+    assert seen == [f"p{i}" for i in reversed(range(7))]
+
+
+def test_lookup_ignores_case_and_whitespace(store):
+    store.upsert_pulses([make_pulse('p1', '2025-03-01T10:00:00', [('domain', 'Evil.Example')])])
+
+    results = store.lookup([' evil.example ', 'other.example'])
+
+    assert [match['pulse_id'] for match in results[' evil.example ']] == ['p1']
+    assert results['other.example'] == []
+
+
+def test_pulse_merged_into_a_larger_one_is_deleted(store):
+    store.upsert_pulses([make_pulse('p1', '2025-03-01T10:00:00', [('IPv4', '198.51.100.1')])])
+
+    # A larger re-share of p1 arrives and becomes the representative.
+    merged = make_pulse('p2', '2025-03-01T11:00:00', [('IPv4', '198.51.100.1'), ('IPv4', '198.51.100.2')])
+    merged.update(duplicate_ids=['p1'], duplicate_count=2)
+    store.upsert_pulses([merged])
+
+    assert [pulse['pulse_id'] for pulse in store.query_pulses()[0]] == ['p2']
+    assert [match['pulse_id'] for match in store.lookup(['198.51.100.1'])['198.51.100.1']] == ['p2']
+
+
+def test_request_threads_share_pooled_connections(store, monkeypatch):
+    opened = []
+    connect = sqlite3.connect
+    monkeypatch.setattr(intel_store.sqlite3, 'connect', lambda *args, **kwargs: opened.append(1) or connect(*args, **kwargs))
+
+    # Every request is served by a new thread, as with a threaded WSGI server.
+    for _ in range(20):
+        thread = threading.Thread(target=store.query_pulses)
+        thread.start()
+        thread.join()
+
+    assert opened == []
+
+
+def test_idle_connections_are_bounded(tmp_path):
+    store = IntelStore(str(tmp_path / "intel.db"), pool_size=2)
+    barrier = threading.Barrier(6)
+
+    def query():
+        with store._connection():
+            barrier.wait()
+
+    threads = [threading.Thread(target=query) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(store._idle) == 2
+    store.close()
+    assert store._idle == []
@@ -0,0 +1,55 @@
+# Regression tests for matching observables against the IOC index.
+
+import pandas as pd
+import pytest
+
+from autoti.processing.ioc_index import build_ioc_index
+
+
+@pytest.fixture
+def index():
+    return build_ioc_index(pd.DataFrame([
+        {'pulse_id': 'ip', 'type': 'IPv4', 'indicator': '198.51.100.1'},
+        {'pulse_id': 'cidr', 'type': 'CIDR', 'indicator': '203.0.113.0/24'},
+        {'pulse_id': 'domain', 'type': 'domain', 'indicator': 'Evil.Example.'},
+        {'pulse_id': 'tld', 'type': 'domain', 'indicator': 'com'},
+        {'pulse_id': 'url', 'type': 'URL', 'indicator': 'HTTP://Files.Example:80/Update.js?v=1'},
+        {'pulse_id': 'hash', 'type': 'FileHash-MD5', 'indicator': '44D88612FEA8A8F36DE82E1278ABB02F'},
+    ]))
+
+
+def test_ipv4_matches_addresses_and_ranges(index):
+    assert index.lookup('198.51.100.1') == {'ip'}
+    assert index.lookup('203.0.113.77') == {'cidr'}
+    assert index.lookup('198.51.100.2') == set()
+
+
+def test_domain_matches_its_subdomains(index):
+    assert index.lookup('evil.example') == {'domain'}
+    assert index.lookup('cdn.EVIL.example.') == {'domain'}
+    assert index.lookup('example') == set()
+
+
+def test_parent_domains_stop_at_two_labels(index):
+    # A listed top-level domain only matches itself, not every name under it.
+    assert index.lookup('shop.example.com') == set()
+    assert index.lookup('com') == {'tld'}
+
+
+def test_url_normalization(index):
+    # The scheme and host are case-insensitive and the default port is implied.
+    assert index.lookup('http://files.example/Update.js?v=1') == {'url'}
+    assert index.lookup('http://FILES.example:80/Update.js?v=1') == {'url'}
+    # The path is case-sensitive, and another port is another URL.
+    assert index.lookup('http://files.example/update.js?v=1') == set()
+    assert index.lookup('http://files.example:8080/Update.js?v=1') == set()
+
+
+def test_url_also_matches_its_host(index):
+    assert index.lookup('https://cdn.evil.example/payload.bin') == {'domain'}
+    assert index.lookup('http://198.51.100.1/login') == {'ip'}
+
+
+def test_hash_ignores_case(index):
+    assert index.lookup('44d88612fea8a8f36de82e1278abb02f') == {'hash'}
+    assert index.match(['44d88612fea8a8f36de82e1278abb02f', '192.0.2.10']) == {'44d88612fea8a8f36de82e1278abb02f': {'hash'}}
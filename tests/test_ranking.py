@@ -0,0 +1,81 @@
+# Regression tests for the relevance scores used to pick pulses for the report.
+
+import pandas as pd
+import pytest
+
+from autoti.processing.ranking import score_pulses, select_top_pulses
+
+NO_IOCS = pd.DataFrame(columns=['pulse_id', 'type', 'indicator'])
+
+
+def make_pulses(*rows):
+    """Builds normalized pulses created now, with the given column overrides per pulse."""
+    defaults = {'creation_date': pd.Timestamp.now(tz='UTC'), 'ioc_count': 0, 'tags': [], 'tlp': 'white', 'duplicate_count': 1}
+    return pd.DataFrame([{**defaults, **row} for row in rows])
+
+
+def scores(df_pulses, column='relevance_score', df_iocs=NO_IOCS):
+    scored = score_pulses(df_pulses, df_iocs=df_iocs)
+    return dict(zip(scored['pulse_id'], scored[column]))
+
+
+def test_tlp_weights_priority_tags():
+    tag_score = scores(make_pulses(
+        {'pulse_id': 'red', 'tlp': 'red', 'tags': ['Ransomware']},
+        {'pulse_id': 'white', 'tlp': 'white', 'tags': ['ransomware']},
+        {'pulse_id': 'unknown', 'tlp': None, 'tags': ['ransomware']},
+        {'pulse_id': 'untagged', 'tlp': 'red', 'tags': ['misc']},
+    ), 'tag_score')
+
+    assert tag_score == pytest.approx({'red': 1.0, 'white': 0.4, 'unknown': 0.4, 'untagged': 0.25})
+
+
+def test_recency_halves_every_half_life():
+    now = pd.Timestamp.now(tz='UTC')
+    recency = scores(make_pulses(
+        {'pulse_id': 'new', 'creation_date': now},
+        {'pulse_id': 'old', 'creation_date': now - pd.Timedelta(hours=12)},
+        {'pulse_id': 'future', 'creation_date': now + pd.Timedelta(hours=1)},
+    ), 'recency_score')
+
+    assert recency['new'] == pytest.approx(1.0, abs=1e-3)
+    assert recency['old'] == pytest.approx(0.5, abs=1e-3)
+    # Clock skew does not push a pulse above a brand new one.
+    assert recency['future'] == 1.0
+
+
+def test_merged_duplicates_are_fully_corroborated():
+    df_iocs = pd.DataFrame([
+        {'pulse_id': 'merged', 'type': 'IPv4', 'indicator': '198.51.100.1'},
+        {'pulse_id': 'alone', 'type': 'IPv4', 'indicator': '198.51.100.4'},
+        {'pulse_id': 'half', 'type': 'IPv4', 'indicator': '198.51.100.2'},
+        {'pulse_id': 'half', 'type': 'IPv4', 'indicator': '198.51.100.3'},
+        {'pulse_id': 'other', 'type': 'IPv4', 'indicator': '198.51.100.2'},
+    ])
+    corroboration = scores(make_pulses(
+        {'pulse_id': 'merged', 'duplicate_count': 3},
+        {'pulse_id': 'alone'},
+        {'pulse_id': 'half'},
+        {'pulse_id': 'other'},
+    ), 'corroboration_score', df_iocs=df_iocs)
+
+    # No other pulse reports the merged pulse's indicator, but its near-duplicates did.
+    assert corroboration == pytest.approx({'merged': 1.0, 'alone': 0.0, 'half': 0.5, 'other': 1.0})
+
+
+def test_top_pulses_are_ordered_by_score():
+    top = select_top_pulses(make_pulses(
+        {'pulse_id': 'plain'},
+        {'pulse_id': 'tagged', 'tags': ['apt'], 'tlp': 'amber'},
+        {'pulse_id': 'big', 'ioc_count': 1000, 'tags': ['apt'], 'tlp': 'amber'},
+    ), k=2, df_iocs=NO_IOCS)
+
+    assert top['pulse_id'].tolist() == ['big', 'tagged']
+
+
+def test_ties_keep_the_input_order():
+    now = pd.Timestamp.now(tz='UTC')
+    pulses = make_pulses(*({'pulse_id': pulse_id, 'creation_date': now} for pulse_id in ['c', 'a', 'b']))
+
+    assert select_top_pulses(pulses, k=3, df_iocs=NO_IOCS)['pulse_id'].tolist() == ['c', 'a', 'b']
+    assert select_top_pulses(pulses, k=2, df_iocs=NO_IOCS)['pulse_id'].tolist() == ['c', 'a']
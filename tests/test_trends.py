@@ -0,0 +1,83 @@
+# Regression tests for the incrementally maintained trend statistics.
+
+from datetime import datetime
+
+import pytest
+
+from autoti.processing.trends import TrendStore
+
+NOW = datetime(2025, 3, 2, 12, 0)
+
+
+def make_pulse(pulse_id, indicators, tags=(), duplicate_ids=()):
+    """Builds a raw pulse with the given (type, value) indicators, created on the day before NOW."""
+    pulse = {
+        'id': pulse_id,
+        'created': '2025-03-01T10:00:00',
+        'tags': list(tags),
+        'indicators': [{'type': ioc_type, 'indicator': value} for ioc_type, value in indicators],
+    }
+    if duplicate_ids:
+        pulse['duplicate_ids'] = list(duplicate_ids)
+    return pulse
+
+
+def type_counts(store):
+    return {row['key']: row['current'] for row in store.summary(now=NOW)['growth']['indicator_type']}
+
+
+def tag_counts(store):
+    return {row['key']: row['current'] for row in store.summary(now=NOW)['growth']['tag']}
+
+
+def reports(store, indicator):
+    return {row['indicator']: row['pulses'] for row in store.summary(now=NOW)['heavy_hitters']}.get(indicator)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TrendStore(str(tmp_path / "trends.db"))
+    yield store
+    store.close()
+
+
+def test_same_window_is_counted_once(store):
+    pulses = [make_pulse('p1', [('IPv4', '198.51.100.1'), ('domain', 'evil.example')], tags=['emotet'])]
+
+    assert store.update(pulses, now=NOW) == 1
+    assert store.update(pulses, now=NOW) == 0
+    assert type_counts(store) == {'IPv4': 1, 'domain': 1}
+    assert tag_counts(store) == {'emotet': 1}
+
+
+def test_modified_pulse_adds_only_its_new_indicators(store):
+    store.update([make_pulse('p1', [('IPv4', '198.51.100.1')], tags=['emotet'])], now=NOW)
+
+    modified = make_pulse('p1', [('IPv4', '198.51.100.1'), ('IPv4', '198.51.100.2'), ('domain', 'evil.example')], tags=['emotet'])
+    assert store.update([modified], now=NOW) == 1
+    assert store.update([modified], now=NOW) == 0
+
+    assert type_counts(store) == {'IPv4': 2, 'domain': 1}
+    assert tag_counts(store) == {'emotet': 1}
+    assert reports(store, '198.51.100.1') == 1
+
+
+def test_merged_pulse_adds_the_indicators_of_newly_merged_pulses(store):
+    store.update([make_pulse('p1', [('IPv4', '198.51.100.1')]), make_pulse('p2', [('IPv4', '198.51.100.2')])], now=NOW)
+
+    # A new pulse, p3, is merged with p1 and becomes the representative.
+    merged = make_pulse('p3', [('IPv4', '198.51.100.1'), ('IPv4', '198.51.100.3')], duplicate_ids=['p1'])
+    assert store.update([merged], now=NOW) == 1
+    assert store.update([merged], now=NOW) == 0
+
+    assert type_counts(store) == {'IPv4': 3}
+    assert reports(store, '198.51.100.3') == 1
+
+
+
+def test_pulse_split_from_its_cluster_is_not_counted_again(store):
+    store.update([make_pulse('p2', [('IPv4', '198.51.100.1'), ('IPv4', '198.51.100.2')], duplicate_ids=['p1'])], now=NOW)
+
+    # p2 left the window, so p1 comes back on its own.
+    assert store.update([make_pulse('p1', [('IPv4', '198.51.100.1')])], now=NOW) == 0
+    assert type_counts(store) == {'IPv4': 2}